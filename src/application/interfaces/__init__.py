@@ -1,17 +1,21 @@
 __all__ = (
     "CacheGameRepoInterface",
     "CacheLobbyRepoInterface",
+    "GameEngineInterface",
     "UserRepoInterface",
     "BaseTelegramUserRepo",
     "LeaderBoardInterface",
+    "TimerSchedulerInterface",
 )
 
 from application.interfaces.cache_game_repo_interface import CacheGameRepoInterface
 from application.interfaces.cache_lobby_repo_interface import (
     CacheLobbyRepoInterface,
 )
+from application.interfaces.game_engine_interface import GameEngineInterface
 from application.interfaces.users_repo_interface import (
     UserRepoInterface,
     BaseTelegramUserRepo,
 )
 from application.interfaces.leaderboard import LeaderBoardInterface
+from application.interfaces.timer_scheduler_interface import TimerSchedulerInterface
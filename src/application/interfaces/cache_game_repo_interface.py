@@ -1,24 +1,72 @@
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import Callable, TypeVar
 
-from domain.entities.game import Game
-from application.schemas.game import GameSchema
+from domain.entities.game import Game, GameChanges
+
+T = TypeVar("T")
 
 
 class CacheGameRepoInterface(ABC):
     @abstractmethod
-    async def cache_game(self, game: Game) -> GameSchema:
-        """Кэшировать игру"""
+    async def cache_game(
+        self,
+        game: Game,
+        changes: GameChanges | None = None,
+    ) -> Game:
+        """Кэшировать игру, при changes - только измененные части"""
         pass
 
     @abstractmethod
-    async def get_game(self, chat_id: int) -> GameSchema:
+    async def create_game(self, game: Game) -> bool:
+        """Атомарно сохранить новую игру, если игры в чате еще нет.
+        False - игра уже есть, ничего не записано
+        """
+        pass
+
+    @abstractmethod
+    async def get_game(self, chat_id: int) -> Game | None:
         """Вытащить игру из кэша"""
         pass
 
+    @abstractmethod
+    async def update_game(
+        self,
+        chat_id: int,
+        action: Callable[[Game], T],
+    ) -> T | None:
+        """Загрузить игру, применить action и сохранить изменения атомарно.
+
+        action может быть вызван повторно на свежей копии игры, поэтому
+        не должен иметь побочных эффектов кроме изменения игры.
+        """
+        pass
+
+    @abstractmethod
+    async def pop_game(self, chat_id: int) -> Game | None:
+        """Атомарно забрать игру из кэша и удалить ее"""
+        pass
+
     @abstractmethod
     async def delete_cache_game(self, chat_id: int) -> None:
-        """Удалить игру из кэша"""
+        """Удалить игру из кэша вместе с отметкой расчета"""
+        pass
+
+    @abstractmethod
+    async def claim_settlement(self, chat_id: int) -> str | None:
+        """Занять расчет игры.
+        "claimed" - расчет наш, "paid" - выплаты уже проведены и осталось
+        удалить игру, None - игру сейчас рассчитывает кто-то другой
+        """
+        pass
+
+    @abstractmethod
+    async def release_settlement(self, chat_id: int):
+        """Снять отметку расчета, не удаляя игру"""
+        pass
+
+    @abstractmethod
+    async def mark_settled(self, chat_id: int):
+        """Отметить, что выплаты по игре проведены"""
         pass
 
     @abstractmethod
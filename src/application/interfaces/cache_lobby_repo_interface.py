@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Callable
 
 from domain.entities import Lobby
 from application.schemas import LobbySchema
@@ -21,6 +22,14 @@ class CacheLobbyRepoInterface(ABC):
         """Получить лобби из кэша"""
         pass
 
+    @abstractmethod
+    async def get_lobbies(
+        self,
+        chat_ids: list[int],
+    ) -> dict[int, LobbySchema]:
+        """Получить несколько лобби за один запрос, без отсутствующих"""
+        pass
+
     @abstractmethod
     async def delete_lobby(
         self,
@@ -37,6 +46,19 @@ class CacheLobbyRepoInterface(ABC):
         """Проверить существование лобби"""
         pass
 
+    @abstractmethod
+    async def update_lobby(
+        self,
+        chat_id: int,
+        action: Callable[[LobbySchema | None], Lobby | None],
+    ) -> LobbySchema | None:
+        """Атомарно заменить лобби результатом action.
+
+        Если action вернул None, лобби не меняется. action может быть
+        вызван повторно и не должен иметь побочных эффектов.
+        """
+        pass
+
     @abstractmethod
     def with_lock(
         self,
@@ -49,3 +71,8 @@ class BaseCacheLobbyRepoTG(CacheLobbyRepoInterface):
     @abstractmethod
     async def push_starting(self, chat_id: int):
         pass
+
+    @abstractmethod
+    async def pop_starting(self, chat_id: int):
+        """Отправить лобби на запуск игры и удалить его"""
+        pass
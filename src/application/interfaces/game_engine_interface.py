@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+
+
+class GameEngineInterface(ABC):
+    """Частые переходы игры: загрузка, изменение и сохранение за один вызов.
+
+    Методы возвращают те же данные, что и методы Game, либо None,
+    если игры нет. Ошибки хода - исключения domain.types.game.
+    """
+
+    @abstractmethod
+    async def player_bid(
+        self,
+        chat_id: int,
+        player_id: int,
+        bid: int,
+    ) -> dict | None:
+        """Ставка игрока; если ставки сделали все - раздача в ключе the_deal"""
+        pass
+
+    @abstractmethod
+    async def player_hit(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        pass
+
+    @abstractmethod
+    async def player_stand(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        pass
+
+    @abstractmethod
+    async def set_out_for_player(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        """Исключить игрока за бездействие"""
+        pass
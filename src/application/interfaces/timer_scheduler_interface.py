@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class TimerSchedulerInterface(ABC):
+    """Хранилище таймеров вне процесса.
+
+    Таймер хранится как тип, chat_id, player_id и аргументы события, а
+    само событие при срабатывании находится по типу таймера, поэтому
+    сработать таймер может в любом процессе бота.
+    """
+
+    @abstractmethod
+    async def schedule(
+        self,
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None,
+        timeout: int,
+        args: tuple[Any, ...] = (),
+        kwargs: dict[str, Any] | None = None,
+    ):
+        """Поставить таймер; таймер с тем же ключом заменяется"""
+        pass
+
+    @abstractmethod
+    async def cancel(
+        self,
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None = None,
+    ) -> bool:
+        pass
+
+    @abstractmethod
+    async def exists(
+        self,
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None = None,
+    ) -> bool:
+        pass
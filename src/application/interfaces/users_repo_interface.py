@@ -73,3 +73,15 @@ class BaseTelegramUserRepo(UserRepoInterface):
         schema: bool = True,
     ):
         pass
+
+    @abstractmethod
+    async def debit_balance(self, tg_id: int, amount: int) -> bool:
+        """Атомарно списать amount, если на балансе хватает.
+        False - денег не хватает, баланс не изменен
+        """
+        pass
+
+    @abstractmethod
+    async def credit_balances(self, amounts: dict[int, int]):
+        """Атомарно зачислить суммы {tg_id: amount} одной транзакцией"""
+        pass
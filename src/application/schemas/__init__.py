@@ -1,6 +1,7 @@
 __all__ = (
     "LobbySchema",
     "CardSchema",
+    "DeckSchema",
     "DealerSchema",
     "GameSchema",
     "PlayerSchema",
@@ -10,6 +11,7 @@ __all__ = (
 )
 
 from .card import CardSchema
+from .deck import DeckSchema
 from .player import PlayerSchema
 from .user import UserSchema, UserCreate, UserPartial
 from .lobby import LobbySchema
@@ -1,8 +1,19 @@
-from pydantic import BaseModel
+from typing import Any
+
+from pydantic import BaseModel, model_validator
 
 from domain.entities import Rank, Suit
+from domain.entities.card import CARD_RANKS, CARD_SUITS
 
 
 class CardSchema(BaseModel):
     rank: Rank
     suit: Suit
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_code(cls, data: Any) -> Any:
+        # Движок хранит карты числами 0..51, схема принимает их как есть
+        if isinstance(data, int):
+            return {"rank": CARD_RANKS[data], "suit": CARD_SUITS[data]}
+        return data
@@ -0,0 +1,19 @@
+from typing import Any
+
+from pydantic import BaseModel, model_validator
+
+from application.schemas import CardSchema
+
+
+class DeckSchema(BaseModel):
+    seed: int | None = None
+    cursor: int = 0
+    cards: list[CardSchema] | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_cards_list(cls, data: Any) -> Any:
+        # Старые кэши хранят колоду списком оставшихся карт
+        if isinstance(data, list):
+            return {"cards": data}
+        return data
@@ -1,7 +1,7 @@
 from datetime import datetime
 from pydantic import BaseModel
 
-from application.schemas import CardSchema, DealerSchema, PlayerSchema
+from application.schemas import DealerSchema, DeckSchema, PlayerSchema
 
 
 class GameSchema(BaseModel):
@@ -9,7 +9,7 @@ class GameSchema(BaseModel):
     players: dict[int, PlayerSchema]
     turn_order: tuple[int, ...]
     dealer: DealerSchema
-    deck: list[CardSchema]
+    deck: DeckSchema
     created_at: datetime
     current_player_index: int
     current_round: int
@@ -0,0 +1,65 @@
+from typing import Callable
+
+from application.interfaces import CacheGameRepoInterface, GameEngineInterface
+from domain.entities import Game
+
+
+class PythonGameEngine(GameEngineInterface):
+    """Переходы методами Game через game_repo.update_game.
+
+    Атомарность обеспечивает репозиторий: redis.lock или WATCH/MULTI.
+    """
+
+    def __init__(self, game_repo: CacheGameRepoInterface):
+        self.game_repo = game_repo
+
+    async def _transition(
+        self,
+        chat_id: int,
+        action: Callable[[Game], dict],
+    ) -> dict | None:
+        return await self.game_repo.update_game(chat_id, action)
+
+    async def player_bid(
+        self,
+        chat_id: int,
+        player_id: int,
+        bid: int,
+    ) -> dict | None:
+        def action(game: Game) -> dict:
+            res = game.player_bid(player_id=player_id, bid=bid)
+            if res.get("all_bets"):
+                res["the_deal"] = game.the_deal()
+            return res
+
+        return await self._transition(chat_id, action)
+
+    async def player_hit(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        return await self._transition(
+            chat_id,
+            lambda game: game.player_hit(player_id=player_id),
+        )
+
+    async def player_stand(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        return await self._transition(
+            chat_id,
+            lambda game: game.player_stand(player_id=player_id),
+        )
+
+    async def set_out_for_player(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        return await self._transition(
+            chat_id,
+            lambda game: game.set_out_for_player(player_id),
+        )
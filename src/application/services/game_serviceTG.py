@@ -1,8 +1,11 @@
-from aiogram.types import Message
-
-from application.interfaces import BaseTelegramUserRepo, CacheGameRepoInterface
-from application.schemas import GameSchema, LobbySchema, UserPartial
-from application.services.timer_mng import timer_manager
+from application.interfaces import (
+    BaseTelegramUserRepo,
+    CacheGameRepoInterface,
+    GameEngineInterface,
+)
+from application.schemas import LobbySchema
+from application.services.game_engine import PythonGameEngine
+from application.services.timer_mng import TimerPayload, timer_manager
 from application.services.game_types import ResponseType, Response
 from domain.entities import Lobby, Game, Player
 from domain.types.game.exceptions import PlayerNotFound, AnotherPlayerTurn
@@ -26,9 +29,11 @@ class GameServiceTG:
         self,
         game_repo: CacheGameRepoInterface,
         user_repo: BaseTelegramUserRepo | None = None,
+        engine: GameEngineInterface | None = None,
     ):
         self.game_repo = game_repo
         self.user_repo = user_repo
+        self.engine = engine if engine is not None else PythonGameEngine(game_repo)
 
     async def apply_players_amount(
         self,
@@ -37,75 +42,92 @@ class GameServiceTG:
         if not players:
             return
         amounts = {player["player_id"]: player.get("amount") for player in players}
-        users_list = await self.user_repo.get_users_by_tg_ids(
-            tg_ids=list(amounts.keys())
-        )
-        users_update = {}
-        for user in users_list:
-            amount = amounts.get(user.tg_id)
-            users_update[user] = UserPartial(balance=user.balance + amount)
-        await self.user_repo.update_users(datas_update=users_update, partial=True)
+        await self.user_repo.credit_balances(amounts)
+
+    async def _settle(self, chat_id: int, players: list[dict]) -> bool:
+        """Выплатить и только после этого удалить игру.
+
+        Отметка расчета не дает выплатить дважды. Если процесс упал между
+        выплатами и удалением, игра остается в кэше, и повторный расчет
+        (например при восстановлении) удалит ее без новых выплат.
+        False - игру рассчитывает кто-то другой
+        """
+        state = await self.game_repo.claim_settlement(chat_id)
+        if state is None:
+            return False
+        if state == "claimed":
+            if await self.game_repo.get_game(chat_id) is None:
+                # Игру рассчитали и удалили, пока мы ее читали
+                await self.game_repo.release_settlement(chat_id)
+                return False
+            await self.apply_players_amount(players=players)
+            await self.game_repo.mark_settled(chat_id)
+        await self.game_repo.delete_cache_game(chat_id)
+        return True
 
     async def kick_afk(
         self,
-        message: Message,
-        player_id: int,
+        timer: TimerPayload,
     ):
-        chat_id = message.chat.id
-        async with self.game_repo.with_lock(chat_id):
-            game_schema = await self.game_repo.get_game(chat_id)
-            if game_schema is None:
-                return
-            game = Game.from_dto(game_schema)
-            res = game.set_out_for_player(player_id)
-            player = res.get("player")
+        chat_id = timer.chat_id
+        try:
+            res = await self.engine.set_out_for_player(chat_id, timer.player_id)
+        except PlayerNotFound:
+            return
+        if res is None:
+            return
+        player = res.get("player")
+        message = timer_manager.message(timer)
 
-            await message.answer(
-                f"Игрок {player.get("player_name")} исключен за бездействие."
-            )
-            await message.delete_reply_markup()
+        await message.answer(
+            f"Игрок {player.get("player_name")} исключен за бездействие."
+        )
+        await message.delete_reply_markup()
 
-            await self.game_repo.cache_game(game)
-            await handle_post_player_action(
-                response_data=res,
-                message=message,
-                game_service=self,
-            )
+        await handle_post_player_action(
+            response_data=res,
+            message=message,
+            game_service=self,
+        )
 
     async def bid_timer(
         self,
-        message: Message,
+        timer: TimerPayload,
     ):
-        chat_id = message.chat.id
-        async with self.game_repo.with_lock(chat_id):
-            game_schema = await self.game_repo.get_game(chat_id)
-            if game_schema is None:
-                return
-            game = Game.from_dto(game_schema)
+        chat_id = timer.chat_id
 
+        def action(game: Game) -> tuple[dict, bool]:
             res = game.set_out_for_non_bid_players()
-            out_players = res.get("out_players")
-            if out_players:
-                text = format_kicked_non_bid_players(players_data=out_players)
-                await message.answer(text)
+            return res, len(res.get("out_players")) == len(game.players)
+
+        updated = await self.game_repo.update_game(chat_id, action)
+        if updated is None:
+            return
+        res, all_out = updated
+        message = timer_manager.message(timer)
 
-            if len(out_players) == len(game.players):
-                await message.answer("Ставок нет, игра отменяется.")
-                await self.game_repo.delete_cache_game(chat_id)
-                return
+        out_players = res.get("out_players")
+        if out_players:
+            text = format_kicked_non_bid_players(players_data=out_players)
+            await message.answer(text)
 
-            await handle_post_player_action(
-                response_data=res,
-                message=message,
-                game_service=self,
-            )
-            await self.game_repo.set_game_state(chat_id)
-            await self.game_repo.cache_game(game)
+        if all_out:
+            await message.answer("Ставок нет, игра отменяется.")
+            await self.game_repo.delete_cache_game(chat_id)
+            return
+
+        await self.game_repo.set_game_state(chat_id)
+        await handle_post_player_action(
+            response_data=res,
+            message=message,
+            game_service=self,
+        )
 
     async def create_game(
         self,
         lobby_schema: LobbySchema,
-    ) -> GameSchema | None:
+    ) -> Game | None:
+        """Создать игру из лобби; None - в чате уже есть игра"""
         lobby = Lobby.from_dto(lobby_schema)
         players = {
             user.tg_id: Player(name=user.first_name, tg_id=user.tg_id)
@@ -116,12 +138,10 @@ class GameServiceTG:
             chat_id=chat_id,
             players=players,
         )
-        game_schema = await self.game_repo.cache_game(game=game)
-        await self.game_repo.set_bid_state(chat_id)
-        if not game_schema:
+        if not await self.game_repo.create_game(game):
             return None
-
-        return game_schema
+        await self.game_repo.set_bid_state(chat_id)
+        return game
 
     async def player_set_bid(
         self,
@@ -129,165 +149,146 @@ class GameServiceTG:
         user_tg_id: int,
         bid: int,
     ) -> Response | None:
-        async with self.game_repo.with_lock(chat_id):
-            game_schema = await self.game_repo.get_game(chat_id=chat_id)
-            if not game_schema:
-                return None
-
-            user_model = await self.user_repo.get_user_by_tg_id(
-                tg_id=user_tg_id,
-                schema=False,
+        # Ставка списывается до перехода и возвращается, если переход
+        # не состоялся
+        if not await self.user_repo.debit_balance(user_tg_id, bid):
+            return Response(
+                success=False,
+                type=ResponseType.BID_DENIED,
             )
-            if bid > user_model.balance:
-                return Response(
-                    success=False,
-                    type=ResponseType.BID_DENIED,
-                )
-
-            game = Game.from_dto(game_schema)
-            try:
-                res = game.player_bid(
-                    player_id=user_tg_id,
-                    bid=bid,
-                )
-            except PlayerNotFound:
-                return Response(
-                    success=False,
-                    type=ResponseType.PLAYER_NOT_FOUND,
-                )
-            if res.get("all_bets"):
-                timer_manager.cancel_timer(timer_type="game:bid", chat_id=chat_id)
-                res["the_deal"] = game.the_deal()
 
-            new_balance = user_model.balance - bid
-            update_user = UserPartial(balance=new_balance)
-            await self.user_repo.update_user(
-                user=user_model,
-                data_update=update_user,
-                partial=True,
+        refund = True
+        try:
+            res = await self.engine.player_bid(
+                chat_id=chat_id,
+                player_id=user_tg_id,
+                bid=bid,
             )
-            await self.game_repo.cache_game(game)
+            refund = res is None
+        except PlayerNotFound:
             return Response(
-                success=True,
-                type=ResponseType.BID_ACCEPTED,
-                data=res,
+                success=False,
+                type=ResponseType.PLAYER_NOT_FOUND,
             )
+        finally:
+            if refund:
+                await self.user_repo.credit_balances({user_tg_id: bid})
+        if res is None:
+            return None
+        if res.get("all_bets"):
+            await timer_manager.cancel_timer(timer_type="game:bid", chat_id=chat_id)
+
+        return Response(
+            success=True,
+            type=ResponseType.BID_ACCEPTED,
+            data=res,
+        )
 
     async def player_turn_hit(
         self,
         chat_id: int,
         user_tg_id: int,
     ) -> Response | None:
-        async with self.game_repo.with_lock(chat_id):
-            timer_manager.cancel_timer(
-                timer_type="game:turn",
+        await timer_manager.cancel_timer(
+            timer_type="game:turn",
+            chat_id=chat_id,
+            player_id=user_tg_id,
+        )
+        try:
+            res = await self.engine.player_hit(
                 chat_id=chat_id,
                 player_id=user_tg_id,
             )
-            game_schema = await self.game_repo.get_game(chat_id=chat_id)
-            if not game_schema:
-                return None
-
-            game = Game.from_dto(game_schema)
-            try:
-                res = game.player_hit(player_id=user_tg_id)
-            except AnotherPlayerTurn:
-                return Response(
-                    success=False,
-                    type=ResponseType.ANOTHER_PLAYER_TURN,
-                )
-            except PlayerNotFound:
-                return Response(
-                    success=False,
-                    type=ResponseType.PLAYER_NOT_FOUND,
-                )
-
-            await self.game_repo.cache_game(game)
+        except AnotherPlayerTurn:
             return Response(
-                success=True,
-                type=ResponseType.HIT_ACCEPTED,
-                data=res,
+                success=False,
+                type=ResponseType.ANOTHER_PLAYER_TURN,
             )
+        except PlayerNotFound:
+            return Response(
+                success=False,
+                type=ResponseType.PLAYER_NOT_FOUND,
+            )
+        if res is None:
+            return None
+
+        return Response(
+            success=True,
+            type=ResponseType.HIT_ACCEPTED,
+            data=res,
+        )
 
     async def player_turn_stand(
         self,
         chat_id: int,
         user_tg_id: int,
     ) -> Response | None:
-        async with self.game_repo.with_lock(chat_id):
-            timer_manager.cancel_timer(
-                timer_type="game:turn",
+        await timer_manager.cancel_timer(
+            timer_type="game:turn",
+            chat_id=chat_id,
+            player_id=user_tg_id,
+        )
+        try:
+            res = await self.engine.player_stand(
                 chat_id=chat_id,
                 player_id=user_tg_id,
             )
-            game_schema = await self.game_repo.get_game(chat_id=chat_id)
-            if not game_schema:
-                return None
-
-            game = Game.from_dto(game_schema)
-            try:
-                res = game.player_stand(player_id=user_tg_id)
-            except AnotherPlayerTurn:
-                return Response(
-                    success=False,
-                    type=ResponseType.ANOTHER_PLAYER_TURN,
-                )
-            except PlayerNotFound:
-                return Response(
-                    success=False,
-                    type=ResponseType.PLAYER_NOT_FOUND,
-                )
-
-            await self.game_repo.cache_game(game)
+        except AnotherPlayerTurn:
+            return Response(
+                success=False,
+                type=ResponseType.ANOTHER_PLAYER_TURN,
+            )
+        except PlayerNotFound:
             return Response(
-                success=True,
-                type=ResponseType.STAND_ACCEPTED,
-                data=res,
+                success=False,
+                type=ResponseType.PLAYER_NOT_FOUND,
             )
+        if res is None:
+            return None
+
+        return Response(
+            success=True,
+            type=ResponseType.STAND_ACCEPTED,
+            data=res,
+        )
 
     async def dealer_reveal_secret(
         self,
         chat_id: int,
     ):
-        async with self.game_repo.with_lock(chat_id):
-            game_schema = await self.game_repo.get_game(chat_id=chat_id)
-            if not game_schema:
-                return None
-
-            game = Game.from_dto(game_schema)
-
-            res = game.init_second_round()
-            await self.game_repo.cache_game(game)
-
-            return res
+        return await self.game_repo.update_game(
+            chat_id,
+            lambda game: game.init_second_round(),
+        )
 
     async def dealer_turns(self, chat_id: int):
-        async with self.game_repo.with_lock(chat_id):
-            game_schema = await self.game_repo.get_game(chat_id=chat_id)
-            if not game_schema:
-                return None
-
-            game = Game.from_dto(game_schema)
-
-            res = game.dealer_turns()
-
-            await self.game_repo.cache_game(game)
-
-            return res
+        return await self.game_repo.update_game(
+            chat_id,
+            lambda game: game.dealer_turns(),
+        )
 
     async def ending_game(self, chat_id: int):
-        async with self.game_repo.with_lock(chat_id):
-            game_schema = await self.game_repo.get_game(chat_id)
-            if not game_schema:
-                return None
-
-            game = Game.from_dto(game_schema)
-            res = game.result_of_game()
-            wins = res.get("wins")
-            push = res.get("push")
+        game = await self.game_repo.get_game(chat_id)
+        if game is None:
+            return None
+        res = game.result_of_game()
+        wins = res.get("wins")
+        push = res.get("push")
 
-            players = wins + push
-            await self.apply_players_amount(players=players)
+        if not await self._settle(chat_id, players=wins + push):
+            return None
+        return res
 
-            await self.game_repo.delete_cache_game(chat_id)
-            return res
+    async def cancel_game(self, chat_id: int) -> Game | None:
+        """Удалить игру без расчета и вернуть игрокам ставки"""
+        game = await self.game_repo.get_game(chat_id)
+        if game is None:
+            return None
+        bids = [
+            {"player_id": player.tg_id, "amount": player.bid}
+            for player in game.players.values()
+            if player.bid
+        ]
+        if not await self._settle(chat_id, players=bids):
+            return None
+        return game
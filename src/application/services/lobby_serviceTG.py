@@ -1,5 +1,3 @@
-from aiogram.types import Message
-
 from application.interfaces import BaseTelegramUserRepo
 from application.interfaces.cache_lobby_repo_interface import BaseCacheLobbyRepoTG
 from application.schemas import LobbySchema
@@ -36,27 +34,7 @@ class LobbyServiceTG:
         return User.from_dto(user_schema)
 
     async def _lobby_timer(self, chat_id: int):
-        async with self.lobby_repo.with_lock(chat_id):
-            await self.lobby_repo.push_starting(chat_id=chat_id)
-            await self.lobby_repo.delete_lobby(chat_id)
-
-    async def lobby_interval_timer(
-        self,
-        message: Message,
-        remaining_time: int,
-    ):
-        if remaining_time == 0:
-            await message.delete()
-        chat_id = message.chat.id
-        lobby_schema = await self.lobby_repo.get_lobby(chat_id)
-        if lobby_schema is None:
-            raise ValueError("Lobby schema can't be None")
-        text = (
-            f"Запущено лобби на игру.\n"
-            f"Игроки: {lobby_schema.names}\n"
-            f"Таймер: {remaining_time}"
-        )
-        await message.edit_text(text)
+        await self.lobby_repo.pop_starting(chat_id)
 
     async def create_lobby(
         self,
@@ -65,24 +43,33 @@ class LobbyServiceTG:
         first_name: str,
         timeout: int,
     ) -> LobbySchema | None:
-        async with self.lobby_repo.with_lock(chat_id):
-            lobby_schema = await self.lobby_repo.get_lobby(chat_id=chat_id)
+        user = await self._get_user_entities(
+            user_id=user_id,
+            first_name=first_name,
+        )
+
+        def action(lobby_schema: LobbySchema | None) -> Lobby | None:
             if lobby_schema:
                 return None
+            return Lobby(chat_id=chat_id, users=[user])
 
-            user_schema = await self.user_repo.get_user_by_tg_id(tg_id=user_id)
-            user_schema.first_name = first_name
-            user = User.from_dto(user_schema)
-            lobby = Lobby(chat_id=chat_id, users=[user])
-            timer_manager.create_timer(
-                "lobby",
-                chat_id,
-                self._lobby_timer,
-                None,
-                timeout,
-                chat_id,
-            )
-            return await self.lobby_repo.cache_lobby(lobby=lobby)
+        lobby_schema = await self.lobby_repo.update_lobby(chat_id, action)
+        if lobby_schema is None:
+            return None
+
+        await self.start_timer(chat_id, timeout)
+        return lobby_schema
+
+    async def start_timer(self, chat_id: int, timeout: int):
+        """Запустить игру лобби через timeout секунд"""
+        await timer_manager.create_timer(
+            "lobby",
+            chat_id,
+            self._lobby_timer,
+            None,
+            timeout,
+            chat_id,
+        )
 
     async def add_user(
         self,
@@ -90,8 +77,12 @@ class LobbyServiceTG:
         user_id: int,
         first_name: str,
     ) -> LobbySchema | None:
-        async with self.lobby_repo.with_lock(chat_id):
-            lobby_schema = await self.lobby_repo.get_lobby(chat_id=chat_id)
+        user = await self._get_user_entities(
+            user_id=user_id,
+            first_name=first_name,
+        )
+
+        def action(lobby_schema: LobbySchema | None) -> Lobby | None:
             if not lobby_schema:
                 return None
             if self._check_user_in_lobby(
@@ -100,21 +91,18 @@ class LobbyServiceTG:
             ):
                 return None
 
-            user = await self._get_user_entities(
-                user_id=user_id,
-                first_name=first_name,
-            )
             lobby = Lobby.from_dto(lobby_schema)
             lobby.add_user(user)
-            return await self.lobby_repo.cache_lobby(lobby=lobby)
+            return lobby
+
+        return await self.lobby_repo.update_lobby(chat_id, action)
 
     async def remove_user(
         self,
         chat_id: int,
         user_id: int,
     ) -> LobbySchema | None:
-        async with self.lobby_repo.with_lock(chat_id):
-            lobby_schema = await self.lobby_repo.get_lobby(chat_id=chat_id)
+        def action(lobby_schema: LobbySchema | None) -> Lobby | None:
             if not lobby_schema:
                 return None
             if not self._check_user_in_lobby(
@@ -125,7 +113,9 @@ class LobbyServiceTG:
 
             lobby = Lobby.from_dto(lobby_schema)
             lobby.delete_user(user_id)
-            return await self.lobby_repo.cache_lobby(lobby=lobby)
+            return lobby
+
+        return await self.lobby_repo.update_lobby(chat_id, action)
 
     async def cancel_lobby(
         self,
@@ -135,7 +125,7 @@ class LobbyServiceTG:
         if not res:
             return False
 
-        timer_manager.cancel_timer(
+        await timer_manager.cancel_timer(
             "lobby",
             chat_id,
             None,
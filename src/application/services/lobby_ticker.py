@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from functools import partial
+
+from aiogram.types import Message
+
+from application.interfaces.cache_lobby_repo_interface import CacheLobbyRepoInterface
+from utils.tg.outbound import Priority, send_in_background, send_priority
+
+logger = logging.getLogger(__name__)
+
+# После стольких ошибок редактирования отсчет лобби останавливается
+MAX_EDIT_ERRORS = 2
+
+
+def countdown_value(remaining: float) -> int:
+    """Оставшееся время для текста: шаг 5 секунд в последнюю минуту, дальше 30"""
+    step = 5 if remaining <= 60 else 30
+    return round(remaining / step) * step
+
+
+def format_lobby_text(names: str, remaining_time: int) -> str:
+    return f"Запущено лобби на игру.\n" f"Игроки: {names}\n" f"Таймер: {remaining_time}"
+
+
+@dataclass
+class LobbyCountdown:
+    message: Message
+    deadline: float
+    text: str
+    errors: int = 0
+
+
+class LobbyCountdownTicker:
+    """Один общий тик для сообщений с отсчетом всех лобби.
+
+    Раз в interval секунд читает все лобби с отсчетом одним MGET,
+    собирает текст и редактирует только те сообщения, текст которых
+    изменился. Правки растягиваются на spread тика, чтобы не упираться
+    в лимиты Telegram пачкой запросов.
+    """
+
+    def __init__(
+        self,
+        interval: float = 5,
+        spread: float = 0.8,
+    ):
+        self.interval = interval
+        self.spread = spread
+        self._countdowns: dict[int, LobbyCountdown] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._countdowns)
+
+    def add(self, message: Message, timeout: int):
+        """Вести отсчет в уже отправленном message с текстом format_lobby_text"""
+        loop = asyncio.get_running_loop()
+        self._countdowns[message.chat.id] = LobbyCountdown(
+            message=message,
+            deadline=loop.time() + timeout,
+            text=message.text or "",
+        )
+        self._wakeup.set()
+
+    def remove(self, chat_id: int) -> bool:
+        return self._countdowns.pop(chat_id, None) is not None
+
+    async def tick(self, lobby_repo: CacheLobbyRepoInterface):
+        now = asyncio.get_running_loop().time()
+        lobbies = await lobby_repo.get_lobbies(list(self._countdowns))
+
+        edits: list[tuple[LobbyCountdown, str]] = []
+        for chat_id, countdown in list(self._countdowns.items()):
+            remaining = countdown_value(countdown.deadline - now)
+            lobby_schema = lobbies.get(chat_id)
+            if lobby_schema is None or remaining <= 0:
+                # Лобби отменено или уже запускается
+                del self._countdowns[chat_id]
+                continue
+            text = format_lobby_text(lobby_schema.names, remaining)
+            if text != countdown.text:
+                edits.append((countdown, text))
+
+        if not edits:
+            return
+        gap = self.interval * self.spread / len(edits)
+        for i, (countdown, text) in enumerate(edits):
+            if i:
+                await asyncio.sleep(gap)
+            # Правка не ждет очереди чата и заменит в ней прошлую, если та
+            # еще не ушла
+            with send_priority(Priority.LOW):
+                send_in_background(
+                    countdown.message.edit_text(text),
+                    on_error=partial(self._edit_failed, countdown),
+                )
+            countdown.text = text
+
+    def _edit_failed(self, countdown: LobbyCountdown, error: BaseException):
+        chat_id = countdown.message.chat.id
+        countdown.errors += 1
+        logger.error("Lobby countdown edit failed, chat %r", chat_id, exc_info=error)
+        if (
+            countdown.errors >= MAX_EDIT_ERRORS
+            and self._countdowns.get(chat_id) is countdown
+        ):
+            self.remove(chat_id)
+
+    async def run(self, lobby_repo: CacheLobbyRepoInterface):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if not self._countdowns:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                next_tick = loop.time()
+            next_tick += self.interval
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+            try:
+                await self.tick(lobby_repo)
+            except Exception:
+                logger.exception("Lobby countdown tick failed")
+
+
+lobby_ticker = LobbyCountdownTicker()
@@ -1,93 +1,90 @@
-import asyncio
 import logging
+from dataclasses import asdict, dataclass
 from functools import partial
 from typing import Callable, Any, Awaitable
 
+from aiogram import Bot
+from aiogram.types import Chat, Message
+
+from application.interfaces.timer_scheduler_interface import TimerSchedulerInterface
+from application.services.timing_wheel import TimingWheel
+from utils.clock import get_clock
+
 logger = logging.getLogger(__name__)
 
 
-class EventTimer:
-    def __init__(
-        self,
-        id_: str,
-        timeout: int,
-        event: Callable[..., Awaitable[Any]],
-        *args,
-        **kwargs,
-    ):
-        self.id = id_
-        self.timeout = timeout
-        self.event = partial(event, *args, **kwargs)
-
-        self._task: asyncio.Task | None = None
-
-    async def _timer_start(self):
-        await asyncio.sleep(self.timeout)
-        try:
-            await self.event()
-        except Exception as e:
-            import traceback
-
-            logger.error(
-                "EventTimer error id=%s: %s\nTraceback:%s",
-                self.id,
-                e,
-                traceback.format_exc(),
-            )
+@dataclass(frozen=True, slots=True)
+class TimerPayload:
+    """Сообщение, к которому относится таймер, без объекта Message.
 
-    def start(self):
-        self._task = asyncio.create_task(self._timer_start())
+    Таймер хранит только идентификаторы, а сообщение собирается заново
+    при срабатывании (as_message). Так таймер не держит граф pydantic
+    объектов до конца ожидания и его можно сохранить в Redis.
+    """
 
-    def cancel(self):
-        if self._task is None:
-            logger.warning("Timer id=%s not found.", self.id)
-            return
-        self._task.cancel()
+    chat_id: int
+    message_id: int
+    player_id: int | None = None
+    kind: str = ""
+
+    @classmethod
+    def from_message(
+        cls,
+        message: Message,
+        kind: str,
+        player_id: int | None = None,
+    ) -> "TimerPayload":
+        return cls(
+            chat_id=message.chat.id,
+            message_id=message.message_id,
+            player_id=player_id,
+            kind=kind,
+        )
 
-    def __str__(self):
-        return f"Timer id={self.id}, timeout={self.timeout}"
+    def as_message(self, bot: Bot) -> Message:
+        # Для методов сообщения нужны только чат и message_id
+        return Message(
+            message_id=self.message_id,
+            date=get_clock().now(),
+            chat=Chat(id=self.chat_id, type="group"),
+        ).as_(bot)
 
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
 
-class IntervalEventTimer(EventTimer):
-    def __init__(
-        self,
-        id_: str,
-        timeout: int,
-        interval: int,
-        event: Callable[..., Awaitable[Any]],
-        *args,
-        **kwargs,
-    ):
-        super().__init__(id_, timeout, event, *args, **kwargs)
-        self.interval = interval
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TimerPayload":
+        return cls(**data)
 
-    async def _timer_start(self):
-        remaining_time = self.timeout
 
-        err_count = 0
-        while remaining_time > self.interval:
-            await asyncio.sleep(self.interval)
-            remaining_time -= self.interval
+class TimersManager:
+    """Таймеры игр и лобби.
 
-            try:
-                await self.event(remaining_time=remaining_time)
-            except Exception as e:
-                import traceback
+    По умолчанию таймеры лежат в колесе таймеров этого процесса. С
+    планировщиком (use_scheduler) таймеры хранятся в нем, а event при
+    срабатывании берется из событий, зарегистрированных в планировщике
+    по типу таймера.
 
-                err_count += 1
-                logger.error(
-                    "IntervalTimer error while executing event id=%s: %s\nTraceback:%s",
-                    self.id,
-                    e,
-                    traceback.format_exc(),
-                )
-                if err_count == 2:
-                    break
+    Сообщения передаются в таймеры как TimerPayload, а бот для их сборки
+    задается один раз через use_bot.
+    """
 
+    def __init__(self, wheel: TimingWheel | None = None):
+        self.wheel = wheel if wheel is not None else TimingWheel()
+        self.scheduler: TimerSchedulerInterface | None = None
+        self.bot: Bot | None = None
 
-class TimersManager:
-    def __init__(self):
-        self._timers: dict[str, EventTimer] = {}
+    def use_scheduler(self, scheduler: TimerSchedulerInterface | None):
+        self.scheduler = scheduler
+
+    def use_bot(self, bot: Bot):
+        self.bot = bot
+
+    def message(self, payload: TimerPayload) -> Message:
+        """Сообщение таймера для ответа и правок ботом этого процесса"""
+        if self.bot is None:
+            raise RuntimeError("Bot for timers is not set, call use_bot first")
+        return payload.as_message(self.bot)
 
     @staticmethod
     def _get_timer_key(
@@ -99,7 +96,7 @@ class TimersManager:
             return f"{timer_type}:{chat_id}:{player_id}"
         return f"{timer_type}:{chat_id}"
 
-    def create_timer(
+    async def create_timer(
         self,
         timer_type: str,
         chat_id: int,
@@ -109,50 +106,42 @@ class TimersManager:
         *args,
         **kwargs,
     ):
+        if self.scheduler is not None:
+            await self.scheduler.schedule(
+                timer_type, chat_id, player_id, timeout, args, kwargs
+            )
+            return
+
         timer_key = self._get_timer_key(
             timer_type=timer_type,
             chat_id=chat_id,
             player_id=player_id,
         )
 
-        timer = EventTimer(timer_key, timeout, event, *args, **kwargs)
-        timer.start()
-        self._timers[timer_key] = timer
+        self.wheel.schedule(timer_key, timeout, partial(event, *args, **kwargs))
 
-    def create_interval_timer(
+    async def cancel_timer(
         self,
         timer_type: str,
         chat_id: int,
-        event: Callable[..., Awaitable[Any]],
-        player_id: int | None = None,
-        timeout: int = 30,
-        interval: int = 5,
-        *args,
-        **kwargs,
-    ):
-        timer_key = self._get_timer_key(
-            timer_type=timer_type,
-            chat_id=chat_id,
-            player_id=player_id,
-        )
+        player_id: int = None,
+    ) -> bool:
+        if self.scheduler is not None:
+            return await self.scheduler.cancel(timer_type, chat_id, player_id)
 
-        timer = IntervalEventTimer(timer_key, timeout, interval, event, *args, **kwargs)
-        timer.start()
-        self._timers[timer_key] = timer
+        timer_key = self._get_timer_key(timer_type, chat_id, player_id)
+        return self.wheel.cancel(timer_key)
 
-    def cancel_timer(
+    async def has_timer(
         self,
         timer_type: str,
         chat_id: int,
         player_id: int = None,
     ) -> bool:
-        timer_key = self._get_timer_key(timer_type, chat_id, player_id)
+        if self.scheduler is not None:
+            return await self.scheduler.exists(timer_type, chat_id, player_id)
 
-        if timer_key in self._timers:
-            self._timers[timer_key].cancel()
-            del self._timers[timer_key]
-            return True
-        return False
+        return self._get_timer_key(timer_type, chat_id, player_id) in self.wheel
 
 
 timer_manager = TimersManager()
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import math
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+WheelEvent = Callable[..., Awaitable[Any]]
+
+
+class WheelTimer:
+    __slots__ = ("key", "deadline", "event")
+
+    def __init__(self, key: str, deadline: int, event: WheelEvent):
+        self.key = key
+        self.deadline = deadline
+        self.event = event
+
+
+class TimingWheel:
+    """Иерархическое колесо таймеров с одной задачей-драйвером.
+
+    Уровень 0 - slots ячеек по tick секунд, каждый следующий уровень
+    в slots раз грубее. Таймер лежит в ячейке словарем по ключу, поэтому
+    добавление и отмена - O(1). Когда драйвер доходит до ячейки верхнего
+    уровня, ее таймеры раскладываются по нижним. Драйвер спит до ближайшего
+    тика, на котором есть работа. Сработавший таймер сразу удаляется из
+    колеса, событие выполняется отдельной задачей.
+    """
+
+    def __init__(
+        self,
+        tick: float = 0.1,
+        slots: int = 64,
+        levels: int = 3,
+    ):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._wheels: list[list[dict[str, WheelTimer]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._timers: dict[str, tuple[WheelTimer, dict[str, WheelTimer]]] = {}
+        self._current = 0
+        self._started_at: float | None = None
+        self._driver: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._timers
+
+    def _now_ticks(self) -> int:
+        loop = asyncio.get_running_loop()
+        if self._started_at is None:
+            self._started_at = loop.time()
+        # Поправка на ошибку округления ровно на границе тика
+        return int((loop.time() - self._started_at) / self.tick + 1e-6)
+
+    def _place(self, timer: WheelTimer):
+        delta = max(timer.deadline - self._current, 0)
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots:
+                index = (timer.deadline // span) % self.slots
+                break
+            span *= self.slots
+        else:
+            # Дальше верхнего уровня - в ячейку, до которой драйвер дойдет
+            # последней, при раскладке таймер встанет снова
+            level = self.levels - 1
+            span //= self.slots
+            index = (self._current // span - 1) % self.slots
+        bucket = self._wheels[level][index]
+        bucket[timer.key] = timer
+        self._timers[timer.key] = (timer, bucket)
+
+    def schedule(self, key: str, delay: float, event: WheelEvent):
+        """Поставить таймер; таймер с тем же ключом заменяется"""
+        self.cancel(key)
+        now = self._now_ticks()
+        if not self._timers:
+            # Колесо пустое - догонять пропущенные тики незачем
+            self._current = now
+        timer = WheelTimer(
+            key=key,
+            deadline=max(now + math.ceil(delay / self.tick), self._current + 1),
+            event=event,
+        )
+        self._place(timer)
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+        self._wakeup.set()
+
+    def cancel(self, key: str) -> bool:
+        item = self._timers.pop(key, None)
+        if item is None:
+            return False
+        timer, bucket = item
+        del bucket[key]
+        return True
+
+    def _advance(self):
+        self._current += 1
+        span = 1
+        for level in range(1, self.levels):
+            span *= self.slots
+            if self._current % span:
+                break
+            bucket = self._wheels[level][(self._current // span) % self.slots]
+            timers = list(bucket.values())
+            bucket.clear()
+            for timer in timers:
+                self._place(timer)
+
+        bucket = self._wheels[0][self._current % self.slots]
+        if not bucket:
+            return
+        timers = list(bucket.values())
+        bucket.clear()
+        for timer in timers:
+            del self._timers[timer.key]
+            self._fire(timer)
+
+    def _fire(self, timer: WheelTimer):
+        task = asyncio.create_task(self._run_event(timer.key, timer.event()))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _run_event(key: str, coro: Awaitable[Any]):
+        try:
+            await coro
+        except Exception:
+            logger.exception("Timer event error id=%s", key)
+
+    def _next_tick(self) -> int:
+        """Ближайший тик с таймерами уровня 0 или с раскладкой верхних уровней"""
+        boundary = (self._current // self.slots + 1) * self.slots
+        for tick in range(self._current + 1, boundary):
+            if self._wheels[0][tick % self.slots]:
+                return tick
+        return boundary
+
+    async def _drive(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._timers:
+                await self._wakeup.wait()
+                continue
+            # Спим до ближайшего тика с работой; новый таймер будит раньше
+            next_at = self._started_at + self._next_tick() * self.tick
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    timeout=max(next_at - loop.time(), 0),
+                )
+            except asyncio.TimeoutError:
+                pass
+            now = self._now_ticks()
+            while self._current < now and self._timers:
+                self._advance()
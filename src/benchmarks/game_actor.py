@@ -0,0 +1,48 @@
+"""Задержка перехода игры: Redis-репозиторий против актора в памяти.
+
+Запуск из каталога src (нужен Redis):
+    REDIS_URL=redis://localhost:6379/15 python -m benchmarks.game_actor
+"""
+
+import asyncio
+import os
+import time
+
+from redis.asyncio import Redis
+
+from infrastructure.repositories import ActorGameCacheRepo, RedisHashGameCacheRepo
+from benchmarks.game_codec import make_game
+
+ACTIONS = 5_000
+
+
+async def bench(repo, label: str):
+    game = make_game(players_count=4)
+    chat_id = game.chat_id
+    await repo.cache_game(game)
+    player_id = game.turn_order[0]
+
+    start = time.perf_counter()
+    for i in range(ACTIONS):
+        await repo.update_game(
+            chat_id,
+            lambda game: game.player_bid(player_id=player_id, bid=i + 1),
+        )
+    elapsed = time.perf_counter() - start
+    print(f"{label:>6}: {elapsed / ACTIONS * 1e6:8.1f} us/action")
+    return chat_id
+
+
+async def main():
+    redis = Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/15"))
+    store = RedisHashGameCacheRepo(redis=redis)
+    chat_id = await bench(store, "redis")
+    actors = ActorGameCacheRepo(store=store)
+    await bench(actors, "actor")
+    await actors.close()
+    await store.delete_cache_game(chat_id)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
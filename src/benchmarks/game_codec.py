@@ -0,0 +1,57 @@
+"""Сравнение форматов кэша игры: JSON через GameSchema против BinaryGameCodec.
+
+Запуск из каталога src:
+    python -m benchmarks.game_codec
+"""
+
+import timeit
+
+from domain.entities import Deck, Game, Player
+from infrastructure.redis_py.game_codec import (
+    BinaryGameCodec,
+    GameCodec,
+    JsonGameCodec,
+)
+
+REPEAT = 5
+NUMBER = 2000
+
+
+def make_game(players_count: int) -> Game:
+    players = {
+        tg_id: Player(name=f"Игрок {tg_id}", tg_id=tg_id)
+        for tg_id in range(1, players_count + 1)
+    }
+    game = Game(chat_id=-1001234567890, players=players, deck=Deck(seed=42))
+    for tg_id in players:
+        game.player_bid(tg_id, 50)
+    game.the_deal()
+    return game
+
+
+def bench(codec: GameCodec, game: Game) -> tuple[int, float, float]:
+    blob = codec.encode(game)
+    encode = timeit.Timer(lambda: codec.encode(game))
+    decode = timeit.Timer(lambda: codec.decode(blob))
+    encode_time = min(encode.repeat(repeat=REPEAT, number=NUMBER)) / NUMBER
+    decode_time = min(decode.repeat(repeat=REPEAT, number=NUMBER)) / NUMBER
+    return len(blob), encode_time, decode_time
+
+
+def main():
+    codecs = {"json": JsonGameCodec(), "binary": BinaryGameCodec()}
+    print(
+        f"{'players':>7} {'codec':>7} {'bytes':>7} {'encode us':>10} {'decode us':>10}"
+    )
+    for players_count in (1, 4, 8):
+        game = make_game(players_count)
+        for name, codec in codecs.items():
+            size, encode_time, decode_time = bench(codec, game)
+            print(
+                f"{players_count:>7} {name:>7} {size:>7} "
+                f"{encode_time * 1e6:>10.1f} {decode_time * 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
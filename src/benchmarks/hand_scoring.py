@@ -0,0 +1,88 @@
+"""Сравнение подсчета очков: пересчет всей руки против счетчиков Hand.
+
+Запуск из каталога src:
+    python -m benchmarks.hand_scoring
+"""
+
+import timeit
+from dataclasses import dataclass
+
+from domain.entities import Dealer, Game, Player
+from domain.entities.deck import Deck
+from domain.entities.card import CARD_IS_ACE, CARD_VALUES
+
+PLAYERS = 6
+REPEAT = 5
+NUMBER = 2000
+
+
+def _recalculate_score(cards) -> int:
+    if not cards:
+        return 0
+
+    score = sum(CARD_VALUES[card] for card in cards)
+
+    aces_count = sum(CARD_IS_ACE[card] for card in cards)
+    while score > 21 and aces_count > 0:
+        score -= 10
+        aces_count -= 1
+
+    return score
+
+
+@dataclass
+class RecalculatingPlayer(Player):
+    @property
+    def score(self):
+        return _recalculate_score(self.cards)
+
+    def has_blackjack(self) -> bool:
+        return len(self.cards) == 2 and self.score == 21
+
+    def is_busted(self) -> bool:
+        return self.score > 21
+
+
+@dataclass
+class RecalculatingDealer(Dealer):
+    @property
+    def score(self):
+        return _recalculate_score(self.cards)
+
+
+def play_game(player_cls: type[Player], dealer_cls: type[Dealer], seed: int):
+    players = {
+        tg_id: player_cls(name=str(tg_id), tg_id=tg_id) for tg_id in range(PLAYERS)
+    }
+    game = Game(chat_id=1, players=players, dealer=dealer_cls(), deck=Deck(seed))
+    for tg_id in players:
+        game.player_bid(tg_id, 10)
+    game.the_deal()
+    game.init_second_round()
+    while (player := game.get_current_turn_player()) is not None:
+        if player.result is not None or player.score >= 17:
+            game.player_stand(player.tg_id)
+            continue
+        game.player_hit(player.tg_id)
+    return game.result_of_game()
+
+
+def bench(player_cls: type[Player], dealer_cls: type[Dealer]) -> float:
+    timer = timeit.Timer(lambda: play_game(player_cls, dealer_cls, seed=42))
+    return min(timer.repeat(repeat=REPEAT, number=NUMBER)) / NUMBER
+
+
+def main():
+    assert play_game(Player, Dealer, 7) == play_game(
+        RecalculatingPlayer, RecalculatingDealer, 7
+    )
+    recalculated = bench(RecalculatingPlayer, RecalculatingDealer)
+    incremental = bench(Player, Dealer)
+    print(f"players per game: {PLAYERS}")
+    print(f"recalculate: {recalculated * 1e6:8.1f} us/game")
+    print(f"incremental: {incremental * 1e6:8.1f} us/game")
+    print(f"speedup:     {recalculated / incremental:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
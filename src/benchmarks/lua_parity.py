@@ -0,0 +1,171 @@
+"""Сверка RedisLuaGameEngine с domain.entities.game.Game.
+
+Проигрывает случайные игры: ставки, взятия карт, остановки и исключения
+игроков в порядке, возможном в настоящей игре. Каждый шаг выполняется
+скриптом Lua в Redis и методом Game над тем же состоянием. Ответы,
+ошибки и состояние после шага должны совпасть. При первом расхождении
+скрипт завершается с кодом 1, при любом другом исключении - с его
+трассировкой.
+
+Запуск из каталога src (нужен настоящий Redis: в Lua fakeredis нет
+библиотеки struct; ключи Game:-N перезаписываются):
+    REDIS_URL=redis://localhost:6379/15 python -m benchmarks.lua_parity [games]
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+from redis.asyncio import Redis
+
+from domain.entities import Deck, Game, Player
+from domain.entities.deck import SEED_BITS
+from domain.types.game.exceptions import GameError
+from infrastructure.redis_py.game_codec import BinaryGameCodec
+from infrastructure.redis_py.lua_game_engine import RedisLuaGameEngine
+
+STEPS_PER_GAME = 60
+UNKNOWN_PLAYER_ID = 12345
+
+
+class ParityMismatch(Exception):
+    pass
+
+
+def random_game(rnd: random.Random, chat_id: int) -> Game:
+    players = {}
+    for i in range(rnd.randint(1, 5)):
+        tg_id = rnd.randint(1, 10**10)
+        name = rnd.choice([f"Игрок {i}", None])
+        players[tg_id] = Player(name=name, tg_id=tg_id)
+    if rnd.random() < 0.9:
+        deck = Deck(seed=rnd.getrandbits(SEED_BITS))
+    else:
+        deck = Deck.from_cards(rnd.sample(range(52), 52))
+    return Game(chat_id=chat_id, players=players, deck=deck)
+
+
+def apply_to_game(game: Game, action: str, player_id: int, bid: int) -> dict:
+    if action == "bid":
+        res = game.player_bid(player_id=player_id, bid=bid)
+        if res.get("all_bets"):
+            res["the_deal"] = game.the_deal()
+        return res
+    if action == "hit":
+        return game.player_hit(player_id=player_id)
+    if action == "stand":
+        return game.player_stand(player_id=player_id)
+    return game.set_out_for_player(player_id)
+
+
+async def apply_to_engine(
+    engine: RedisLuaGameEngine,
+    chat_id: int,
+    action: str,
+    player_id: int,
+    bid: int,
+) -> dict | None:
+    if action == "bid":
+        return await engine.player_bid(chat_id, player_id, bid)
+    if action == "hit":
+        return await engine.player_hit(chat_id, player_id)
+    if action == "stand":
+        return await engine.player_stand(chat_id, player_id)
+    return await engine.set_out_for_player(chat_id, player_id)
+
+
+def next_step(rnd: random.Random, game: Game) -> tuple[str, int, int] | None:
+    """Следующее действие, возможное в настоящей игре, None - игра окончена.
+
+    Пока идут ставки, ставят игроки без ставки; после раздачи ходит
+    текущий игрок, изредка - чужой или неизвестный, чтобы сверить ошибки.
+    """
+    bid = rnd.randint(5, 100)
+    if game.is_bidding():
+        waiting = [player.tg_id for player in game._get_non_bid_players()]
+        if rnd.random() < 0.1:
+            return "bid", UNKNOWN_PLAYER_ID, bid
+        return "bid", rnd.choice(waiting), bid
+
+    current = game.get_current_turn_player()
+    if current is None:
+        return None
+    action = rnd.choice(("hit", "hit", "hit", "stand", "out"))
+    player_id = current.tg_id
+    if action != "out" and rnd.random() < 0.1:
+        player_id = rnd.choice([*game.players, UNKNOWN_PLAYER_ID])
+    return action, player_id, bid
+
+
+async def check_game(
+    redis: Redis,
+    engine: RedisLuaGameEngine,
+    codec: BinaryGameCodec,
+    seed: int,
+) -> int:
+    """Сверить одну игру, ParityMismatch - при первом расхождении"""
+    rnd = random.Random(seed)
+    chat_id = -(seed + 1)
+    key = engine._get_key(chat_id)
+    game = random_game(rnd, chat_id)
+    await redis.delete(key)
+    await redis.hset(key, mapping=codec.encode_fields(game))
+
+    checked = 0
+    for _ in range(STEPS_PER_GAME):
+        expected_game = codec.decode_fields(await redis.hgetall(key))
+        step = next_step(rnd, expected_game)
+        if step is None:
+            break
+        action, player_id, bid = step
+        context = f"seed={seed} step={checked} action={action} player={player_id}"
+
+        try:
+            try:
+                expected = apply_to_game(expected_game, action, player_id, bid)
+                expected_error = None
+            except GameError as e:
+                expected, expected_error = None, type(e)
+            try:
+                got = await apply_to_engine(engine, chat_id, action, player_id, bid)
+                got_error = None
+            except GameError as e:
+                got, got_error = None, type(e)
+        except Exception as e:
+            e.add_note(context)
+            raise
+
+        if got_error is not expected_error:
+            raise ParityMismatch(f"{context}: {got_error} != {expected_error}")
+        if got != expected:
+            raise ParityMismatch(f"{context}:\n{got}\n!=\n{expected}")
+        got_game = codec.decode_fields(await redis.hgetall(key))
+        if codec.encode(got_game) != codec.encode(expected_game):
+            raise ParityMismatch(f"{context}: game state differs")
+        checked += 1
+
+    await redis.delete(key)
+    return checked
+
+
+async def main() -> int:
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    redis = Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/15"))
+    engine = RedisLuaGameEngine(redis=redis)
+    codec = BinaryGameCodec()
+    steps = 0
+    try:
+        for seed in range(games):
+            steps += await check_game(redis, engine, codec, seed)
+    except ParityMismatch as e:
+        print(f"MISMATCH {e}", file=sys.stderr)
+        return 1
+    finally:
+        await redis.aclose()
+    print(f"games: {games}, steps checked: {steps}, all match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
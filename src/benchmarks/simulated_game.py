@@ -0,0 +1,224 @@
+"""Полный цикл игры в виртуальном времени.
+
+Лобби -> таймер лобби -> ставки (один игрок не ставит, его исключает
+таймер ставок) -> таймеры хода исключают остальных -> ходы дилера ->
+расчет. Telegram подменен сессией без сети, пользователи хранятся в
+памяти, игры и лобби - в Redis. Все таймеры и паузы идут в
+виртуальном времени, поэтому сотни игр по минуте проходят за секунды.
+
+Запуск из каталога src (нужны настройки .env и Redis):
+    REDIS_URL=redis://localhost:6379/15 SIM_CHATS=200 python -m benchmarks.simulated_game
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage
+from aiogram.types import Chat, Message
+from redis.asyncio import Redis
+
+from application.interfaces import BaseTelegramUserRepo
+from application.schemas import LobbySchema, UserSchema
+from application.services import GameServiceTG, LobbyServiceTG
+from application.services.timer_mng import TimerPayload, timer_manager
+from infrastructure.repositories import RedisGameCacheRepo, RedisLobbyCacheRepoTG
+from utils.clock import get_clock, run_simulated
+
+CHATS = int(os.environ.get("SIM_CHATS", 200))
+STREAM_KEY = "sim:game:starting"
+LOBBY_TIMEOUT = 15
+BID = 10
+
+
+class SimulatedSession(BaseSession):
+    """Сессия бота без сети: считает запросы и возвращает сообщения"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests: Counter[str] = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method, timeout: int | None = None):
+        self.requests[type(method).__name__] += 1
+        if isinstance(method, (SendMessage, EditMessageText, EditMessageReplyMarkup)):
+            message_id = getattr(method, "message_id", None)
+            if message_id is None:
+                self._message_id += 1
+                message_id = self._message_id
+            return Message(
+                message_id=message_id,
+                date=get_clock().now(),
+                chat=Chat(id=method.chat_id, type="group"),
+                text=getattr(method, "text", None),
+            ).as_(bot)
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+@dataclass(eq=False)
+class MemoryUser:
+    id: int
+    tg_id: int
+    first_name: str | None
+    username: str | None
+    balance: int
+    registered_at: datetime
+    date_bonus: datetime
+
+
+class MemoryUserRepo(BaseTelegramUserRepo):
+    def __init__(self):
+        self.users: dict[int, MemoryUser] = {}
+
+    def add(self, tg_id: int, balance: int = 1000):
+        now = get_clock().now()
+        self.users[tg_id] = MemoryUser(
+            id=tg_id,
+            tg_id=tg_id,
+            first_name=f"user{tg_id}",
+            username=None,
+            balance=balance,
+            registered_at=now,
+            date_bonus=now,
+        )
+
+    async def create_user(self, user_in):
+        raise NotImplementedError
+
+    async def get_user_by_id(self, id: int):
+        return await self.get_user_by_tg_id(id)
+
+    async def get_user_by_tg_id(self, tg_id: int, schema: bool = True):
+        user = self.users.get(tg_id)
+        if user is None or not schema:
+            return user
+        return UserSchema.model_validate(user, from_attributes=True)
+
+    async def get_users_by_tg_ids(self, tg_ids: list[int], schema: bool = True):
+        return [self.users[tg_id] for tg_id in tg_ids if tg_id in self.users]
+
+    async def update_user(self, user, data_update, partial: bool = False):
+        for name, value in data_update.model_dump(exclude_unset=partial).items():
+            setattr(user, name, value)
+        return UserSchema.model_validate(user, from_attributes=True)
+
+    async def debit_balance(self, tg_id: int, amount: int) -> bool:
+        user = self.users.get(tg_id)
+        if user is None or user.balance < amount:
+            return False
+        user.balance -= amount
+        return True
+
+    async def credit_balances(self, amounts: dict[int, int]):
+        for tg_id, amount in amounts.items():
+            self.users[tg_id].balance += amount
+
+    async def update_users(self, datas_update, partial: bool = False):
+        for user, data_update in datas_update.items():
+            await self.update_user(user, data_update, partial)
+
+    async def delete_user(self, user):
+        self.users.pop(user.tg_id, None)
+
+
+async def start_games(redis: Redis, bot: Bot, game_service: GameServiceTG):
+    """Как GameStartingListener, но простым чтением стрима"""
+    last_id = "0"
+    while True:
+        reply = await redis.xread({STREAM_KEY: last_id}, count=100)
+        if not reply:
+            await asyncio.sleep(0.5)
+            continue
+        for msg_id, data in reply[0][1]:
+            last_id = msg_id
+            lobby_schema = LobbySchema.model_validate_json(data[b"lobby_data"])
+            chat_id = lobby_schema.chat_id
+            await game_service.create_game(lobby_schema=lobby_schema)
+            msg = await bot.send_message(chat_id, "Делайте ставки к началу игры.")
+            await timer_manager.create_timer(
+                "game:bid",
+                chat_id,
+                game_service.bid_timer,
+                None,
+                30,
+                TimerPayload.from_message(msg, "game:bid"),
+            )
+
+
+async def play(
+    chat_id: int,
+    players: list[int],
+    lobby_service: LobbyServiceTG,
+    game_service: GameServiceTG,
+) -> float:
+    """Сыграть одну игру, вернуть ее длительность в виртуальных секундах"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first, *others = players
+    await lobby_service.create_lobby(chat_id, first, f"user{first}", LOBBY_TIMEOUT)
+    for player_id in others:
+        await lobby_service.add_user(chat_id, player_id, f"user{player_id}")
+
+    await asyncio.sleep(LOBBY_TIMEOUT + 5)
+    # Последний игрок не ставит - его исключит таймер ставок
+    for player_id in players[:-1]:
+        await game_service.player_set_bid(chat_id, player_id, BID)
+
+    while await game_service.game_repo.get_game(chat_id) is not None:
+        await asyncio.sleep(1)
+    return loop.time() - started
+
+
+async def main():
+    redis = Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/15"))
+    session = SimulatedSession()
+    bot = Bot("1:simulated", session=session)
+    timer_manager.use_bot(bot)
+    user_repo = MemoryUserRepo()
+    game_service = GameServiceTG(
+        game_repo=RedisGameCacheRepo(redis=redis),
+        user_repo=user_repo,
+    )
+    lobby_service = LobbyServiceTG(
+        lobby_repo=RedisLobbyCacheRepoTG(redis=redis, stream_key=STREAM_KEY),
+        user_repo=user_repo,
+    )
+
+    chats = {-(10**12) - i: [i * 3 + 1, i * 3 + 2, i * 3 + 3] for i in range(CHATS)}
+    for players in chats.values():
+        for player_id in players:
+            user_repo.add(player_id)
+
+    starter = asyncio.create_task(start_games(redis, bot, game_service))
+    real_started = time.perf_counter()
+    durations = await asyncio.gather(
+        *(
+            play(chat_id, players, lobby_service, game_service)
+            for chat_id, players in chats.items()
+        )
+    )
+    real = time.perf_counter() - real_started
+    starter.cancel()
+
+    virtual = asyncio.get_running_loop().time()
+    print(f"{CHATS} games settled, {sum(durations) / CHATS:.1f} virtual s per game")
+    print(f"{virtual:.1f} virtual s in {real:.2f} real s ({virtual / real:.0f}x)")
+    print("telegram requests:", dict(session.requests))
+
+    await redis.delete(STREAM_KEY, *(f"fsm:{c}:{c}:state" for c in chats))
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    run_simulated(main())
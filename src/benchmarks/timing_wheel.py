@@ -0,0 +1,102 @@
+"""Память и CPU на 50k таймеров хода: задача на таймер против колеса.
+
+Запуск из каталога src:
+    python -m benchmarks.timing_wheel
+"""
+
+import asyncio
+import gc
+import time
+import tracemalloc
+from typing import Awaitable, Callable
+
+from application.services.timing_wheel import TimingWheel
+
+TIMERS = 50_000
+TIMEOUT = 15
+IDLE = 2.0
+
+
+async def kick_afk(chat_id: int, player_id: int):
+    pass
+
+
+class EventTimer:
+    """Прежний таймер: задача asyncio, которая спит timeout и вызывает event"""
+
+    def __init__(self, id_: str, timeout: float, event: Callable[[], Awaitable]):
+        self.id = id_
+        self.timeout = timeout
+        self.event = event
+        self._task: asyncio.Task | None = None
+
+    async def _timer_start(self):
+        await asyncio.sleep(self.timeout)
+        await self.event()
+
+    def start(self):
+        self._task = asyncio.create_task(self._timer_start())
+
+    def cancel(self):
+        self._task.cancel()
+
+
+class PerTaskTimers:
+    """Прежний TimersManager: по задаче asyncio на таймер"""
+
+    def __init__(self):
+        self._timers: dict[str, EventTimer] = {}
+
+    def schedule(self, key: str, delay: float, event):
+        timer = EventTimer(key, delay, event)
+        timer.start()
+        self._timers[key] = timer
+
+    def cancel(self, key: str) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancel()
+        return True
+
+
+async def bench(timers, label: str):
+    gc.collect()
+    tracemalloc.start()
+    cpu = time.process_time()
+    for i in range(TIMERS):
+        timers.schedule(
+            f"game:turn:{i}:{i}", TIMEOUT, lambda i=i: kick_afk(chat_id=i, player_id=i)
+        )
+    # Дать задачам дойти до sleep
+    await asyncio.sleep(0)
+    create_cpu = time.process_time() - cpu
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cpu = time.process_time()
+    await asyncio.sleep(IDLE)
+    idle_cpu = time.process_time() - cpu
+
+    cpu = time.process_time()
+    for i in range(TIMERS):
+        timers.cancel(f"game:turn:{i}:{i}")
+    await asyncio.sleep(0)
+    cancel_cpu = time.process_time() - cpu
+
+    print(
+        f"{label:>8}: {memory / TIMERS:7.0f} B/timer, "
+        f"create {create_cpu / TIMERS * 1e6:5.2f} us, "
+        f"cancel {cancel_cpu / TIMERS * 1e6:5.2f} us, "
+        f"idle {idle_cpu / IDLE * 100:5.1f}% CPU"
+    )
+
+
+async def main():
+    print(f"{TIMERS} timers of {TIMEOUT}s")
+    await bench(PerTaskTimers(), "per-task")
+    await bench(TimingWheel(), "wheel")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
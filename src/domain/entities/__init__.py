@@ -2,17 +2,22 @@ __all__ = (
     "Suit",
     "Rank",
     "Card",
+    "Hand",
+    "Deck",
     "User",
     "Lobby",
     "Game",
+    "GameChanges",
     "Dealer",
     "Player",
     "PlayerResult",
 )
 
 from .card import Card, Rank, Suit
+from .hand import Hand
+from .deck import Deck
 from .player import Player, PlayerResult
 from .user import User
 from .lobby import Lobby
 from .dealer import Dealer
-from .game import Game
+from .game import Game, GameChanges
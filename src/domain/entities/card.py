@@ -1,6 +1,7 @@
+from array import array
 from enum import Enum
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
 
 if TYPE_CHECKING:
     from src.application.schemas import CardSchema
@@ -42,6 +43,14 @@ class Card:
         else:
             return int(self.rank)
 
+    @property
+    def code(self) -> int:
+        return card_code(self.rank, self.suit)
+
+    @classmethod
+    def from_code(cls, code: int) -> "Card":
+        return cls(rank=CARD_RANKS[code], suit=CARD_SUITS[code])
+
     def __str__(self) -> str:
         return f"{self.rank.value}{self.suit.value[0]}"
 
@@ -51,3 +60,43 @@ class Card:
             rank=data.rank,
             suit=data.suit,
         )
+
+
+# Движок игры работает с картами как с числами 0..51 (масть * 13 + ранг),
+# все свойства карты берутся из таблиц ниже.
+RANKS: tuple[Rank, ...] = tuple(Rank)
+SUITS: tuple[Suit, ...] = tuple(Suit)
+DECK_SIZE = len(RANKS) * len(SUITS)
+
+_RANK_INDEX = {rank: index for index, rank in enumerate(RANKS)}
+_SUIT_INDEX = {suit: index for index, suit in enumerate(SUITS)}
+
+CARD_RANKS: tuple[Rank, ...] = tuple(
+    RANKS[code % len(RANKS)] for code in range(DECK_SIZE)
+)
+CARD_SUITS: tuple[Suit, ...] = tuple(
+    SUITS[code // len(RANKS)] for code in range(DECK_SIZE)
+)
+CARD_VALUES = bytes(
+    Card(rank, suit).get_value() for rank, suit in zip(CARD_RANKS, CARD_SUITS)
+)
+CARD_IS_ACE = bytes(rank == Rank.ACE for rank in CARD_RANKS)
+CARD_NAMES: tuple[str, ...] = tuple(
+    str(Card(rank, suit)) for rank, suit in zip(CARD_RANKS, CARD_SUITS)
+)
+
+
+def card_code(rank: Rank, suit: Suit) -> int:
+    return _SUIT_INDEX[suit] * len(RANKS) + _RANK_INDEX[rank]
+
+
+def card_str(code: int) -> str:
+    return CARD_NAMES[code]
+
+
+def cards_array(codes: Iterable[int] = ()) -> array:
+    return array("B", codes)
+
+
+def cards_from_dto(cards: Iterable["CardSchema"]) -> array:
+    return array("B", (card_code(card.rank, card.suit) for card in cards))
@@ -0,0 +1,96 @@
+import hashlib
+import secrets
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable
+
+from domain.entities.card import DECK_SIZE, card_code
+
+if TYPE_CHECKING:
+    from src.application.schemas import DeckSchema
+
+# Сид - 128 случайных бит, перестановка строится из SHA-1(сид || номер
+# блока): без сида по вышедшим картам колоду не угадать, а с сидом ее можно
+# повторить и вне Python (в Lua Redis из хешей доступен только SHA-1)
+SEED_BITS = 128
+SEED_BYTES = SEED_BITS // 8
+
+
+def new_seed() -> int:
+    return secrets.randbits(SEED_BITS)
+
+
+def _keystream(seed: int):
+    """32-битные слова из SHA-1(сид || номер блока), по 5 на блок"""
+    key = seed.to_bytes(SEED_BYTES, "little")
+    block = 0
+    while True:
+        digest = hashlib.sha1(key + bytes((block,))).digest()
+        for offset in range(0, len(digest), 4):
+            yield int.from_bytes(digest[offset : offset + 4], "big")
+        block += 1
+
+
+@lru_cache(maxsize=1024)
+def deck_permutation(seed: int) -> bytes:
+    """Порядок карт колоды для сида, первая карта берется первой."""
+    words = _keystream(seed)
+    order = bytearray(range(DECK_SIZE))
+    for i in range(DECK_SIZE - 1, 0, -1):
+        # Смещение от остатка не больше 52 / 2**32
+        j = next(words) % (i + 1)
+        order[i], order[j] = order[j], order[i]
+    return bytes(order)
+
+
+class Deck:
+    """Перемешанная колода, заданная сидом и количеством взятых карт.
+
+    Колоды из старых кэшей, сохраненные списком карт, хранят порядок явно
+    и имеют seed=None.
+    """
+
+    __slots__ = ("seed", "cursor", "_order")
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        cursor: int = 0,
+        order: bytes | None = None,
+    ):
+        if order is None:
+            seed = new_seed() if seed is None else seed
+            order = deck_permutation(seed)
+        self.seed = seed
+        self.cursor = cursor
+        self._order = order
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[int]) -> "Deck":
+        """Колода из списка карт, где следующая карта лежит в конце."""
+        return cls(order=bytes(reversed(bytes(cards))))
+
+    @classmethod
+    def from_dto(cls, data: "DeckSchema") -> "Deck":
+        if data.cards is not None:
+            return cls.from_cards(
+                card_code(card.rank, card.suit) for card in data.cards
+            )
+        return cls(seed=data.seed, cursor=data.cursor)
+
+    @property
+    def cards(self) -> list[int] | None:
+        """Оставшиеся карты для колод без сида, в формате старых кэшей."""
+        if self.seed is not None:
+            return None
+        return list(reversed(self._order[self.cursor :]))
+
+    def pop(self) -> int:
+        card = self._order[self.cursor]
+        self.cursor += 1
+        return card
+
+    def __len__(self) -> int:
+        return len(self._order) - self.cursor
+
+    def __repr__(self) -> str:
+        return f"Deck(cursor={self.cursor}, left={len(self)})"
@@ -1,19 +1,40 @@
-import random
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import TYPE_CHECKING, Any
 
-from domain.entities import Card, Rank, Suit, Player, Dealer, PlayerResult
+from domain.entities import Player, Dealer, PlayerResult
+from domain.entities.card import CARD_NAMES, CARD_VALUES
+from domain.entities.deck import Deck
 from domain.types.game.exceptions import AnotherPlayerTurn, PlayerNotFound
 
 if TYPE_CHECKING:
     from src.application.schemas import GameSchema
 
 
-def deck_factory():
-    deck = [Card(rank, suit) for suit in Suit for rank in Rank]  # type: ignore
+def deck_factory() -> Deck:
+    return Deck()
 
-    random.shuffle(deck)
-    return deck
+
+@dataclass
+class GameChanges:
+    """Части игры, измененные с момента загрузки.
+
+    meta - индекс текущего игрока и раунд.
+    """
+
+    meta: bool = False
+    deck: bool = False
+    dealer: bool = False
+    players: set[int] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return self.meta or self.deck or self.dealer or bool(self.players)
+
+    def update(self, other: "GameChanges"):
+        self.meta |= other.meta
+        self.deck |= other.deck
+        self.dealer |= other.dealer
+        self.players |= other.players
 
 
 class Game:
@@ -25,7 +46,7 @@ class Game:
         created_at: datetime = None,
         current_player_index: int = 0,
         current_round: int = 1,
-        deck: list[Card] = None,
+        deck: Deck = None,
     ):
         self.chat_id = chat_id
         self.deck = deck if deck is not None else deck_factory()
@@ -36,8 +57,9 @@ class Game:
         self.current_round = current_round
 
         self.turn_order = tuple(self.players.keys())
+        self.changes = GameChanges()
 
-        if not (self.dealer.first_card and self.dealer.secret_card):
+        if self.dealer.first_card is None or self.dealer.secret_card is None:
             self.dealer.first_card, self.dealer.secret_card = (
                 self.deck.pop(),
                 self.deck.pop(),
@@ -53,7 +75,7 @@ class Game:
                 for user_tg_id, player_schema in data.players.items()
             },
             dealer=Dealer.from_dto(data.dealer),
-            deck=[Card.from_dto(card_schema) for card_schema in data.deck],
+            deck=Deck.from_dto(data.deck),
             created_at=data.created_at,
             current_player_index=data.current_player_index,
             current_round=data.current_round,
@@ -81,6 +103,13 @@ class Game:
     def _check_all_bets(self) -> bool:
         return all(player.bid != 0 for player in self.players.values())
 
+    def is_bidding(self) -> bool:
+        """Идет прием ставок: кто-то из оставшихся игроков еще не поставил"""
+        return any(
+            player.bid == 0 and player.result is None
+            for player in self.players.values()
+        )
+
     def _check_all_have_results(self) -> bool:
         return all(player.result is not None for player in self.players.values())
 
@@ -120,6 +149,8 @@ class Game:
             player.cards.append(self.deck.pop())
             if player.has_blackjack():
                 player.result = PlayerResult.BLACKJACK
+            self.changes.players.add(player.tg_id)
+            self.changes.deck = True
             data.append(self._get_player_data(player))
 
         return data
@@ -135,6 +166,7 @@ class Game:
 
     def _next_player(self, data: bool = False) -> Player | dict | None:
         self.current_player_index += 1
+        self.changes.meta = True
         player = self.get_current_turn_player()
 
         if player is None:
@@ -156,7 +188,11 @@ class Game:
 
     def set_out_for_player(self, player_id: int):
         player = self._get_player_by_id(player_id)
+        if player is None:
+            raise PlayerNotFound(f"Player (id='{player_id}' not found")
+
         player.result = PlayerResult.OUT
+        self.changes.players.add(player_id)
         next_player = self._next_player()
         return self._get_data_result(
             player=player,
@@ -169,6 +205,7 @@ class Game:
         data_players = []
         for player in not_bid_players:
             player.result = PlayerResult.OUT
+            self.changes.players.add(player.tg_id)
             data_players.append(self._get_player_data(player))
         next_player = None
         if data_players:
@@ -188,6 +225,7 @@ class Game:
             raise PlayerNotFound(f"Player (id='{player_id}' not found")
 
         player.bid = bid
+        self.changes.players.add(player_id)
         if self._check_all_bets():
             cur_player = self.get_current_turn_player()
             return {
@@ -210,6 +248,8 @@ class Game:
             raise AnotherPlayerTurn(f"Another player turn.")
 
         player.cards.append(self.deck.pop())
+        self.changes.players.add(player_id)
+        self.changes.deck = True
 
         # Обработка случая перебора
         if player.is_busted():
@@ -259,6 +299,7 @@ class Game:
     def init_second_round(self):
         self.current_round = 2
         self.current_player_index = 0
+        self.changes.meta = True
 
         data = {"dealer": self._get_dealer_data()}
 
@@ -273,9 +314,9 @@ class Game:
     def _get_dealer_data(self):
         score = self.dealer.score
         return {
-            "first_card": str(self.dealer.first_card),
-            "secret_card": str(self.dealer.secret_card),
-            "score": score - self.dealer.secret_card.get_value(),
+            "first_card": CARD_NAMES[self.dealer.first_card],
+            "secret_card": CARD_NAMES[self.dealer.secret_card],
+            "score": score - CARD_VALUES[self.dealer.secret_card],
             "score_with_secret": score,
         }
 
@@ -284,6 +325,8 @@ class Game:
         score = self.dealer.score
         while score < 17:
             self.dealer.cards.append(self.deck.pop())
+            self.changes.dealer = True
+            self.changes.deck = True
             score = self.dealer.score
             data.append({"cards": self.dealer.cards_str(), "score": score})
         return data
@@ -0,0 +1,67 @@
+from typing import Iterable, Iterator
+
+from domain.entities.card import CARD_IS_ACE, CARD_NAMES, CARD_VALUES, cards_array
+
+BLACKJACK = 21
+
+
+class Hand:
+    """Карты на руке с очками, которые пересчитываются на каждой взятой карте.
+
+    total - сумма очков, где тузы, которые еще можно считать за 11,
+    посчитаны за 11; soft_aces - количество таких тузов.
+    """
+
+    __slots__ = ("cards", "total", "soft_aces")
+
+    def __init__(self, cards: Iterable[int] = ()):
+        self.cards = cards_array()
+        self.total = 0
+        self.soft_aces = 0
+        self.extend(cards)
+
+    def append(self, card: int):
+        self.cards.append(card)
+        self.total += CARD_VALUES[card]
+        self.soft_aces += CARD_IS_ACE[card]
+        while self.total > BLACKJACK and self.soft_aces:
+            self.total -= 10
+            self.soft_aces -= 1
+
+    def extend(self, cards: Iterable[int]):
+        for card in cards:
+            self.append(card)
+
+    @property
+    def score(self) -> int:
+        return self.total
+
+    @property
+    def is_soft(self) -> bool:
+        return self.soft_aces > 0
+
+    def is_busted(self) -> bool:
+        return self.total > BLACKJACK
+
+    def has_blackjack(self) -> bool:
+        return self.total == BLACKJACK and len(self.cards) == 2
+
+    def __str__(self) -> str:
+        return ", ".join(CARD_NAMES[card] for card in self.cards)
+
+    def __repr__(self) -> str:
+        return f"Hand({self.cards.tolist()!r}, score={self.total})"
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.cards)
+
+    def __getitem__(self, index: int) -> int:
+        return self.cards[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Hand):
+            return self.cards == other.cards
+        return NotImplemented
@@ -2,7 +2,8 @@ from enum import Enum
 from typing import TYPE_CHECKING
 from dataclasses import dataclass, field
 
-from domain.entities import Card
+from domain.entities.card import cards_from_dto
+from domain.entities.hand import Hand
 
 if TYPE_CHECKING:
     from src.application.schemas import PlayerSchema
@@ -21,36 +22,23 @@ class Player:
     name: str | None
     tg_id: int
     bid: int = 0
-    cards: list[Card] = field(default_factory=list)
+    cards: Hand = field(default_factory=Hand)
     result: PlayerResult | None = None
 
-    def _calculate_score(self) -> int:
-        if not self.cards:
-            return 0
-
-        score = sum(card.get_value() for card in self.cards)
-
-        aces_count = sum(1 for card in self.cards if card.rank == "A")
-        while score > 21 and aces_count > 0:
-            score -= 10
-            aces_count -= 1
-
-        return score
-
     @property
     def score(self):
-        return self._calculate_score()
+        return self.cards.total
 
     def has_blackjack(self) -> bool:
-        return len(self.cards) == 2 and self.score == 21
+        return self.cards.has_blackjack()
 
     def is_busted(self) -> bool:
-        return self.score > 21
+        return self.cards.is_busted()
 
     def cards_str(self) -> str:
         if not self.cards:
             return "Нет карт"
-        return ", ".join(map(str, self.cards))
+        return str(self.cards)
 
     @classmethod
     def from_dto(cls, data: "PlayerSchema") -> "Player":
@@ -58,6 +46,6 @@ class Player:
             name=data.name,
             tg_id=data.tg_id,
             bid=data.bid,
-            cards=[Card.from_dto(card_schema) for card_schema in data.cards],
+            cards=Hand(cards_from_dto(data.cards)),
             result=data.result,
         )
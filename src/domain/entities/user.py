@@ -1,11 +1,12 @@
 from dataclasses import dataclass
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
 from domain.types.user.exceptions import (
     BonusCooldownNotExpired,
     BonusOnlyBellowFiveBalance,
 )
+from utils.clock import get_clock
 
 if TYPE_CHECKING:
     from src.application.schemas import UserSchema
@@ -40,7 +41,7 @@ class User:
         if self.balance > 5:
             raise BonusOnlyBellowFiveBalance()
 
-        now = datetime.now(timezone.utc)
+        now = get_clock().now()
         delta = now - self.date_bonus
         if delta >= BONUS_DELTA:
             self.balance += 125
@@ -1,5 +1,7 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import BaseModel, PostgresDsn, RedisDsn
+from pydantic import BaseModel, PostgresDsn, RedisDsn, model_validator
 
 # from dotenv import load_dotenv
 #
@@ -16,10 +18,113 @@ class DBSettings(BaseModel):
 
 class BotSettings(BaseModel):
     token: str
+    # Запросы к Telegram через очереди чатов с лимитами: в минуту для
+    # группы, в секунду для личного чата и в секунду всего (общий лимит
+    # делят через Redis все процессы бота)
+    outbound_limits: bool = False
+    outbound_global_rate: float = 30
+    outbound_group_per_minute: int = 20
+    outbound_private_rate: float = 1
+    outbound_max_retries: int = 3
+    # Антифлуд: не чаще раза в rate_limit секунд с запасом flood_burst;
+    # memory - счет в процессе, redis - общий для всех процессов
+    flood_backend: Literal["memory", "redis"] = "memory"
+    flood_burst: int = 1
+    flood_max_keys: int = 10_000
+    # Обновления одного чата по одному, разных чатов - параллельно, не
+    # больше update_workers сразу
+    update_scheduler: bool = False
+    update_workers: int = 50
+    update_queue_depth: int = 1000
+    update_lag_warning: float = 5
+    # polling - long polling в одном процессе, webhook - сервер aiohttp на
+    # webhook_port; при webhook_workers > 1 этот процесс только принимает
+    # обновления и раздает их процессам-обработчикам по chat_id
+    mode: Literal["polling", "webhook"] = "polling"
+    webhook_url: str | None = None
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str | None = None
+    webhook_workers: int = 1
+    # Номер процесса-обработчика, задается шлюзом при запуске
+    webhook_worker: int | None = None
+
+    @model_validator(mode="after")
+    def check_webhook(self):
+        if self.mode == "webhook" and not self.webhook_url:
+            raise ValueError("mode=webhook requires webhook_url")
+        if self.webhook_workers < 1:
+            raise ValueError("webhook_workers must be at least 1")
+        return self
 
 
 class RedisSettings(BaseModel):
     url: RedisDsn
+    # string - игра одним ключом, hash - по полю на игрока, дилера и колоду
+    game_layout: Literal["string", "hash"] = "string"
+    # python - переходы методами Game, lua - скриптом за один запрос (нужен hash)
+    game_engine: Literal["python", "lua"] = "python"
+    # lock - изменения игры и лобби под redis.lock, optimistic - WATCH/MULTI
+    # со счетчиком версии и повтором перехода при конфликте
+    concurrency: Literal["lock", "optimistic"] = "lock"
+    max_update_attempts: int = 5
+    # Живые игры в памяти процесса по актору на чат, Redis - только снимки
+    game_actors: bool = False
+    game_actor_idle_timeout: float = 300
+    # Имя потребителя стримов в группе, по умолчанию hostname-pid
+    stream_consumer: str | None = None
+    stream_batch_size: int = 10
+    # Через сколько мс pending-запись забирается другим потребителем и
+    # после скольких доставок уходит в dead-letter стрим
+    stream_min_idle_ms: int = 60_000
+    stream_max_deliveries: int = 5
+    # Воркеры очереди задач из стримов и предел задач в ней
+    task_workers: int = 5
+    task_queue_depth: int = 1000
+    # Попытки задачи при временных ошибках (сеть, Redis, flood control),
+    # задержка между ними растет от base до max с джиттером
+    task_max_attempts: int = 4
+    task_retry_base_delay: float = 0.5
+    task_retry_max_delay: float = 30
+    # memory - таймеры задачами asyncio в процессе, redis - в ZSET, их
+    # может забрать и отменить любой процесс, и они переживают перезапуск
+    timers: Literal["memory", "redis"] = "memory"
+    timer_batch_size: int = 100
+    timer_poll_interval: float = 0.5
+    # При запуске вернуть таймеры живым лобби и играм: новый срок в
+    # секундах, игры старше max_age отменяются с возвратом ставок
+    recovery: bool = True
+    recovery_batch_size: int = 100
+    recovery_timeout: int = 30
+    recovery_max_age: float = 3600
+    # Несколько экземпляров бота делят чаты по консистентному хешу;
+    # узел без shard_ingress не получает обновления от Telegram сам, а
+    # только выполняет пересланные ему
+    sharding: bool = False
+    shard_node: str | None = None
+    shard_lease: float = 15
+    shard_renew_interval: float = 5
+    shard_vnodes: int = 160
+    shard_ingress: bool = True
+
+    @model_validator(mode="after")
+    def check_game_engine(self):
+        if self.game_engine == "lua" and self.game_layout != "hash":
+            raise ValueError("game_engine=lua requires game_layout=hash")
+        if self.game_engine == "lua" and self.concurrency != "optimistic":
+            # Скрипт не смотрит на game-lock, а запись под блокировкой не
+            # сверяет версию и затерла бы переход скрипта
+            raise ValueError("game_engine=lua requires concurrency=optimistic")
+        if self.game_actors and self.game_engine != "python":
+            raise ValueError("game_actors requires game_engine=python")
+        if self.sharding and self.timers != "redis":
+            raise ValueError("sharding requires timers=redis")
+        if self.sharding and self.game_actors:
+            # Снимки акторов пишутся без проверки версии, два владельца
+            # чата во время перебалансировки затирали бы ходы друг друга
+            raise ValueError("sharding is incompatible with game_actors")
+        return self
 
 
 class Settings(BaseSettings):
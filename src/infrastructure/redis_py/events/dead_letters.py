@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import sys
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+META_ORIGIN_ID = b"dead:origin_id"
+META_DELIVERIES = b"dead:deliveries"
+META_CONSUMER = b"dead:consumer"
+META_FIELDS = (META_ORIGIN_ID, META_DELIVERIES, META_CONSUMER)
+
+
+@dataclass
+class DeadLetter:
+    id: bytes
+    origin_id: bytes
+    deliveries: int
+    consumer: bytes
+    data: dict[bytes, bytes]
+
+
+class DeadLetterStream:
+    """Стрим {stream_key}:dead с записями, которые так и не обработались.
+
+    Хранит исходные поля записи и служебные поля dead:*: id в исходном
+    стриме, число доставок и последнего потребителя.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        stream_key: str,
+        maxlen: int = 10_000,
+    ):
+        self.redis = redis
+        self.stream_key = stream_key
+        self.key = f"{stream_key}:dead"
+        self.maxlen = maxlen
+
+    def queue_add(
+        self,
+        pipe: Pipeline,
+        origin_id: bytes,
+        data: dict[bytes, bytes],
+        deliveries: int,
+        consumer: bytes | str,
+    ):
+        fields = dict(data)
+        fields[META_ORIGIN_ID] = origin_id
+        fields[META_DELIVERIES] = deliveries
+        fields[META_CONSUMER] = consumer
+        pipe.xadd(
+            name=self.key,
+            fields=fields,
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+
+    @staticmethod
+    def _parse(entry_id: bytes, fields: dict[bytes, bytes]) -> DeadLetter:
+        return DeadLetter(
+            id=entry_id,
+            origin_id=fields.get(META_ORIGIN_ID, b""),
+            deliveries=int(fields.get(META_DELIVERIES, 0)),
+            consumer=fields.get(META_CONSUMER, b""),
+            data={k: v for k, v in fields.items() if k not in META_FIELDS},
+        )
+
+    async def length(self) -> int:
+        return await self.redis.xlen(self.key)
+
+    async def list(
+        self,
+        count: int = 20,
+        start: bytes | str = "-",
+    ) -> list[DeadLetter]:
+        entries = await self.redis.xrange(self.key, min=start, count=count)
+        return [self._parse(entry_id, fields) for entry_id, fields in entries]
+
+    async def get(self, entry_id: bytes | str) -> DeadLetter | None:
+        entries = await self.redis.xrange(self.key, min=entry_id, max=entry_id)
+        if not entries:
+            return None
+        return self._parse(*entries[0])
+
+    async def requeue(self, entry_id: bytes | str) -> bool:
+        """Вернуть запись в исходный стрим как новую"""
+        letter = await self.get(entry_id)
+        if letter is None:
+            return False
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(name=self.stream_key, fields=letter.data)
+            pipe.xdel(self.key, entry_id)
+            await pipe.execute()
+        return True
+
+    async def drop(self, entry_id: bytes | str) -> bool:
+        return bool(await self.redis.xdel(self.key, entry_id))
+
+
+async def _cli(argv: list[str]):
+    """python -m infrastructure.redis_py.events.dead_letters list|requeue|drop|tasks|tasks-requeue"""
+    from infrastructure.redis_py.events.task_queue import TaskDeadLetters
+    from infrastructure.redis_py.redis_helper import redis_helper
+
+    parser = argparse.ArgumentParser(description="Dead-letter стримы бота")
+    parser.add_argument(
+        "command",
+        choices=("list", "requeue", "drop", "tasks", "tasks-requeue"),
+    )
+    parser.add_argument("ids", nargs="*")
+    parser.add_argument("--stream", default="game:starting")
+    parser.add_argument("--count", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    redis = redis_helper.get_redis_client()
+    dead_letters = DeadLetterStream(redis, args.stream)
+    task_dead_letters = TaskDeadLetters(redis)
+    if args.command == "tasks":
+        print(f"{task_dead_letters.key}: {await task_dead_letters.length()}")
+        for entry in await task_dead_letters.list(count=100):
+            print(entry)
+    elif args.command == "tasks-requeue":
+        print(await task_dead_letters.requeue(args.count))
+    elif args.command == "list":
+        print(f"{dead_letters.key}: {await dead_letters.length()}")
+        for letter in await dead_letters.list(count=100):
+            print(
+                letter.id.decode(),
+                letter.origin_id.decode(),
+                letter.deliveries,
+                letter.consumer.decode(),
+                letter.data,
+            )
+    else:
+        action = getattr(dead_letters, args.command)
+        for entry_id in args.ids:
+            print(entry_id, await action(entry_id))
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_cli(sys.argv[1:]))
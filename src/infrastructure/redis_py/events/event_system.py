@@ -1,37 +1,59 @@
 import asyncio
 import logging
-from typing import Any, Callable, Coroutine, TypeVar
+import os
+import socket
 from functools import partial, wraps
 from contextlib import asynccontextmanager
 
 from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ResponseError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
 
 from application.services import GameServiceTG
-from application.services.timer_mng import timer_manager
+from application.services.timer_mng import TimerPayload, timer_manager
 from application.schemas import LobbySchema
 from infrastructure.database.models.db_helper import db_helper
-from infrastructure.repositories import RedisGameCacheRepo, SQLAlchemyUserRepositoryTG
-from infrastructure.redis_py.redis_helper import redis_helper
-
-T = TypeVar("T")
-TaskFunc = Callable[..., Coroutine[Any, Any, T]]
+from infrastructure.repositories import SQLAlchemyUserRepositoryTG
+from infrastructure.redis_py.events.dead_letters import DeadLetterStream
+from infrastructure.redis_py.events.task_queue import (
+    QueuedTask,
+    RetryPolicy,
+    TaskDeadLetters,
+    TaskQueue,
+)
+from infrastructure.redis_py.game_service_factory import make_game_service
+from infrastructure.redis_py.optimistic import ConcurrentUpdateError
+from infrastructure.redis_py.sharding import ShardRouter
 
 logger = logging.getLogger(__name__)
 
+# Ошибки, после которых задачу имеет смысл повторить
+TRANSIENT_ERRORS = (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+    RedisConnectionError,
+    RedisTimeoutError,
+    ConcurrentUpdateError,
+    asyncio.TimeoutError,
+)
+
 
 @asynccontextmanager
 async def game_service_getter(with_user_repo: bool = False):
     if with_user_repo:
         async with db_helper.ctx_session_getter() as session:
             user_repo = SQLAlchemyUserRepositoryTG(session=session)
-            game_repo = RedisGameCacheRepo(redis=redis_helper.get_redis_client())
-            game_service = GameServiceTG(game_repo=game_repo, user_repo=user_repo)
-            yield game_service
+            yield make_game_service(user_repo=user_repo)
     else:
-        game_repo = RedisGameCacheRepo(redis=redis_helper.get_redis_client())
-        game_service = GameServiceTG(game_repo=game_repo)
-        yield game_service
+        yield make_game_service()
 
 
 def with_game_service(with_user_repo: bool):
@@ -47,45 +69,60 @@ def with_game_service(with_user_repo: bool):
     return decorator
 
 
-class TaskQueue:
-    def __init__(self, max_workers: int = 5):
-        self.queue = asyncio.Queue()
-        self.max_workers = max_workers
-        self.workers = []
-
-    async def add_task(self, func: TaskFunc, *args, **kwargs):
-        task = partial(func, *args, **kwargs)
-        await self.queue.put(task)
-
-    async def worker(self):
-        while True:
-            try:
-                task_func = await self.queue.get()
-                await task_func()
-                self.queue.task_done()
-            except Exception as e:
-                logger.error(
-                    "Error executing task: %s\n%r",
-                    e,
-                )
-
-    async def start(self):
-        for _ in range(self.max_workers):
-            worker = asyncio.create_task(self.worker())
-            self.workers.append(worker)
-        return self.workers
+def default_consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
 
 
 class StreamListener:
+    """Читатель стрима в группе потребителей (XREADGROUP).
+
+    Каждая запись достается одному потребителю группы, поэтому стрим
+    можно читать из нескольких процессов. Записи читаются пачками до
+    batch_size, обработанные подтверждаются одним XACK на пачку, а
+    необработанные остаются в pending группы. При запуске сначала
+    дочитываются собственные pending-записи потребителя.
+
+    reclaim_loop забирает записи, которые висят в pending дольше
+    min_idle_ms (потребитель упал или обработка не удалась), и обрабатывает
+    их заново. Записи, доставленные max_deliveries раз, уходят в
+    dead-letter стрим. Если auto_ack=False, подтверждает запись сама
+    обработка через ack - например, после задачи в TaskQueue. Пока такая
+    запись ждет в очереди или повторяется, reclaim_loop обновляет ее
+    простой через XCLAIM JUSTID, и reclaim ее не забирает.
+    """
+
+    auto_ack = True
+    # С какой записи читает новая группа: "$" - только добавленные после
+    # ее создания
+    group_start = "$"
+
     def __init__(
         self,
         redis: Redis,
         stream_key: str,
         task_queue: TaskQueue,
+        group: str = "bot",
+        consumer: str | None = None,
+        batch_size: int = 10,
+        block_ms: int = 5000,
+        min_idle_ms: int = 60_000,
+        max_deliveries: int = 5,
+        reclaim_interval: float = 30,
     ):
         self.redis = redis
         self.stream_key = stream_key
         self.task_queue = task_queue
+        self.group = group
+        self.consumer = consumer if consumer is not None else default_consumer_name()
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.min_idle_ms = min_idle_ms
+        self.max_deliveries = max_deliveries
+        # Простой ожидающих записей обновляется чаще, чем их можно забрать
+        self.reclaim_interval = min(reclaim_interval, min_idle_ms / 2000)
+        self.dead_letters = DeadLetterStream(redis, stream_key)
+        # Переданные обработке и еще не подтвержденные записи
+        self._in_flight: set[bytes] = set()
 
     async def process_message(
         self,
@@ -94,33 +131,191 @@ class StreamListener:
     ):
         raise NotImplementedError
 
-    async def run(self):
-        while True:
-            stream = await self.redis.xread(
-                streams={self.stream_key: "$"},
-                count=1,
-                block=0,
+    async def ensure_group(self):
+        try:
+            await self.redis.xgroup_create(
+                name=self.stream_key,
+                groupname=self.group,
+                id=self.group_start,
+                mkstream=True,
             )
-            if not stream:
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_batch(self, last_id: str) -> list[tuple[bytes, dict]]:
+        reply = await self.redis.xreadgroup(
+            groupname=self.group,
+            consumername=self.consumer,
+            streams={self.stream_key: last_id},
+            count=self.batch_size,
+            block=None if last_id != ">" else self.block_ms,
+        )
+        if not reply:
+            return []
+        if isinstance(reply, dict):
+            return next(iter(reply.values()))[0]
+        return reply[0][1]
+
+    async def process_batch(self, messages: list[tuple[bytes, dict]]):
+        processed = []
+        for msg_id, data in messages:
+            if not self.auto_ack:
+                self._in_flight.add(msg_id)
+            try:
+                await self.process_message(msg_id, data)
+            except Exception:
+                self._in_flight.discard(msg_id)
+                logger.exception(
+                    "Error processing %s message %r", self.stream_key, msg_id
+                )
                 continue
+            processed.append(msg_id)
+        if processed and self.auto_ack:
+            await self.ack(*processed)
+
+    async def ack(self, *msg_ids: bytes):
+        await self.redis.xack(self.stream_key, self.group, *msg_ids)
+        self._in_flight.difference_update(msg_ids)
+
+    async def touch_in_flight(self):
+        """Обнулить простой записей, которые еще ждут обработки в процессе"""
+        if not self._in_flight:
+            return
+        await self.redis.xclaim(
+            name=self.stream_key,
+            groupname=self.group,
+            consumername=self.consumer,
+            min_idle_time=0,
+            message_ids=list(self._in_flight),
+            justid=True,
+        )
+
+    async def dead_letter(self, entry: dict):
+        msg_id = entry["message_id"]
+        entries = await self.redis.xrange(self.stream_key, min=msg_id, max=msg_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if entries:
+                self.dead_letters.queue_add(
+                    pipe,
+                    origin_id=msg_id,
+                    data=entries[0][1],
+                    deliveries=entry["times_delivered"],
+                    consumer=entry["consumer"],
+                )
+            pipe.xack(self.stream_key, self.group, msg_id)
+            await pipe.execute()
+        logger.warning(
+            "Message %r of %s moved to dead letters after %d deliveries",
+            msg_id,
+            self.stream_key,
+            entry["times_delivered"],
+        )
+
+    async def reclaim(self) -> int:
+        """Забрать зависшие pending-записи группы, вернуть их количество"""
+        entries = await self.redis.xpending_range(
+            name=self.stream_key,
+            groupname=self.group,
+            min="-",
+            max="+",
+            count=self.batch_size,
+            idle=self.min_idle_ms,
+        )
+        entries = [
+            # Ждущие в очереди задач этого процесса не забираем
+            entry
+            for entry in entries
+            if entry["message_id"] not in self._in_flight
+        ]
+        retry = []
+        for entry in entries:
+            if entry["times_delivered"] >= self.max_deliveries:
+                await self.dead_letter(entry)
+            else:
+                retry.append(entry["message_id"])
+        if not retry:
+            return len(entries)
+
+        # XCLAIM увеличивает счетчик доставок; удаленные из стрима записи
+        # он убирает из pending и не возвращает
+        claimed = await self.redis.xclaim(
+            name=self.stream_key,
+            groupname=self.group,
+            consumername=self.consumer,
+            min_idle_time=self.min_idle_ms,
+            message_ids=retry,
+        )
+        await self.process_batch(
+            [(msg_id, data) for msg_id, data in claimed if data is not None]
+        )
+        return len(entries)
 
-            stream_name, messages = next(iter(stream.items()))
-            msg_id, data = messages[0][0]
+    async def reclaim_loop(self):
+        await self.ensure_group()
+        while True:
+            await asyncio.sleep(self.reclaim_interval)
+            try:
+                await self.touch_in_flight()
+                while await self.reclaim() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Error reclaiming pending %s", self.stream_key)
 
-            await self.process_message(msg_id, data)
+    async def run(self):
+        await self.ensure_group()
 
-            await self.redis.xdel(stream_name, msg_id)
+        # "0" - свои pending-записи, пока они не закончатся, затем новые
+        last_id = "0"
+        while True:
+            messages = await self.read_batch(last_id)
+            if not messages:
+                last_id = ">"
+                continue
+            if last_id != ">":
+                last_id = messages[-1][0]
+            # pending без данных - запись удалена из стрима до подтверждения
+            missing = [msg_id for msg_id, data in messages if data is None]
+            if missing:
+                await self.redis.xack(self.stream_key, self.group, *missing)
+            await self.process_batch(
+                [(msg_id, data) for msg_id, data in messages if data is not None]
+            )
 
 
 class GameStartingListener(StreamListener):
+    """Запуск игр из лобби. Если задан router, игры чужих чатов
+    пересылаются владельцу чата.
+    """
+
+    # Запись подтверждается только после того, как игра создана
+    auto_ack = False
+
     def __init__(
         self,
         redis: Redis,
         task_queue: TaskQueue,
         bot: Bot,
+        stream_key: str = "game:starting",
+        router: ShardRouter | None = None,
+        consumer: str | None = None,
+        batch_size: int = 10,
+        min_idle_ms: int = 60_000,
+        max_deliveries: int = 5,
     ):
-        super().__init__(redis, "game:starting", task_queue)
+        super().__init__(
+            redis,
+            stream_key,
+            task_queue,
+            consumer=consumer,
+            batch_size=batch_size,
+            min_idle_ms=min_idle_ms,
+            max_deliveries=max_deliveries,
+        )
         self.bot = bot
+        self.router = router
+        if router is not None:
+            router.register("game:starting", self.process_forwarded)
 
     async def process_message(
         self,
@@ -130,12 +325,49 @@ class GameStartingListener(StreamListener):
         lobby_json_str = data[b"lobby_data"]
 
         lobby_schema = LobbySchema.model_validate_json(lobby_json_str)
+        chat_id = lobby_schema.chat_id
+        if self.router is not None and not self.router.owns(chat_id):
+            await self.router.forward(
+                chat_id,
+                "game:starting",
+                {"lobby_data": lobby_json_str.decode()},
+            )
+            await self.ack(msg_id)
+            return
 
-        await self.task_queue.add_task(
-            self._create_game_task,
-            lobby_schema=lobby_schema,
+        await self.task_queue.submit(
+            QueuedTask(
+                key=lobby_schema.chat_id,
+                func=partial(
+                    self._start_game_task,
+                    msg_id=msg_id,
+                    lobby_schema=lobby_schema,
+                ),
+                name="game:start",
+                payload={
+                    "stream": self.stream_key,
+                    "msg_id": msg_id.decode(),
+                    "fields": {"lobby_data": lobby_json_str.decode()},
+                },
+                # Задача сохранена в dead-letter списке, запись стрима больше
+                # не нужна
+                on_dead=partial(self.ack, msg_id),
+            )
         )
 
+    async def process_forwarded(self, payload: dict):
+        # Вызывается из задачи входящего стрима, очередь уже не нужна
+        lobby_schema = LobbySchema.model_validate_json(payload["lobby_data"])
+        await self._create_game_task(lobby_schema=lobby_schema)
+
+    async def _start_game_task(
+        self,
+        msg_id: bytes,
+        lobby_schema: LobbySchema,
+    ):
+        await self._create_game_task(lobby_schema=lobby_schema)
+        await self.ack(msg_id)
+
     @with_game_service(False)
     async def _create_game_task(
         self,
@@ -150,33 +382,131 @@ class GameStartingListener(StreamListener):
             )
             await self.redis.delete(f"fsm:{chat_id}:{chat_id}:state")
             return
-        await game_service.create_game(lobby_schema=lobby_schema)
+        game = await game_service.create_game(lobby_schema=lobby_schema)
+        if game is None:
+            # Запись доставлена повторно или прошлая попытка упала после
+            # создания игры: если ставки еще идут, а таймера нет -
+            # приглашение и таймер ставок не успели, повторяем их
+            game = await game_service.game_repo.get_game(chat_id)
+            if (
+                game is None
+                or not game.is_bidding()
+                or await timer_manager.has_timer("game:bid", chat_id)
+            ):
+                return
         msg = await self.bot.send_message(
             chat_id=chat_id,
             text="Делайте ставки к началу игры.",
         )
-        timer_manager.create_timer(
+        await timer_manager.create_timer(
             "game:bid",
             chat_id,
             game_service.bid_timer,
             None,
             30,
-            msg,
+            TimerPayload.from_message(msg, "game:bid"),
         )
 
 
+class ShardInboxListener(StreamListener):
+    """Входящий стрим узла: работа по чатам, пересланная другими узлами.
+
+    Записи выполняются в очереди задач по ключу чата, обработанная
+    запись подтверждается и удаляется, поэтому в стриме остаются только
+    необработанные - их ShardRouter перешлет дальше, если узел уйдет.
+    """
+
+    auto_ack = False
+    # Записи могли переслать до запуска узла
+    group_start = "0"
+
+    def __init__(
+        self,
+        redis: Redis,
+        task_queue: TaskQueue,
+        router: ShardRouter,
+        consumer: str | None = None,
+        batch_size: int = 10,
+        min_idle_ms: int = 60_000,
+        max_deliveries: int = 5,
+    ):
+        super().__init__(
+            redis,
+            router.inbox_key(),
+            task_queue,
+            consumer=consumer,
+            batch_size=batch_size,
+            min_idle_ms=min_idle_ms,
+            max_deliveries=max_deliveries,
+        )
+        self.router = router
+
+    async def process_message(
+        self,
+        msg_id: bytes,
+        data: dict[bytes, bytes],
+    ):
+        await self.task_queue.submit(
+            QueuedTask(
+                key=int(data[b"chat_id"]),
+                func=partial(self._handle_task, msg_id=msg_id, data=data),
+                name=f"shard:{data[b'kind'].decode()}",
+                payload={
+                    "stream": self.stream_key,
+                    "msg_id": msg_id.decode(),
+                    "fields": {k.decode(): v.decode() for k, v in data.items()},
+                },
+                on_dead=partial(self.ack, msg_id),
+            )
+        )
+
+    async def _handle_task(self, msg_id: bytes, data: dict[bytes, bytes]):
+        await self.router.handle(data)
+        await self.ack(msg_id)
+
+    async def ack(self, *msg_ids: bytes):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream_key, self.group, *msg_ids)
+            pipe.xdel(self.stream_key, *msg_ids)
+            await pipe.execute()
+        self._in_flight.difference_update(msg_ids)
+
+
 class EventSystemTG:
     def __init__(
         self,
         bot: Bot,
         redis: Redis,
         max_workers: int = 5,
+        max_queue_depth: int = 1000,
+        retry_policy: RetryPolicy | None = None,
+        game_starting_stream: str = "game:starting",
+        router: ShardRouter | None = None,
+        consumer: str | None = None,
+        batch_size: int = 10,
+        min_idle_ms: int = 60_000,
+        max_deliveries: int = 5,
     ):
         self.bot = bot
         self.redis = redis
+        self.game_starting_stream = game_starting_stream
+        self.router = router
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.min_idle_ms = min_idle_ms
+        self.max_deliveries = max_deliveries
 
         # Создаем очередь задач
-        self.task_queue = TaskQueue(max_workers=max_workers)
+        self.task_queue = TaskQueue(
+            max_workers=max_workers,
+            max_depth=max_queue_depth,
+            retry_policy=(
+                retry_policy
+                if retry_policy is not None
+                else RetryPolicy(retry_on=TRANSIENT_ERRORS)
+            ),
+            dead_letters=TaskDeadLetters(redis),
+        )
 
         # Создаем слушателей
         self.listeners: list[StreamListener] = []
@@ -188,8 +518,26 @@ class EventSystemTG:
                 self.redis,
                 self.task_queue,
                 self.bot,
+                stream_key=self.game_starting_stream,
+                router=self.router,
+                consumer=self.consumer,
+                batch_size=self.batch_size,
+                min_idle_ms=self.min_idle_ms,
+                max_deliveries=self.max_deliveries,
             )
         )
+        if self.router is not None:
+            self.listeners.append(
+                ShardInboxListener(
+                    self.redis,
+                    self.task_queue,
+                    self.router,
+                    consumer=self.consumer,
+                    batch_size=self.batch_size,
+                    min_idle_ms=self.min_idle_ms,
+                    max_deliveries=self.max_deliveries,
+                )
+            )
 
     async def start(self):
         # Запускаем очередь задач
@@ -199,6 +547,9 @@ class EventSystemTG:
         listener_tasks = [
             asyncio.create_task(listener.run()) for listener in self.listeners
         ]
+        listener_tasks += [
+            asyncio.create_task(listener.reclaim_loop()) for listener in self.listeners
+        ]
 
         # Запускаем все задачи
         all_tasks = worker_tasks + listener_tasks
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+TaskFunc = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class QueuedTask:
+    """Задача очереди.
+
+    payload - JSON-совместимое описание задачи для dead-letter списка,
+    on_dead - что сделать, когда задача окончательно не выполнилась.
+    """
+
+    key: Hashable
+    func: Callable[[], Awaitable[Any]]
+    name: str = ""
+    payload: dict[str, Any] | None = None
+    on_dead: Callable[[], Awaitable[Any]] | None = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class RetryPolicy:
+    """Повторы с экспоненциальной задержкой и полным джиттером.
+
+    Повторяются только ошибки из retry_on; если у ошибки есть retry_after
+    (Telegram flood control), ждем не меньше него.
+    """
+
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30
+    retry_on: tuple[type[BaseException], ...] = (Exception,)
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        return attempt < self.max_attempts and isinstance(exc, self.retry_on)
+
+    def delay(self, exc: BaseException, attempt: int) -> float:
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, cap)
+        retry_after = getattr(exc, "retry_after", None)
+        if isinstance(retry_after, (int, float)):
+            delay = max(delay, retry_after)
+        return delay
+
+
+class RetryBudget:
+    """Общий бюджет повторов: не больше ratio повторов на задачу.
+
+    Каждая задача добавляет ratio токенов (не больше max_tokens), каждый
+    повтор тратит токен. Когда Redis или Telegram лежат, повторы быстро
+    кончаются и не умножают нагрузку.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 20):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class TaskDeadLetters:
+    """Redis-список окончательно упавших задач, новые в начале."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        key: str = "tasks:dead",
+        maxlen: int = 1000,
+    ):
+        self.redis = redis
+        self.key = key
+        self.maxlen = maxlen
+
+    async def push(self, task: QueuedTask, error: BaseException, attempts: int):
+        entry = json.dumps(
+            {
+                "name": task.name,
+                "key": task.key,
+                "payload": task.payload,
+                "error": repr(error),
+                "attempts": attempts,
+                "failed_at": time.time(),
+            },
+            default=str,
+        )
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lpush(self.key, entry)
+                pipe.ltrim(self.key, 0, self.maxlen - 1)
+                await pipe.execute()
+        except Exception:
+            # Redis недоступен - запись хотя бы останется в логе
+            logger.exception("Dead task was not saved: %s", entry)
+
+    async def length(self) -> int:
+        return await self.redis.llen(self.key)
+
+    async def list(self, count: int = 20) -> list[dict[str, Any]]:
+        return [
+            json.loads(entry)
+            for entry in await self.redis.lrange(self.key, 0, count - 1)
+        ]
+
+    async def requeue(self, count: int) -> int:
+        """Вернуть count самых старых задач в их стримы, вернуть сколько вернулось.
+
+        Вернуть можно задачи, у которых payload содержит stream и fields;
+        остальные только видны в list.
+        """
+        requeued = 0
+        for _ in range(count):
+            entry = await self.redis.rpop(self.key)
+            if entry is None:
+                break
+            payload = json.loads(entry).get("payload") or {}
+            if "stream" not in payload:
+                # Положить обратно в начало и перейти к следующей
+                await self.redis.lpush(self.key, entry)
+                continue
+            await self.redis.xadd(payload["stream"], payload["fields"])
+            requeued += 1
+        return requeued
+
+
+def percentile(samples: list[float], q: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class TaskQueueMetrics:
+    """Задержки последних задач: ожидание в очереди и выполнение, в секундах."""
+
+    def __init__(self, window: int = 1000):
+        self.wait_times: deque[float] = deque(maxlen=window)
+        self.run_times: deque[float] = deque(maxlen=window)
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+
+    def observe(self, wait: float, run: float, ok: bool):
+        self.wait_times.append(wait)
+        self.run_times.append(run)
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def latency(self) -> dict[str, dict[str, float | None]]:
+        result = {}
+        for name, samples in (("wait", self.wait_times), ("run", self.run_times)):
+            samples = list(samples)
+            result[name] = {f"p{q}": percentile(samples, q) for q in (50, 95, 99)}
+        return result
+
+
+class TaskQueue:
+    """Очередь задач с ключами (chat_id).
+
+    Задачи одного ключа выполняются по одной в порядке добавления, разные
+    ключи - параллельно, но не больше max_workers сразу. Ключ, у которого
+    остались задачи, после каждой задачи встает в конец общей очереди, так
+    что занятый чат не забирает воркеров у остальных. В очереди и в работе
+    одновременно не больше max_depth задач: add_task ждет освобождения
+    места, и читатель стрима сам притормаживает.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 5,
+        max_depth: int = 1000,
+        metrics: TaskQueueMetrics | None = None,
+        retry_policy: RetryPolicy | None = None,
+        retry_budget: RetryBudget | None = None,
+        dead_letters: TaskDeadLetters | None = None,
+    ):
+        self.max_workers = max_workers
+        self.max_depth = max_depth
+        self.metrics = metrics if metrics is not None else TaskQueueMetrics()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.retry_budget = retry_budget if retry_budget is not None else RetryBudget()
+        self.dead_letters = dead_letters
+        self.workers: list[asyncio.Task] = []
+
+        self._pending: dict[Hashable, deque[QueuedTask]] = {}
+        self._ready: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max_depth)
+        self._in_flight = 0
+        self._running = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def add_task(
+        self,
+        key: Hashable,
+        func: TaskFunc,
+        *args,
+        **kwargs,
+    ):
+        await self.submit(
+            QueuedTask(
+                key=key,
+                func=partial(func, *args, **kwargs),
+                name=getattr(func, "__qualname__", repr(func)),
+            )
+        )
+
+    async def submit(self, task: QueuedTask):
+        await self._slots.acquire()
+        self._in_flight += 1
+        self._idle.clear()
+
+        queue = self._pending.get(task.key)
+        if queue is None:
+            # Ключа нет ни в очереди, ни в работе - можно ставить в очередь
+            self._pending[task.key] = deque((task,))
+            self._ready.put_nowait(task.key)
+        else:
+            queue.append(task)
+
+    async def _attempt(self, task: QueuedTask) -> tuple[BaseException | None, int]:
+        """Выполнить задачу с повторами, вернуть последнюю ошибку и число попыток.
+
+        Повторы идут в том же воркере, поэтому следующие задачи ключа ждут их.
+        """
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await task.func()
+                return None, attempt
+            except Exception as e:
+                if not (
+                    self.retry_policy.should_retry(e, attempt)
+                    and self.retry_budget.withdraw()
+                ):
+                    return e, attempt
+                delay = self.retry_policy.delay(e, attempt)
+                self.metrics.retries += 1
+                logger.warning(
+                    "Task %s for key %r failed (attempt %d), retry in %.2fs: %r",
+                    task.name,
+                    task.key,
+                    attempt,
+                    delay,
+                    e,
+                )
+                await asyncio.sleep(delay)
+
+    async def _run(self, task: QueuedTask):
+        started = time.monotonic()
+        error, attempts = await self._attempt(task)
+        self.metrics.observe(
+            wait=started - task.enqueued_at,
+            run=time.monotonic() - started,
+            ok=error is None,
+        )
+        if error is None:
+            return
+
+        logger.error(
+            "Task %s for key %r failed after %d attempts",
+            task.name,
+            task.key,
+            attempts,
+            exc_info=error,
+        )
+        if self.dead_letters is not None:
+            await self.dead_letters.push(task, error, attempts)
+        if task.on_dead is not None:
+            try:
+                await task.on_dead()
+            except Exception:
+                logger.exception("on_dead of task %s failed", task.name)
+
+    async def worker(self):
+        while True:
+            key = await self._ready.get()
+            queue = self._pending[key]
+            task = queue[0]
+            self._running += 1
+            try:
+                await self._run(task)
+            finally:
+                self._running -= 1
+                queue.popleft()
+                if queue:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                self._ready.task_done()
+                self._slots.release()
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self._idle.set()
+
+    async def start(self):
+        for _ in range(self.max_workers):
+            worker = asyncio.create_task(self.worker())
+            self.workers.append(worker)
+        return self.workers
+
+    async def join(self):
+        """Дождаться выполнения всех добавленных задач"""
+        await self._idle.wait()
+
+    @property
+    def depth(self) -> int:
+        """Задачи, которые ждут воркера"""
+        return self._in_flight - self._running
+
+    def key_lags(self) -> dict[Hashable, float]:
+        """Сколько секунд ждет самая старая невыполненная задача ключа"""
+        now = time.monotonic()
+        return {key: now - queue[0].enqueued_at for key, queue in self._pending.items()}
+
+    def snapshot(self) -> dict[str, Any]:
+        lags = self.key_lags()
+        return {
+            "depth": self.depth,
+            "running": self._running,
+            "keys": len(self._pending),
+            "max_key_lag": max(lags.values(), default=0.0),
+            "completed": self.metrics.completed,
+            "failed": self.metrics.failed,
+            "retries": self.metrics.retries,
+            "retry_tokens": self.retry_budget.tokens,
+            "latency": self.metrics.latency(),
+        }
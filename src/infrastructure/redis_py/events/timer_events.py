@@ -0,0 +1,27 @@
+from application.services import GameServiceTG
+from application.services.timer_mng import TimerPayload
+from infrastructure.redis_py.events.event_system import with_game_service
+from infrastructure.redis_py.game_service_factory import make_lobby_service
+from infrastructure.redis_py.timer_scheduler import RedisTimerScheduler
+
+
+async def lobby_timer(chat_id: int):
+    await make_lobby_service()._lobby_timer(chat_id)
+
+
+@with_game_service(False)
+async def bid_timer(timer: TimerPayload, game_service: GameServiceTG):
+    await game_service.bid_timer(timer)
+
+
+@with_game_service(True)
+async def kick_afk(timer: TimerPayload, game_service: GameServiceTG):
+    # Может закончить игру, а для расчета нужен репозиторий пользователей
+    await game_service.kick_afk(timer)
+
+
+def register_timer_events(scheduler: RedisTimerScheduler):
+    """События таймеров, которые создаются через timer_manager"""
+    scheduler.register("lobby", lobby_timer)
+    scheduler.register("game:bid", bid_timer)
+    scheduler.register("game:turn", kick_afk)
@@ -0,0 +1,306 @@
+import struct
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+from application.schemas.game import GameSchema
+from domain.entities import (
+    Dealer,
+    Deck,
+    Game,
+    GameChanges,
+    Hand,
+    Player,
+    PlayerResult,
+)
+from domain.entities.deck import SEED_BYTES
+
+
+class GameCodecError(Exception):
+    pass
+
+
+class GameCodec(ABC):
+    @abstractmethod
+    def encode(self, game: Game) -> bytes:
+        """Сериализовать игру для кэша"""
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Game:
+        """Восстановить игру из кэша"""
+        pass
+
+
+class JsonGameCodec(GameCodec):
+    """Прежний формат: JSON схемы GameSchema."""
+
+    def encode(self, game: Game) -> bytes:
+        game_schema = GameSchema.model_validate(game, from_attributes=True)
+        return game_schema.model_dump_json().encode()
+
+    def decode(self, data: bytes) -> Game:
+        return Game.from_dto(GameSchema.model_validate_json(data))
+
+
+NO_CARD = 0xFF
+NO_NAME = 0xFFFF
+
+FLAG_EXPLICIT_DECK = 0b01
+FLAG_UTC_CREATED_AT = 0b10
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+RESULTS: tuple[PlayerResult | None, ...] = (None, *PlayerResult)
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+# version, flags, chat_id, created_at (мкс), current_player_index, current_round
+_META = struct.Struct("<BBqqHB")
+# seed, cursor
+_DECK = struct.Struct(f"<{SEED_BYTES}sB")
+# first_card, secret_card, количество карт
+_DEALER = struct.Struct("<BBB")
+# tg_id, bid, result, количество карт, длина имени
+_PLAYER = struct.Struct("<qqBBH")
+_COUNT = struct.Struct("<H")
+_FLAGS = struct.Struct("<B")
+_TG_ID = struct.Struct("<q")
+
+FIELD_META = b"meta"
+FIELD_DECK = b"deck"
+FIELD_DEALER = b"dealer"
+FIELD_PLAYER_PREFIX = b"player:"
+
+
+def _encode_created_at(created_at: datetime) -> tuple[int, int]:
+    if created_at.tzinfo is None:
+        return 0, (created_at - _EPOCH) // _MICROSECOND
+    return FLAG_UTC_CREATED_AT, (created_at - _EPOCH_UTC) // _MICROSECOND
+
+
+def _decode_created_at(flags: int, micros: int) -> datetime:
+    if flags & FLAG_UTC_CREATED_AT:
+        return _EPOCH_UTC + micros * _MICROSECOND
+    return _EPOCH + micros * _MICROSECOND
+
+
+def encode_player(player: Player) -> bytes:
+    if player.name is None:
+        name, name_len = b"", NO_NAME
+    else:
+        name = player.name.encode()
+        name_len = len(name)
+    return (
+        _PLAYER.pack(
+            player.tg_id,
+            player.bid,
+            RESULT_CODES[player.result],
+            len(player.cards),
+            name_len,
+        )
+        + player.cards.cards.tobytes()
+        + name
+    )
+
+
+def decode_player(data: bytes | memoryview, offset: int = 0) -> tuple[Player, int]:
+    tg_id, bid, result, cards_len, name_len = _PLAYER.unpack_from(data, offset)
+    offset += _PLAYER.size
+    cards = Hand(data[offset : offset + cards_len])
+    offset += cards_len
+    name = None
+    if name_len != NO_NAME:
+        name = bytes(data[offset : offset + name_len]).decode()
+        offset += name_len
+    player = Player(
+        name=name,
+        tg_id=tg_id,
+        bid=bid,
+        cards=cards,
+        result=RESULTS[result],
+    )
+    return player, offset
+
+
+def encode_dealer(dealer: Dealer) -> bytes:
+    first_card = NO_CARD if dealer.first_card is None else dealer.first_card
+    secret_card = NO_CARD if dealer.secret_card is None else dealer.secret_card
+    return (
+        _DEALER.pack(first_card, secret_card, len(dealer.cards))
+        + dealer.cards.cards.tobytes()
+    )
+
+
+def decode_dealer(data: bytes | memoryview, offset: int = 0) -> tuple[Dealer, int]:
+    first_card, secret_card, cards_len = _DEALER.unpack_from(data, offset)
+    offset += _DEALER.size
+    dealer = Dealer(
+        cards=Hand(data[offset : offset + cards_len]),
+        first_card=None if first_card == NO_CARD else first_card,
+        secret_card=None if secret_card == NO_CARD else secret_card,
+    )
+    return dealer, offset + cards_len
+
+
+def encode_deck(deck: Deck) -> bytes:
+    if deck.seed is None:
+        cards = bytes(deck.cards)
+        return _COUNT.pack(len(cards)) + cards
+    return _DECK.pack(deck.seed.to_bytes(SEED_BYTES, "little"), deck.cursor)
+
+
+def decode_deck(
+    data: bytes | memoryview,
+    offset: int = 0,
+    explicit: bool = False,
+) -> tuple[Deck, int]:
+    if explicit:
+        (cards_len,) = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        deck = Deck.from_cards(data[offset : offset + cards_len])
+        return deck, offset + cards_len
+    seed, cursor = _DECK.unpack_from(data, offset)
+    deck = Deck(seed=int.from_bytes(seed, "little"), cursor=cursor)
+    return deck, offset + _DECK.size
+
+
+class BinaryGameCodec(GameCodec):
+    """Компактный формат игры на struct.
+
+    Первый байт - версия формата. Блобы, начинающиеся с '{', считаются
+    старым JSON и читаются через legacy-кодек.
+    """
+
+    VERSION = 1
+
+    def __init__(self, legacy: GameCodec | None = None):
+        self.legacy = legacy if legacy is not None else JsonGameCodec()
+
+    def encode(self, game: Game) -> bytes:
+        flags, created_at = _encode_created_at(game.created_at)
+        if game.deck.seed is None:
+            flags |= FLAG_EXPLICIT_DECK
+        parts = [
+            _META.pack(
+                self.VERSION,
+                flags,
+                game.chat_id,
+                created_at,
+                game.current_player_index,
+                game.current_round,
+            ),
+            encode_deck(game.deck),
+            encode_dealer(game.dealer),
+            _COUNT.pack(len(game.players)),
+        ]
+        parts.extend(encode_player(player) for player in game.players.values())
+        return b"".join(parts)
+
+    def encode_fields(
+        self,
+        game: Game,
+        changes: GameChanges | None = None,
+    ) -> dict[bytes, bytes]:
+        """Поля хеша игры; при changes=None - все поля."""
+        fields = {}
+        if changes is None or changes.meta:
+            flags, created_at = _encode_created_at(game.created_at)
+            fields[FIELD_META] = b"".join(
+                (
+                    _META.pack(
+                        self.VERSION,
+                        flags,
+                        game.chat_id,
+                        created_at,
+                        game.current_player_index,
+                        game.current_round,
+                    ),
+                    _COUNT.pack(len(game.turn_order)),
+                    *(_TG_ID.pack(tg_id) for tg_id in game.turn_order),
+                )
+            )
+        if changes is None or changes.deck:
+            flags = FLAG_EXPLICIT_DECK if game.deck.seed is None else 0
+            fields[FIELD_DECK] = _FLAGS.pack(flags) + encode_deck(game.deck)
+        if changes is None or changes.dealer:
+            fields[FIELD_DEALER] = encode_dealer(game.dealer)
+        player_ids = game.turn_order if changes is None else changes.players
+        for tg_id in player_ids:
+            fields[self.player_field(tg_id)] = encode_player(game.players[tg_id])
+        return fields
+
+    def decode_fields(self, fields: dict[bytes, bytes]) -> Game:
+        try:
+            meta = fields[FIELD_META]
+            deck_data = fields[FIELD_DECK]
+            dealer_data = fields[FIELD_DEALER]
+        except KeyError as e:
+            raise GameCodecError(f"Game hash has no field {e}") from e
+        if meta[0] != self.VERSION:
+            raise GameCodecError(f"Unknown game hash version {meta[0]}")
+
+        _, flags, chat_id, created_at, player_index, current_round = _META.unpack_from(
+            meta
+        )
+        offset = _META.size
+        (players_count,) = _COUNT.unpack_from(meta, offset)
+        offset += _COUNT.size
+        players = {}
+        for _ in range(players_count):
+            (tg_id,) = _TG_ID.unpack_from(meta, offset)
+            offset += _TG_ID.size
+            player, _ = decode_player(fields[self.player_field(tg_id)])
+            players[tg_id] = player
+
+        (deck_flags,) = _FLAGS.unpack_from(deck_data)
+        deck, _ = decode_deck(
+            deck_data, _FLAGS.size, bool(deck_flags & FLAG_EXPLICIT_DECK)
+        )
+        dealer, _ = decode_dealer(dealer_data)
+
+        return Game(
+            chat_id=chat_id,
+            players=players,
+            dealer=dealer,
+            created_at=_decode_created_at(flags, created_at),
+            current_player_index=player_index,
+            current_round=current_round,
+            deck=deck,
+        )
+
+    @staticmethod
+    def player_field(tg_id: int) -> bytes:
+        return FIELD_PLAYER_PREFIX + str(tg_id).encode()
+
+    def decode(self, data: bytes) -> Game:
+        if not data:
+            raise GameCodecError("Empty game blob")
+        if data[:1] == b"{":
+            return self.legacy.decode(data)
+        if data[0] != self.VERSION:
+            raise GameCodecError(f"Unknown game blob version {data[0]}")
+
+        view = memoryview(data)
+        _, flags, chat_id, created_at, player_index, current_round = _META.unpack_from(
+            view
+        )
+        offset = _META.size
+        deck, offset = decode_deck(view, offset, bool(flags & FLAG_EXPLICIT_DECK))
+        dealer, offset = decode_dealer(view, offset)
+        (players_count,) = _COUNT.unpack_from(view, offset)
+        offset += _COUNT.size
+        players = {}
+        for _ in range(players_count):
+            player, offset = decode_player(view, offset)
+            players[player.tg_id] = player
+
+        return Game(
+            chat_id=chat_id,
+            players=players,
+            dealer=dealer,
+            created_at=_decode_created_at(flags, created_at),
+            current_player_index=player_index,
+            current_round=current_round,
+            deck=deck,
+        )
@@ -0,0 +1,69 @@
+from functools import cache
+
+from application.interfaces import BaseTelegramUserRepo, CacheGameRepoInterface
+from application.services import GameServiceTG, LobbyServiceTG
+from infrastructure.config import settings
+from infrastructure.redis_py.lua_game_engine import RedisLuaGameEngine
+from infrastructure.redis_py.redis_helper import redis_helper
+from infrastructure.repositories import (
+    ActorGameCacheRepo,
+    GAME_CACHE_REPOS,
+    RedisLobbyCacheRepoTG,
+)
+
+
+def _make_store_game_repo():
+    return GAME_CACHE_REPOS[settings.redis.game_layout](
+        redis=redis_helper.get_redis_client(),
+        optimistic=settings.redis.concurrency == "optimistic",
+        max_attempts=settings.redis.max_update_attempts,
+    )
+
+
+@cache
+def get_actor_game_repo() -> ActorGameCacheRepo:
+    """Один реестр акторов на процесс"""
+    return ActorGameCacheRepo(
+        store=_make_store_game_repo(),
+        idle_timeout=settings.redis.game_actor_idle_timeout,
+    )
+
+
+def make_game_service(
+    user_repo: BaseTelegramUserRepo | None = None,
+) -> GameServiceTG:
+    game_repo: CacheGameRepoInterface
+    if settings.redis.game_actors:
+        game_repo = get_actor_game_repo()
+    else:
+        game_repo = _make_store_game_repo()
+    engine = None
+    if settings.redis.game_engine == "lua":
+        engine = RedisLuaGameEngine(redis=redis_helper.get_redis_client())
+    return GameServiceTG(game_repo=game_repo, user_repo=user_repo, engine=engine)
+
+
+def worker_key(key: str) -> str:
+    """Ключ Redis этого процесса-обработчика webhook: стрим запуска игр и
+    таймеры у каждого свои, чтобы их обрабатывал процесс, который ведет чат
+    """
+    if settings.bot.webhook_worker is None:
+        return key
+    return f"{key}:{settings.bot.webhook_worker}"
+
+
+def make_lobby_service(
+    user_repo: BaseTelegramUserRepo | None = None,
+) -> LobbyServiceTG:
+    lobby_repo = RedisLobbyCacheRepoTG(
+        redis=redis_helper.get_redis_client(),
+        stream_key=worker_key("game:starting"),
+        optimistic=settings.redis.concurrency == "optimistic",
+        max_attempts=settings.redis.max_update_attempts,
+    )
+    return LobbyServiceTG(lobby_repo=lobby_repo, user_repo=user_repo)
+
+
+async def close_game_actors():
+    if settings.redis.game_actors:
+        await get_actor_game_repo().close()
@@ -0,0 +1,23 @@
+-- Забрать таймеры, срок которых наступил.
+--
+-- KEYS[1] - ZSET сроков (мс), KEYS[2] - хеш с данными таймеров,
+-- ARGV[1] - текущее время, ARGV[2] - сколько забрать, ARGV[3] - срок аренды.
+--
+-- Забранный таймер не удаляется, а получает срок аренды: если процесс
+-- упадет до complete_timer.lua, таймер сработает снова после аренды
+-- (срок аренды - ARGV[3], в ответ он не входит).
+-- Ответ: {ключ1, данные1, ключ2, данные2, ...}
+
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local result = {}
+for _, key in ipairs(due) do
+    local data = redis.call('HGET', KEYS[2], key)
+    if data then
+        redis.call('ZADD', KEYS[1], ARGV[3], key)
+        table.insert(result, key)
+        table.insert(result, data)
+    else
+        redis.call('ZREM', KEYS[1], key)
+    end
+end
+return result
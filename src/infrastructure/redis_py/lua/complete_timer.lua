@@ -0,0 +1,15 @@
+-- Завершить сработавший таймер.
+--
+-- KEYS[1] - ZSET сроков, KEYS[2] - хеш с данными таймеров,
+-- ARGV[1] - ключ таймера, ARGV[2] - срок аренды из claim_timers.lua.
+--
+-- Если срок таймера уже не равен аренде, таймер за это время отменили
+-- или поставили заново - его не трогаем. Ответ: 1 - удален, 0 - нет.
+
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score or tonumber(score) ~= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return 1
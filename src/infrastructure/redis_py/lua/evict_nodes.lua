@@ -0,0 +1,13 @@
+-- Удалить узлы с истекшей арендой.
+--
+-- KEYS[1] - ZSET узлов со сроками аренды (мс), ARGV[1] - текущее время.
+--
+-- Проверка и удаление атомарны: узел, успевший продлить аренду, не
+-- удаляется, а каждый истекший узел достается ровно одному вызывающему.
+-- Ответ: {узел1, узел2, ...}
+
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+end
+return expired
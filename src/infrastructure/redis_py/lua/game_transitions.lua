@@ -0,0 +1,308 @@
+-- Переходы игры над хешем Game:{chat_id} в формате BinaryGameCodec.encode_fields.
+-- Повторяет логику domain.entities.game.Game для действий
+-- hit, stand, bid и out (исключение игрока по таймеру).
+--
+-- KEYS[1] - ключ игры, KEYS[2] - счетчик версии (game-version:{chat_id}),
+-- ARGV[1] - действие, ARGV[2] - tg_id игрока, ARGV[3] - ставка (для bid).
+--
+-- Ответ: {статус, a, b, c, поле1, значение1, ...}
+--   hit/stand/out: a - найден следующий игрок, b - действие дилера
+--                  (0 нет, 1 reveal, 2 turns), c - сколько карт взял дилер
+--   bid:           a - все ставки сделаны, b - результат текущего игрока до раздачи
+
+local VERSION = 1
+local FLAG_EXPLICIT_DECK = 1
+-- game_codec.RESULT_CODES
+local RESULT_NONE = 0
+local RESULT_OUT = 3
+local RESULT_BUST = 4
+local RESULT_BLACKJACK = 5
+
+local DEALER_NONE = 0
+local DEALER_REVEAL = 1
+local DEALER_TURNS = 2
+
+local key = KEYS[1]
+local action = ARGV[1]
+local player_field = "player:" .. ARGV[2]
+
+local raw = redis.call("HGETALL", key)
+if #raw == 0 then
+    return {"missing"}
+end
+local fields = {}
+for i = 1, #raw, 2 do
+    fields[raw[i]] = raw[i + 1]
+end
+local changed = {}
+
+-- meta: version, flags, chat_id, created_at, current_player_index, current_round,
+-- затем количество игроков и их tg_id в порядке ходов
+local meta = fields["meta"]
+if string.byte(meta, 1) ~= VERSION then
+    return redis.error_reply("Unknown game hash version")
+end
+local index, round, pos = struct.unpack("<HB", meta, 19)
+local players_count
+players_count, pos = struct.unpack("<H", meta, pos)
+local order = {}
+local players = {}
+for i = 1, players_count do
+    local tg_id
+    tg_id, pos = struct.unpack("<i8", meta, pos)
+    local field = "player:" .. string.format("%d", tg_id)
+    order[i] = field
+    -- tg_id, bid, result, количество карт, длина имени
+    local data = fields[field]
+    local bid, result, cards_len, name_len, next_pos = struct.unpack("<i8BBH", data, 9)
+    players[field] = {
+        head = string.sub(data, 1, 8),
+        bid = bid,
+        result = result,
+        cards = string.sub(data, next_pos, next_pos + cards_len - 1),
+        name_len = name_len,
+        name = string.sub(data, next_pos + cards_len),
+    }
+end
+
+local function save_player(field)
+    local p = players[field]
+    fields[field] = p.head
+        .. struct.pack("<i8BBH", p.bid, p.result, #p.cards, p.name_len)
+        .. p.cards
+        .. p.name
+end
+
+-- deck: флаги, затем seed и cursor либо явный список карт (следующая - в конце)
+local deck = fields["deck"]
+local deck_explicit = bit.band(string.byte(deck, 1), FLAG_EXPLICIT_DECK) ~= 0
+local deck_seed, deck_cursor, deck_cards
+if deck_explicit then
+    local cards_len, next_pos = struct.unpack("<H", deck, 2)
+    deck_cards = string.sub(deck, next_pos, next_pos + cards_len - 1)
+else
+    deck_seed, deck_cursor = struct.unpack("<c16B", deck, 2)
+end
+local permutation
+
+-- domain.entities.deck.deck_permutation: 32-битные слова из
+-- SHA-1(сид || номер блока), по 5 на блок
+local function deck_permutation(seed)
+    local cards = {}
+    for i = 0, 51 do
+        cards[i] = i
+    end
+    local block, digest, word = 0, nil, 5
+    for i = 51, 1, -1 do
+        if word == 5 then
+            digest = redis.sha1hex(seed .. string.char(block))
+            block, word = block + 1, 0
+        end
+        local value = tonumber(string.sub(digest, word * 8 + 1, word * 8 + 8), 16)
+        word = word + 1
+        local j = math.fmod(value, i + 1)
+        cards[i], cards[j] = cards[j], cards[i]
+    end
+    return cards
+end
+
+local function draw()
+    changed["deck"] = true
+    if deck_explicit then
+        local card = string.byte(deck_cards, #deck_cards)
+        deck_cards = string.sub(deck_cards, 1, #deck_cards - 1)
+        return card
+    end
+    if permutation == nil then
+        permutation = deck_permutation(deck_seed)
+    end
+    local card = permutation[deck_cursor]
+    deck_cursor = deck_cursor + 1
+    return card
+end
+
+-- dealer: first_card, secret_card, количество карт, карты
+local dealer = fields["dealer"]
+local dealer_head = string.sub(dealer, 1, 2)
+local dealer_cards = string.sub(dealer, 4)
+
+local function score(cards)
+    local total, aces = 0, 0
+    for i = 1, #cards do
+        local rank = string.byte(cards, i) % 13
+        if rank == 12 then
+            total = total + 11
+            aces = aces + 1
+        elseif rank >= 8 then
+            total = total + 10
+        else
+            total = total + rank + 2
+        end
+    end
+    while total > 21 and aces > 0 do
+        total = total - 10
+        aces = aces - 1
+    end
+    return total
+end
+
+local function next_player()
+    changed["meta"] = true
+    while true do
+        index = index + 1
+        local field = order[index + 1]
+        if field == nil then
+            return nil
+        end
+        if players[field].result == RESULT_NONE then
+            return field
+        end
+    end
+end
+
+local function dealer_action()
+    if round == 1 then
+        round = 2
+        index = 0
+        changed["meta"] = true
+        if players[order[1]].result ~= RESULT_NONE then
+            next_player()
+        end
+        return DEALER_REVEAL, 0
+    end
+    if round == 2 then
+        local drawn = 0
+        while score(dealer_cards) < 17 do
+            dealer_cards = dealer_cards .. string.char(draw())
+            drawn = drawn + 1
+            changed["dealer"] = true
+        end
+        return DEALER_TURNS, drawn
+    end
+    return DEALER_NONE, 0
+end
+
+local function pass_turn()
+    if next_player() ~= nil then
+        return 1, DEALER_NONE, 0
+    end
+    local dealer_action_type, drawn = dealer_action()
+    return 0, dealer_action_type, drawn
+end
+
+local function check_turn(field)
+    if players[field] == nil then
+        return "player_not_found"
+    end
+    if order[index + 1] ~= field then
+        return "another_turn"
+    end
+    return nil
+end
+
+local a, b, c = 0, 0, 0
+
+if action == "hit" then
+    local err = check_turn(player_field)
+    if err then
+        return {err}
+    end
+    local p = players[player_field]
+    p.cards = p.cards .. string.char(draw())
+    changed[player_field] = true
+    local player_score = score(p.cards)
+    if player_score > 21 then
+        p.result = RESULT_BUST
+        a, b, c = pass_turn()
+    elseif player_score == 21 and #p.cards == 2 then
+        p.result = RESULT_BLACKJACK
+        a, b, c = pass_turn()
+    end
+elseif action == "stand" then
+    local err = check_turn(player_field)
+    if err then
+        return {err}
+    end
+    a, b, c = pass_turn()
+elseif action == "out" then
+    local p = players[player_field]
+    if p == nil then
+        return {"player_not_found"}
+    end
+    p.result = RESULT_OUT
+    changed[player_field] = true
+    a, b, c = pass_turn()
+elseif action == "bid" then
+    local p = players[player_field]
+    if p == nil then
+        return {"player_not_found"}
+    end
+    p.bid = tonumber(ARGV[3])
+    changed[player_field] = true
+    local all_bets = 1
+    for i = 1, players_count do
+        if players[order[i]].bid == 0 then
+            all_bets = 0
+            break
+        end
+    end
+    a = all_bets
+    local current = order[index + 1]
+    if current ~= nil then
+        b = players[current].result
+    end
+    if all_bets == 1 then
+        for i = 1, players_count do
+            local field = order[i]
+            local dealt = players[field]
+            if dealt.result ~= RESULT_OUT then
+                dealt.cards = dealt.cards .. string.char(draw()) .. string.char(draw())
+                if #dealt.cards == 2 and score(dealt.cards) == 21 then
+                    dealt.result = RESULT_BLACKJACK
+                end
+                changed[field] = true
+            end
+        end
+    end
+else
+    return redis.error_reply("Unknown game action " .. tostring(action))
+end
+
+if changed["meta"] then
+    fields["meta"] = string.sub(meta, 1, 18)
+        .. struct.pack("<HB", index, round)
+        .. string.sub(meta, 22)
+end
+if changed["deck"] then
+    if deck_explicit then
+        fields["deck"] = string.sub(deck, 1, 1)
+            .. struct.pack("<H", #deck_cards)
+            .. deck_cards
+    else
+        fields["deck"] = string.sub(deck, 1, 1)
+            .. struct.pack("<c16B", deck_seed, deck_cursor)
+    end
+end
+if changed["dealer"] then
+    fields["dealer"] = dealer_head .. string.char(#dealer_cards) .. dealer_cards
+end
+
+local write = {}
+for field in pairs(changed) do
+    if players[field] ~= nil then
+        save_player(field)
+    end
+    write[#write + 1] = field
+    write[#write + 1] = fields[field]
+end
+if #write > 0 then
+    redis.call("HSET", key, unpack(write))
+    redis.call("INCR", KEYS[2])
+end
+
+local reply = {"ok", a, b, c}
+for field, value in pairs(fields) do
+    reply[#reply + 1] = field
+    reply[#reply + 1] = value
+end
+return reply
@@ -0,0 +1,26 @@
+-- Проверка частоты по GCRA.
+--
+-- KEYS[1] - ключ с теоретическим временем прихода (TAT, мс),
+-- ARGV[1] - интервал между запросами (мс), ARGV[2] - запас (burst).
+--
+-- Время берется у Redis, поэтому все процессы считают по одним часам.
+-- Запрос проходит, если TAT - интервал * (burst - 1) не позже текущего
+-- времени; тогда TAT сдвигается на интервал, а ключ живет до TAT.
+-- Ответ: {1, 0} - прошел, {0, сколько мс ждать} - отклонен.
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local allow_at = tat - interval * (burst - 1)
+if now < allow_at then
+    return {0, allow_at - now}
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tat, 'PX', tat - now)
+return {1, 0}
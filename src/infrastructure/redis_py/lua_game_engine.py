@@ -0,0 +1,151 @@
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+from application.interfaces import GameEngineInterface
+from domain.entities import Game, Hand, Player, PlayerResult
+from domain.types.game.exceptions import AnotherPlayerTurn, PlayerNotFound
+from infrastructure.redis_py.game_codec import RESULTS, BinaryGameCodec
+
+GAME_TRANSITIONS_LUA = (
+    Path(__file__).parent / "lua" / "game_transitions.lua"
+).read_text()
+
+DEALER_REVEAL = 1
+DEALER_TURNS = 2
+
+
+class RedisLuaGameEngine(GameEngineInterface):
+    """Переходы игры скриптом Lua (EVALSHA) за один атомарный запрос.
+
+    Работает с хеш-раскладкой игры (RedisHashGameCacheRepo). Скрипт
+    возвращает поля игры после перехода, из них собираются те же данные,
+    что возвращают методы Game.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_prefix: str = "Game",
+        codec: BinaryGameCodec | None = None,
+    ):
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.codec = codec if codec is not None else BinaryGameCodec()
+        self.script = redis.register_script(GAME_TRANSITIONS_LUA)
+
+    def _get_key(self, chat_id: int) -> str:
+        return f"{self.key_prefix}:{chat_id}"
+
+    async def _run(
+        self,
+        chat_id: int,
+        action: str,
+        player_id: int,
+        *args,
+    ) -> tuple[Game, int, int, int] | None:
+        reply = await self.script(
+            keys=[self._get_key(chat_id), f"game-version:{chat_id}"],
+            args=[action, player_id, *args],
+        )
+        status = reply[0]
+        if status == b"missing":
+            return None
+        if status == b"player_not_found":
+            raise PlayerNotFound(f"Player (id='{player_id}' not found")
+        if status == b"another_turn":
+            raise AnotherPlayerTurn(f"Another player turn.")
+
+        _, a, b, c, *flat_fields = reply
+        fields = dict(zip(flat_fields[::2], flat_fields[1::2]))
+        return self.codec.decode_fields(fields), a, b, c
+
+    @staticmethod
+    def _dealer_action_data(game: Game, action: int, drawn: int) -> dict | None:
+        if action == DEALER_REVEAL:
+            player = game.get_current_turn_player(data=True)
+            return {
+                "data": {"dealer": game._get_dealer_data(), "player": player},
+                "action": "reveal",
+            }
+        if action == DEALER_TURNS:
+            cards = list(game.dealer.cards)
+            turns = []
+            for count in range(len(cards) - drawn + 1, len(cards) + 1):
+                hand = Hand(cards[:count])
+                turns.append({"cards": str(hand), "score": hand.score})
+            return {"data": turns, "action": "turns"}
+        return None
+
+    async def _pass_turn(
+        self,
+        chat_id: int,
+        action: str,
+        player_id: int,
+    ) -> dict | None:
+        res = await self._run(chat_id, action, player_id)
+        if res is None:
+            return None
+        game, has_next, dealer_action, drawn = res
+
+        data = {"dealer_action": self._dealer_action_data(game, dealer_action, drawn)}
+        data["player"] = game._get_player_data(game.players[player_id])
+        if has_next:
+            data["next_player"] = game.get_current_turn_player(data=True)
+        return data
+
+    async def player_bid(
+        self,
+        chat_id: int,
+        player_id: int,
+        bid: int,
+    ) -> dict | None:
+        res = await self._run(chat_id, "bid", player_id, bid)
+        if res is None:
+            return None
+        game, all_bets, current_result, _ = res
+        if not all_bets:
+            return {"all_bets": False}
+
+        # Данные текущего игрока отдаются в том виде, какими были до раздачи
+        current = game.get_current_turn_player()
+        result = RESULTS[current_result]
+        cards = list(current.cards)
+        before_deal = Player(
+            name=current.name,
+            tg_id=current.tg_id,
+            bid=current.bid,
+            cards=Hand(cards if result == PlayerResult.OUT else cards[:-2]),
+            result=result,
+        )
+        return {
+            "all_bets": True,
+            "player": game._get_player_data(before_deal),
+            "dealer": game._get_dealer_data(),
+            "the_deal": [
+                game._get_player_data(player)
+                for player in game.players.values()
+                if player.result != PlayerResult.OUT
+            ],
+        }
+
+    async def player_hit(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        return await self._pass_turn(chat_id, "hit", player_id)
+
+    async def player_stand(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        return await self._pass_turn(chat_id, "stand", player_id)
+
+    async def set_out_for_player(
+        self,
+        chat_id: int,
+        player_id: int,
+    ) -> dict | None:
+        return await self._pass_turn(chat_id, "out", player_id)
@@ -0,0 +1,128 @@
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, TypeVar
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.lock import Lock
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ConcurrentUpdateError(Exception):
+    pass
+
+
+class ContentionMetrics:
+    """Счетчики оптимистичных транзакций по чатам.
+
+    retries - сколько раз транзакция повторялась из-за конфликта,
+    aborts - сколько раз попытки закончились и обновление не прошло.
+    Для режима lock - сколько раз брали блокировку и самое долгое ее
+    удержание в секундах.
+    """
+
+    def __init__(self):
+        self.commits: Counter[int] = Counter()
+        self.retries: Counter[int] = Counter()
+        self.aborts: Counter[int] = Counter()
+        self.lock_holds: Counter[int] = Counter()
+        self.max_lock_hold: dict[int, float] = {}
+
+    def observe_lock_hold(self, chat_id: int, seconds: float):
+        self.lock_holds[chat_id] += 1
+        self.max_lock_hold[chat_id] = max(self.max_lock_hold.get(chat_id, 0), seconds)
+
+    def snapshot(self) -> dict[int, dict[str, int | float]]:
+        chats = self.retries.keys() | self.aborts.keys() | self.max_lock_hold.keys()
+        return {
+            chat_id: {
+                "commits": self.commits[chat_id],
+                "retries": self.retries[chat_id],
+                "aborts": self.aborts[chat_id],
+                "lock_holds": self.lock_holds[chat_id],
+                "max_lock_hold": self.max_lock_hold.get(chat_id, 0),
+            }
+            for chat_id in chats
+        }
+
+    def most_contended(self, n: int = 10) -> list[tuple[int, int]]:
+        return self.retries.most_common(n)
+
+    def reset(self):
+        self.commits.clear()
+        self.retries.clear()
+        self.aborts.clear()
+        self.lock_holds.clear()
+        self.max_lock_hold.clear()
+
+
+contention_metrics = ContentionMetrics()
+
+
+@asynccontextmanager
+async def held_lock(
+    lock: Lock,
+    chat_id: int,
+    metrics: ContentionMetrics | None = None,
+):
+    """redis.lock с замером удержания.
+
+    Под блокировкой должны быть только запросы к Redis. Удержание дольше
+    половины timeout пишется в лог: после timeout блокировка истекает и
+    ее получает следующий писатель.
+    """
+    metrics = metrics if metrics is not None else contention_metrics
+    async with lock:
+        started = time.perf_counter()
+        try:
+            yield lock
+        finally:
+            held = time.perf_counter() - started
+            metrics.observe_lock_hold(chat_id, held)
+            if lock.timeout is not None and held > lock.timeout / 2:
+                logger.warning(
+                    "Lock %s held for %.2fs of %ss timeout",
+                    lock.name,
+                    held,
+                    lock.timeout,
+                )
+
+
+async def optimistic_transaction(
+    redis: Redis,
+    chat_id: int,
+    watch: list[str],
+    attempt: Callable[[Pipeline], Awaitable[T]],
+    max_attempts: int = 5,
+    metrics: ContentionMetrics | None = None,
+) -> T:
+    """Чтение и запись под WATCH, при конфликте попытка повторяется сразу.
+
+    attempt читает через pipe (после WATCH команды выполняются сразу),
+    затем вызывает pipe.multi() и ставит запись в очередь. Если multi не
+    вызван, писать нечего и результат возвращается как есть.
+    """
+    metrics = metrics if metrics is not None else contention_metrics
+    for _ in range(max_attempts):
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(*watch)
+                result = await attempt(pipe)
+                if pipe.explicit_transaction:
+                    await pipe.execute()
+                    metrics.commits[chat_id] += 1
+                return result
+            except WatchError:
+                metrics.retries[chat_id] += 1
+
+    metrics.aborts[chat_id] += 1
+    logger.warning(
+        "Optimistic update of %s aborted after %d attempts", watch[0], max_attempts
+    )
+    raise ConcurrentUpdateError(f"Too many concurrent updates of {watch[0]}")
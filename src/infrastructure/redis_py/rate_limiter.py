@@ -0,0 +1,101 @@
+import logging
+from collections import OrderedDict
+from pathlib import Path
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from utils.clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+GCRA_LUA = (Path(__file__).parent / "lua" / "gcra.lua").read_text()
+
+
+class DeadlineCache:
+    """LRU не больше max_keys ключей со сроком: запись со сроком в
+    прошлом считается отсутствующей и удаляется.
+    """
+
+    def __init__(self, max_keys: int = 10_000):
+        self.max_keys = max_keys
+        self._entries: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> float | None:
+        deadline = self._entries.get(key)
+        if deadline is None:
+            return None
+        if deadline <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return deadline
+
+    def set(self, key: str, deadline: float, now: float):
+        self._entries[key] = deadline
+        self._entries.move_to_end(key)
+        # Давно не тронутые записи в начале - либо истекли, либо лишние
+        while self._entries:
+            oldest, oldest_deadline = next(iter(self._entries.items()))
+            if oldest_deadline > now and len(self._entries) <= self.max_keys:
+                break
+            del self._entries[oldest]
+
+
+class GcraRateLimiter:
+    """Ограничение частоты по GCRA: не чаще раза в interval секунд, с
+    запасом до burst запросов подряд.
+
+    Без redis состояние (TAT ключа) хранится в DeadlineCache процесса. С
+    redis состояние общее для всех процессов и меняется атомарно
+    скриптом gcra.lua, а в DeadlineCache запоминается, до какого момента
+    ключу отказано: TAT только растет, поэтому до этого момента Redis
+    можно не спрашивать. Если Redis недоступен, запрос пропускается.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        burst: int = 1,
+        max_keys: int = 10_000,
+        key_prefix: str = "flood",
+    ):
+        self.redis = redis
+        self.burst = burst
+        self.key_prefix = key_prefix
+        self.local = DeadlineCache(max_keys)
+        self._gcra = redis.register_script(GCRA_LUA) if redis is not None else None
+
+    async def acquire(self, key: str, interval: float) -> float:
+        """0 - запрос прошел, иначе через сколько секунд пройдет следующий"""
+        now = get_clock().timestamp()
+        if self.redis is None:
+            return self._acquire_local(key, interval, now)
+
+        denied_until = self.local.get(key, now)
+        if denied_until is not None:
+            return denied_until - now
+        try:
+            allowed, wait_ms = await self._gcra(
+                keys=[f"{self.key_prefix}:{key}"],
+                args=[int(interval * 1000), self.burst],
+            )
+        except RedisError:
+            logger.warning("Rate limiter is unavailable, request for %s passed", key)
+            return 0
+        if allowed:
+            return 0
+        wait = wait_ms / 1000
+        self.local.set(key, now + wait, now)
+        return wait
+
+    def _acquire_local(self, key: str, interval: float, now: float) -> float:
+        tat = max(self.local.get(key, now) or now, now)
+        allow_at = tat - interval * (self.burst - 1)
+        if now < allow_at:
+            return allow_at - now
+        self.local.set(key, tat + interval, now)
+        return 0
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+from application.services import GameServiceTG, LobbyServiceTG
+from application.services.lobby_ticker import format_lobby_text, lobby_ticker
+from application.services.timer_mng import TimerPayload, timer_manager
+from domain.entities import Game
+from infrastructure.redis_py.events.event_system import game_service_getter
+from infrastructure.redis_py.game_service_factory import make_lobby_service
+from infrastructure.repositories import RedisLobbyCacheRepoTG
+from utils.tg.functions import handle_game_ending, pass_turn_next_player
+
+logger = logging.getLogger(__name__)
+
+RESTART_TEXT = "Бот был перезапущен, игра продолжается."
+
+
+class StartupRecovery:
+    """Восстановление лобби и игр после перезапуска.
+
+    chat_id живых лобби и игр читаются SSCAN пачками по batch_size из
+    множеств-индексов репозиториев, поэтому работа зависит от числа
+    живых чатов, а не от размера базы. Сроки таймеров в Redis не
+    хранятся, поэтому лобби, ставки и ход без таймера получают новый
+    срок timeout (ход - обычные 15 секунд) и новое сообщение. Игры
+    старше max_age отменяются с возвратом ставок, а игры, в которых
+    дилер уже доиграл, рассчитываются. owns отбирает чаты этого
+    процесса, когда чаты поделены между процессами.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        bot: Bot,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        timeout: int = 30,
+        max_age: float = 3600,
+        games_index: str = "games:live",
+        lobbies_index: str = "lobbies:live",
+        owns: Callable[[int], bool] | None = None,
+        index_lock_timeout: float = 60,
+    ):
+        self.redis = redis
+        self.bot = bot
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_age = timedelta(seconds=max_age)
+        self.games_index = games_index
+        self.lobbies_index = lobbies_index
+        self.owns = owns
+        self.index_lock_timeout = index_lock_timeout
+        self._limit = asyncio.Semaphore(concurrency)
+
+    async def _build_index(self, index_key: str, key_prefix: str):
+        """Один раз заполнить индекс ключами, записанными до его появления.
+
+        Процессы стартуют вместе, поэтому индекс строит один из них под
+        блокировкой, а остальные ждут ее. Отметка ставится только после
+        полного обхода: если процесс упал посреди него, блокировка истечет
+        через index_lock_timeout, и индекс достроит следующий.
+        """
+        built_key = f"{index_key}:built"
+        if await self.redis.exists(built_key):
+            return
+        lock = self.redis.lock(
+            f"{index_key}:build-lock",
+            timeout=self.index_lock_timeout,
+            blocking_timeout=None,
+        )
+        await lock.acquire()
+        try:
+            if not await self.redis.exists(built_key):
+                await self._scan_keys(index_key, key_prefix)
+                await self.redis.set(built_key, 1)
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                # Обход дольше index_lock_timeout: SADD повторять безопасно
+                logger.warning("Index %s build lock expired", index_key)
+
+    async def _scan_keys(self, index_key: str, key_prefix: str):
+        chat_ids = []
+        async for key in self.redis.scan_iter(
+            match=f"{key_prefix}:*", count=self.batch_size
+        ):
+            chat_id = key.decode().split(":", 1)[1]
+            if chat_id.lstrip("-").isdigit():
+                chat_ids.append(int(chat_id))
+            if len(chat_ids) >= self.batch_size:
+                await self.redis.sadd(index_key, *chat_ids)
+                chat_ids.clear()
+        if chat_ids:
+            await self.redis.sadd(index_key, *chat_ids)
+
+    async def _scan(self, index_key: str) -> AsyncIterator[list[int]]:
+        seen: set[int] = set()
+        cursor = 0
+        while True:
+            cursor, members = await self.redis.sscan(
+                index_key, cursor, count=self.batch_size
+            )
+            # SSCAN может вернуть элемент дважды
+            batch = [int(m) for m in members if int(m) not in seen]
+            seen.update(batch)
+            if self.owns is not None:
+                batch = [chat_id for chat_id in batch if self.owns(chat_id)]
+            if batch:
+                yield batch
+            if cursor == 0:
+                return
+
+    async def _limited(self, coro) -> str:
+        async with self._limit:
+            try:
+                return await coro
+            except Exception:
+                logger.exception("Startup recovery of a chat failed")
+                return "failed"
+
+    async def _recover_lobby(self, lobby_service: LobbyServiceTG, lobby_schema) -> str:
+        chat_id = lobby_schema.chat_id
+        if await timer_manager.has_timer("lobby", chat_id):
+            return "kept"
+        msg = await self.bot.send_message(
+            chat_id=chat_id,
+            text=format_lobby_text(lobby_schema.names, self.timeout),
+        )
+        lobby_ticker.add(msg, self.timeout)
+        await lobby_service.start_timer(chat_id, self.timeout)
+        return "rearmed"
+
+    async def recover_lobbies(self) -> Counter[str]:
+        stats: Counter[str] = Counter()
+        lobby_service = make_lobby_service()
+        lobby_repo: RedisLobbyCacheRepoTG = lobby_service.lobby_repo
+        await self._build_index(self.lobbies_index, lobby_repo.key_prefix)
+        async for chat_ids in self._scan(self.lobbies_index):
+            lobbies = await lobby_repo.get_lobbies(chat_ids)
+            stale = [chat_id for chat_id in chat_ids if chat_id not in lobbies]
+            if stale:
+                await self.redis.srem(self.lobbies_index, *stale)
+                stats["stale"] += len(stale)
+            results = await asyncio.gather(
+                *(
+                    self._limited(self._recover_lobby(lobby_service, lobby_schema))
+                    for lobby_schema in lobbies.values()
+                )
+            )
+            stats.update(results)
+        return stats
+
+    def _is_abandoned(self, game: Game) -> bool:
+        return datetime.now(game.created_at.tzinfo) - game.created_at > self.max_age
+
+    async def _recover_game(self, chat_id: int) -> str:
+        async with game_service_getter(True) as game_service:
+            game = await game_service.game_repo.get_game(chat_id)
+            if game is None:
+                await self.redis.srem(self.games_index, chat_id)
+                return "stale"
+            if self._is_abandoned(game):
+                return await self._cancel_game(game_service, chat_id)
+
+            if game.is_bidding():
+                return await self._rearm_bid(game_service, chat_id)
+
+            player = game.get_current_turn_player(data=True)
+            if player is not None:
+                if await timer_manager.has_timer(
+                    "game:turn", chat_id, player["player_id"]
+                ):
+                    return "kept"
+                msg = await self.bot.send_message(chat_id=chat_id, text=RESTART_TEXT)
+                await pass_turn_next_player(msg, player, game_service)
+                return "rearmed"
+
+            if game.current_round == 2:
+                # Дилер доиграл до перезапуска, остался расчет
+                msg = await self.bot.send_message(chat_id=chat_id, text=RESTART_TEXT)
+                await handle_game_ending(msg, game_service)
+                return "settled"
+            return await self._cancel_game(game_service, chat_id)
+
+    async def _rearm_bid(self, game_service: GameServiceTG, chat_id: int) -> str:
+        if await timer_manager.has_timer("game:bid", chat_id):
+            return "kept"
+        msg = await self.bot.send_message(
+            chat_id=chat_id,
+            text=f"{RESTART_TEXT}\nДелайте ставки к началу игры.",
+        )
+        await timer_manager.create_timer(
+            "game:bid",
+            chat_id,
+            game_service.bid_timer,
+            None,
+            self.timeout,
+            TimerPayload.from_message(msg, "game:bid"),
+        )
+        return "rearmed"
+
+    async def _cancel_game(self, game_service: GameServiceTG, chat_id: int) -> str:
+        if await game_service.cancel_game(chat_id) is None:
+            return "stale"
+        await self.bot.send_message(
+            chat_id=chat_id,
+            text="Игра прервана перезапуском бота, ставки возвращены.",
+        )
+        return "cancelled"
+
+    async def recover_games(self) -> Counter[str]:
+        stats: Counter[str] = Counter()
+        await self._build_index(self.games_index, "Game")
+        async for chat_ids in self._scan(self.games_index):
+            results = await asyncio.gather(
+                *(self._limited(self._recover_game(chat_id)) for chat_id in chat_ids)
+            )
+            stats.update(results)
+        return stats
+
+    async def run(self) -> dict[str, Counter[str]]:
+        stats = {
+            "lobbies": await self.recover_lobbies(),
+            "games": await self.recover_games(),
+        }
+        logger.warning("Startup recovery: %r", stats)
+        return stats
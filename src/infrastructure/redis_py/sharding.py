@@ -0,0 +1,194 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable
+
+from redis.asyncio import Redis
+
+from utils.clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+EVICT_NODES_LUA = (Path(__file__).parent / "lua" / "evict_nodes.lua").read_text()
+
+ForwardHandler = Callable[[dict[str, Any]], Awaitable[Any]]
+RebalanceCallback = Callable[["HashRing", "HashRing"], Awaitable[Any]]
+
+
+def _hash(key: str) -> int:
+    # hash() у каждого процесса свой, кольцо должно совпадать у всех узлов
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+
+
+def _now_ms() -> int:
+    return int(get_clock().timestamp() * 1000)
+
+
+class HashRing:
+    """Консистентное хеширование чатов по узлам.
+
+    У каждого узла vnodes точек на кольце, чат принадлежит узлу первой
+    точки после хеша чата. Когда узел приходит или уходит, меняют
+    владельца только около 1/N чатов.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.nodes = frozenset(nodes)
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, chat_id: int) -> str | None:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(str(chat_id)))
+        return self._owners[i % len(self._owners)]
+
+
+class ShardRouter:
+    """Владение чатами между экземплярами бота.
+
+    Узлы записаны в ZSET {prefix}:nodes со сроком аренды. Узел продлевает
+    аренду каждые renew_interval секунд, заодно перечитывает состав и
+    удаляет узлы с истекшей арендой (evict_nodes.lua), пересылая их
+    необработанные входящие новым владельцам. Работа по чужому чату -
+    обновление Telegram, таймер, запуск игры - уходит через forward в
+    стрим {prefix}:inbox:<узел> владельца, где ее выполняет обработчик,
+    зарегистрированный по виду (register). При смене состава вызываются
+    обработчики on_rebalance со старым и новым кольцом.
+
+    Пока узлы не увидели новый состав (до renew_interval), чат может
+    считаться своим на двух узлах сразу. В это окно переходы игры
+    корректны только за счет атомарных записей в Redis (WATCH, Lua,
+    блокировки), а порядок обработки обновлений чата не гарантирован.
+    Игры в памяти процесса (game_actors) так не защищены: старый владелец
+    перезапишет игру своим снимком, поэтому вместе с шардированием
+    они запрещены.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        node_id: str,
+        lease: float = 15,
+        renew_interval: float = 5,
+        vnodes: int = 160,
+        key_prefix: str = "shards",
+    ):
+        self.redis = redis
+        self.node_id = node_id
+        self.lease_ms = int(lease * 1000)
+        self.renew_interval = renew_interval
+        self.vnodes = vnodes
+        self.nodes_key = f"{key_prefix}:nodes"
+        self.inbox_prefix = f"{key_prefix}:inbox"
+        # До первого чтения состава все чаты свои
+        self.ring = HashRing((node_id,), vnodes)
+        self.metrics: Counter[str] = Counter()
+        self._handlers: dict[str, ForwardHandler] = {}
+        self._rebalance: list[RebalanceCallback] = []
+        self._evict = redis.register_script(EVICT_NODES_LUA)
+
+    def inbox_key(self, node_id: str | None = None) -> str:
+        return f"{self.inbox_prefix}:{node_id or self.node_id}"
+
+    def owner(self, chat_id: int) -> str:
+        return self.ring.owner(chat_id) or self.node_id
+
+    def owns(self, chat_id: int) -> bool:
+        return self.owner(chat_id) == self.node_id
+
+    def register(self, kind: str, handler: ForwardHandler):
+        self._handlers[kind] = handler
+
+    def on_rebalance(self, callback: RebalanceCallback):
+        self._rebalance.append(callback)
+
+    async def forward(self, chat_id: int, kind: str, payload: dict[str, Any]):
+        """Передать работу по чату его владельцу"""
+        await self._send(
+            self.owner(chat_id),
+            {"kind": kind, "chat_id": chat_id, "payload": json.dumps(payload)},
+        )
+
+    async def _send(self, node_id: str, fields: dict):
+        await self.redis.xadd(self.inbox_key(node_id), fields)
+        self.metrics["forwarded"] += 1
+
+    async def handle(self, data: dict[bytes, bytes]):
+        """Выполнить пересланную работу из входящего стрима"""
+        kind = data[b"kind"].decode()
+        handler = self._handlers.get(kind)
+        if handler is None:
+            raise LookupError(f"No shard handler for {kind!r}")
+        await handler(json.loads(data[b"payload"]))
+        self.metrics[f"handled:{kind}"] += 1
+
+    async def renew(self) -> bool:
+        """Продлить аренду и перечитать состав, True - если он изменился"""
+        now = _now_ms()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.nodes_key, {self.node_id: now + self.lease_ms})
+            pipe.zrangebyscore(self.nodes_key, now, "+inf")
+            _, alive = await pipe.execute()
+        expired = await self._evict(keys=[self.nodes_key], args=[now])
+
+        changed = await self._set_ring(node.decode() for node in alive)
+        for node in expired:
+            node = node.decode()
+            logger.warning("Shard node %s lease expired", node)
+            await self._relay(node)
+        return changed
+
+    async def _set_ring(self, nodes: Iterable[str]) -> bool:
+        ring = HashRing(nodes, self.vnodes)
+        if ring.nodes == self.ring.nodes:
+            return False
+        old, self.ring = self.ring, ring
+        self.metrics["rebalances"] += 1
+        logger.warning("Shard ring changed: %s", sorted(ring.nodes))
+        for callback in self._rebalance:
+            try:
+                await callback(old, ring)
+            except Exception:
+                logger.exception("Shard rebalance callback failed")
+        return True
+
+    async def _relay(self, node_id: str, batch_size: int = 100):
+        """Переслать входящие ушедшего узла владельцам по текущему кольцу"""
+        key = self.inbox_key(node_id)
+        last = "-"
+        while True:
+            entries = await self.redis.xrange(key, min=last, count=batch_size)
+            for msg_id, fields in entries:
+                await self._send(self.owner(int(fields[b"chat_id"])), fields)
+                self.metrics["relayed"] += 1
+            if len(entries) < batch_size:
+                break
+            last = f"({entries[-1][0].decode()}"
+        await self.redis.delete(key)
+
+    async def join(self):
+        await self.renew()
+
+    async def leave(self):
+        """Выйти из кольца, отдав необработанные входящие другим узлам"""
+        await self.redis.zrem(self.nodes_key, self.node_id)
+        alive = await self.redis.zrangebyscore(self.nodes_key, _now_ms(), "+inf")
+        await self._set_ring(node.decode() for node in alive)
+        if self.ring.nodes:
+            await self._relay(self.node_id)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.renew()
+            except Exception:
+                logger.exception("Error renewing shard lease")
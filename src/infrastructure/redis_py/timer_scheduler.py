@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from application.interfaces import TimerSchedulerInterface
+from application.services.timer_mng import TimerPayload
+from infrastructure.redis_py.sharding import ShardRouter
+from utils.clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+LUA_DIR = Path(__file__).parent / "lua"
+CLAIM_TIMERS_LUA = (LUA_DIR / "claim_timers.lua").read_text()
+COMPLETE_TIMER_LUA = (LUA_DIR / "complete_timer.lua").read_text()
+
+TimerEvent = Callable[..., Awaitable[Any]]
+
+
+def _now_ms() -> int:
+    return int(get_clock().timestamp() * 1000)
+
+
+class RedisTimerScheduler(TimerSchedulerInterface):
+    """Таймеры в Redis: ZSET {prefix}:due со сроками и хеш {prefix}:data.
+
+    Любой процесс может поставить, отменить или забрать таймер. run
+    раз в poll_interval забирает до batch_size наступивших таймеров
+    скриптом claim_timers.lua и вызывает события, зарегистрированные по
+    типу таймера. Аргументы TimerPayload хранятся словарем и передаются
+    событию снова как TimerPayload. С use_router событие таймера
+    чужого чата выполняет владелец чата, а сам таймер продолжает вести
+    забравший его процесс.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_prefix: str = "timers",
+        batch_size: int = 100,
+        poll_interval: float = 0.5,
+        lease: float = 60,
+    ):
+        self.redis = redis
+        self.due_key = f"{key_prefix}:due"
+        self.data_key = f"{key_prefix}:data"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_ms = int(lease * 1000)
+        self._events: dict[str, TimerEvent] = {}
+        self.router: ShardRouter | None = None
+        self._running: set[asyncio.Task] = set()
+        self._claim = redis.register_script(CLAIM_TIMERS_LUA)
+        self._complete = redis.register_script(COMPLETE_TIMER_LUA)
+
+    def register(self, timer_type: str, event: TimerEvent):
+        self._events[timer_type] = event
+
+    def use_router(self, router: ShardRouter):
+        self.router = router
+        router.register("timer", self.fire_forwarded)
+
+    @staticmethod
+    def _get_timer_key(
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None = None,
+    ) -> str:
+        if player_id is not None:
+            return f"{timer_type}:{chat_id}:{player_id}"
+        return f"{timer_type}:{chat_id}"
+
+    @staticmethod
+    def _encode_arg(arg: Any) -> Any:
+        if isinstance(arg, TimerPayload):
+            return {"timer": arg.to_dict()}
+        return arg
+
+    @staticmethod
+    def _decode_arg(arg: Any) -> Any:
+        if isinstance(arg, dict) and "timer" in arg:
+            return TimerPayload.from_dict(arg["timer"])
+        return arg
+
+    async def schedule(
+        self,
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None,
+        timeout: int,
+        args: tuple[Any, ...] = (),
+        kwargs: dict[str, Any] | None = None,
+    ):
+        data = {
+            "type": timer_type,
+            "chat_id": chat_id,
+            "player_id": player_id,
+            "args": [self._encode_arg(arg) for arg in args],
+            "kwargs": {k: self._encode_arg(v) for k, v in (kwargs or {}).items()},
+        }
+        key = self._get_timer_key(timer_type, chat_id, player_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.data_key, key, json.dumps(data))
+            pipe.zadd(self.due_key, {key: _now_ms() + timeout * 1000})
+            await pipe.execute()
+
+    async def cancel(
+        self,
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None = None,
+    ) -> bool:
+        key = self._get_timer_key(timer_type, chat_id, player_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.due_key, key)
+            pipe.hdel(self.data_key, key)
+            removed, _ = await pipe.execute()
+        return bool(removed)
+
+    async def exists(
+        self,
+        timer_type: str,
+        chat_id: int,
+        player_id: int | None = None,
+    ) -> bool:
+        key = self._get_timer_key(timer_type, chat_id, player_id)
+        return await self.redis.zscore(self.due_key, key) is not None
+
+    async def claim_due(self, limit: int) -> list[tuple[str, int, dict]]:
+        """Забрать до limit наступивших таймеров: (ключ, срок аренды, данные)"""
+        now = _now_ms()
+        lease_until = now + self.lease_ms
+        reply = await self._claim(
+            keys=[self.due_key, self.data_key],
+            args=[now, limit, lease_until],
+        )
+        return [
+            (key.decode(), lease_until, json.loads(data))
+            for key, data in zip(reply[::2], reply[1::2])
+        ]
+
+    async def _call_event(self, event: TimerEvent, data: dict):
+        args = [self._decode_arg(arg) for arg in data["args"]]
+        kwargs = {k: self._decode_arg(v) for k, v in data["kwargs"].items()}
+        await event(*args, **kwargs)
+
+    async def fire_forwarded(self, payload: dict):
+        """Событие таймера, пересланное владельцу чата"""
+        data = payload["data"]
+        event = self._events.get(data["type"])
+        if event is None:
+            logger.error("No event registered for timer %s", payload["key"])
+            return
+        await self._call_event(event, data)
+
+    async def _fire(self, key: str, lease_until: int, data: dict):
+        event = self._events.get(data["type"])
+        try:
+            if event is None:
+                logger.error("No event registered for timer %s", key)
+            elif self.router is not None and not self.router.owns(data["chat_id"]):
+                await self.router.forward(
+                    data["chat_id"], "timer", {"key": key, "data": data}
+                )
+            else:
+                await self._call_event(event, data)
+        except Exception:
+            logger.exception("Timer %s event failed", key)
+        try:
+            await self._complete(
+                keys=[self.due_key, self.data_key],
+                args=[key, lease_until],
+            )
+        except Exception:
+            # Таймер сработает еще раз после аренды
+            logger.exception("Error completing timer %s", key)
+
+    async def run(self):
+        while True:
+            free = self.batch_size - len(self._running)
+            try:
+                claimed = await self.claim_due(free) if free > 0 else []
+            except Exception:
+                logger.exception("Error claiming timers")
+                claimed = []
+            for key, lease_until, data in claimed:
+                task = asyncio.create_task(self._fire(key, lease_until, data))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            if not claimed or len(claimed) < free:
+                await asyncio.sleep(self.poll_interval)
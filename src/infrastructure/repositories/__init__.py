@@ -2,6 +2,9 @@ __all__ = (
     "SQLAlchemyUserRepositoryTG",
     "RedisLobbyCacheRepoTG",
     "RedisGameCacheRepo",
+    "RedisHashGameCacheRepo",
+    "ActorGameCacheRepo",
+    "GAME_CACHE_REPOS",
     "RedisLobbyCacheRepoTG",
     "RedisLeaderBoardRepo",
 )
@@ -14,4 +17,13 @@ from infrastructure.repositories.redis_lobby_cache_repo import (
     RedisLobbyCacheRepoTG,
 )
 from infrastructure.repositories.redis_game_cache_repo import RedisGameCacheRepo
+from infrastructure.repositories.redis_hash_game_cache_repo import (
+    RedisHashGameCacheRepo,
+)
+from infrastructure.repositories.actor_game_cache_repo import ActorGameCacheRepo
 from infrastructure.repositories.redis_leaderboard import RedisLeaderBoardRepo
+
+GAME_CACHE_REPOS: dict[str, type[RedisGameCacheRepo]] = {
+    "string": RedisGameCacheRepo,
+    "hash": RedisHashGameCacheRepo,
+}
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from application.interfaces.cache_game_repo_interface import CacheGameRepoInterface
+from domain.entities.game import Game, GameChanges
+from infrastructure.repositories.redis_game_cache_repo import RedisGameCacheRepo
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class GameActor:
+    """Задача, которая владеет игрой одного чата.
+
+    Сообщения из почтового ящика выполняются строго по одному, поэтому
+    переходы упорядочены без блокировок. Игра загружается из store при
+    первом сообщении, а изменения пишутся в store фоновой задачей: записи
+    идут последовательно, накопившиеся за время записи изменения склеиваются.
+    """
+
+    def __init__(
+        self,
+        chat_id: int,
+        store: RedisGameCacheRepo,
+        idle_timeout: float,
+        on_stop: Callable[["GameActor"], None],
+    ):
+        self.chat_id = chat_id
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.game: Game | None = None
+        self._on_stop = on_stop
+        self._loaded = False
+        self._mailbox: asyncio.Queue[
+            tuple[Callable[["GameActor"], Awaitable], asyncio.Future]
+        ] = asyncio.Queue()
+        self._pending = GameChanges()
+        self._pending_full = False
+        self._flush_task: asyncio.Task | None = None
+        self._task = asyncio.create_task(self._run())
+
+    async def call(self, message: Callable[["GameActor"], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._mailbox.put_nowait((message, future))
+        return await future
+
+    def adopt(self, game: Game, changes: GameChanges | None = None):
+        """Заменить игру актора; changes=None - записать игру целиком"""
+        if changes is None or game is not self.game:
+            self._pending_full = True
+        else:
+            self._pending.update(changes)
+        self.game = game
+        self._loaded = True
+
+    async def drop(self):
+        """Забыть игру и удалить ее из store после уже начатых записей"""
+        self.game = None
+        self._loaded = True
+        self._pending = GameChanges()
+        self._pending_full = False
+        await self.flushed()
+        await self.store.delete_cache_game(self.chat_id)
+
+    async def flushed(self):
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+
+    async def stop(self):
+        async def message(actor: GameActor):
+            actor._collect_changes()
+            actor._schedule_flush()
+            await actor.flushed()
+
+        if self._task.done():
+            return
+        await self.call(message)
+        self._task.cancel()
+
+    def _collect_changes(self):
+        if self.game is None or not self.game.changes:
+            return
+        self._pending.update(self.game.changes)
+        self.game.changes = GameChanges()
+
+    def _schedule_flush(self):
+        if not (self._pending or self._pending_full):
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        while self.game is not None and (self._pending or self._pending_full):
+            changes = None if self._pending_full else self._pending
+            self._pending = GameChanges()
+            self._pending_full = False
+            try:
+                await self.store.cache_game(self.game, changes=changes)
+            except Exception:
+                logger.exception("Game snapshot for chat %r failed", self.chat_id)
+                # Что именно не записалось, неизвестно - в следующий раз целиком
+                self._pending_full = True
+                return
+
+    async def _run(self):
+        while True:
+            try:
+                message, future = await asyncio.wait_for(
+                    self._mailbox.get(),
+                    timeout=self.idle_timeout,
+                )
+            except asyncio.TimeoutError:
+                self._schedule_flush()
+                await self.flushed()
+                if self._mailbox.empty():
+                    self._on_stop(self)
+                    return
+                continue
+
+            try:
+                if not self._loaded:
+                    self.game = await self.store.get_game(self.chat_id)
+                    self._loaded = True
+                result = await message(self)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+            self._collect_changes()
+            self._schedule_flush()
+            if self.game is None and self._mailbox.empty():
+                await self.flushed()
+                if self._mailbox.empty():
+                    self._on_stop(self)
+                    return
+
+
+class ActorGameCacheRepo(CacheGameRepoInterface):
+    """Живые игры в памяти процесса, по актору на чат.
+
+    Рассчитан на то, что чат целиком обслуживает один процесс. Redis
+    (store) хранит снимки для восстановления после падения; актор без
+    сообщений дольше idle_timeout дописывает снимок и завершается.
+    """
+
+    def __init__(
+        self,
+        store: RedisGameCacheRepo,
+        idle_timeout: float = 300,
+    ):
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self._actors: dict[int, GameActor] = {}
+
+    def _actor(self, chat_id: int) -> GameActor:
+        actor = self._actors.get(chat_id)
+        if actor is None:
+            actor = GameActor(
+                chat_id=chat_id,
+                store=self.store,
+                idle_timeout=self.idle_timeout,
+                on_stop=self._forget,
+            )
+            self._actors[chat_id] = actor
+        return actor
+
+    def _forget(self, actor: GameActor):
+        if self._actors.get(actor.chat_id) is actor:
+            del self._actors[actor.chat_id]
+
+    async def cache_game(
+        self,
+        game: Game,
+        changes: GameChanges | None = None,
+        exp: int | None = None,
+    ) -> Game:
+        async def message(actor: GameActor) -> Game:
+            actor.adopt(game, changes)
+            return game
+
+        return await self._actor(game.chat_id).call(message)
+
+    async def create_game(self, game: Game) -> bool:
+        async def message(actor: GameActor) -> bool:
+            if actor.game is not None:
+                return False
+            actor.adopt(game)
+            return True
+
+        return await self._actor(game.chat_id).call(message)
+
+    async def get_game(self, chat_id: int) -> Game | None:
+        """Живая игра актора, менять ее можно только через update_game"""
+
+        async def message(actor: GameActor) -> Game | None:
+            return actor.game
+
+        return await self._actor(chat_id).call(message)
+
+    async def update_game(
+        self,
+        chat_id: int,
+        action: Callable[[Game], T],
+    ) -> T | None:
+        async def message(actor: GameActor) -> T | None:
+            if actor.game is None:
+                return None
+            return action(actor.game)
+
+        return await self._actor(chat_id).call(message)
+
+    async def pop_game(self, chat_id: int) -> Game | None:
+        async def message(actor: GameActor) -> Game | None:
+            game = actor.game
+            await actor.drop()
+            return game
+
+        return await self._actor(chat_id).call(message)
+
+    async def delete_cache_game(self, chat_id: int) -> None:
+        async def message(actor: GameActor):
+            await actor.drop()
+
+        await self._actor(chat_id).call(message)
+
+    async def claim_settlement(self, chat_id: int) -> str | None:
+        return await self.store.claim_settlement(chat_id)
+
+    async def release_settlement(self, chat_id: int):
+        await self.store.release_settlement(chat_id)
+
+    async def mark_settled(self, chat_id: int):
+        await self.store.mark_settled(chat_id)
+
+    async def set_game_state(self, chat_id: int):
+        await self.store.set_game_state(chat_id)
+
+    def with_lock(self, chat_id: int):
+        return self.store.with_lock(chat_id)
+
+    async def set_bid_state(self, chat_id: int):
+        await self.store.set_bid_state(chat_id)
+
+    async def close(self):
+        """Дописать снимки всех игр и остановить акторов"""
+        actors = list(self._actors.values())
+        self._actors.clear()
+        await asyncio.gather(
+            *(actor.stop() for actor in actors),
+            return_exceptions=True,
+        )
@@ -1,66 +1,225 @@
+from typing import Callable, TypeVar
+
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 
 from application.interfaces.cache_game_repo_interface import CacheGameRepoInterface
-from domain.entities.game import Game
-from application.schemas.game import GameSchema
+from domain.entities.game import Game, GameChanges
+from infrastructure.redis_py.game_codec import BinaryGameCodec, GameCodec
+from infrastructure.redis_py.optimistic import (
+    ContentionMetrics,
+    held_lock,
+    optimistic_transaction,
+)
+
+T = TypeVar("T")
 
 
 class RedisGameCacheRepo(CacheGameRepoInterface):
+    """Игра одним ключом Game:{chat_id}.
+
+    Каждая запись увеличивает счетчик game-version:{chat_id}. При
+    optimistic=True update_game не берет redis.lock, а следит за ключом
+    игры и счетчиком через WATCH и повторяет переход при конфликте.
+    chat_id живых игр собраны в множестве index_key, по нему игры
+    находятся после перезапуска.
+    """
+
     def __init__(
         self,
         redis: Redis,
         key_prefix: str = "Game",
+        index_key: str = "games:live",
+        codec: GameCodec | None = None,
+        optimistic: bool = False,
+        max_attempts: int = 5,
+        metrics: ContentionMetrics | None = None,
+        settle_timeout: int = 60,
     ):
         self.redis = redis
         self.key_prefix = key_prefix
+        self.index_key = index_key
+        self.codec = codec if codec is not None else BinaryGameCodec()
+        self.optimistic = optimistic
+        self.max_attempts = max_attempts
+        self.metrics = metrics
+        self.settle_timeout = settle_timeout
 
     def _get_key(self, chat_id: int) -> str:
         return f"{self.key_prefix}:{chat_id}"
 
-    async def cache_game(
+    @staticmethod
+    def _get_version_key(chat_id: int) -> str:
+        return f"game-version:{chat_id}"
+
+    @staticmethod
+    def _get_settle_key(chat_id: int) -> str:
+        return f"game-settle:{chat_id}"
+
+    def _queue_write(
         self,
+        pipe: Pipeline,
         game: Game,
+        changes: GameChanges | None = None,
         exp: int | None = None,
-    ) -> GameSchema:
-        game_schema = GameSchema.model_validate(game, from_attributes=True)
-        key = self._get_key(game_schema.chat_id)
-
-        await self.redis.set(
-            name=key,
-            value=game_schema.model_dump_json(),
+    ):
+        pipe.set(
+            name=self._get_key(game.chat_id),
+            value=self.codec.encode(game),
             ex=exp,
         )
+        pipe.incr(self._get_version_key(game.chat_id))
 
-        return game_schema
+    def _queue_delete(self, pipe: Pipeline, chat_id: int):
+        pipe.delete(
+            f"fsm:{chat_id}:{chat_id}:state",
+            self._get_key(chat_id),
+            self._get_version_key(chat_id),
+            self._get_settle_key(chat_id),
+        )
+        pipe.srem(self.index_key, chat_id)
 
-    async def get_game(
+    async def _load(
         self,
+        client: Redis | Pipeline,
         chat_id: int,
-    ) -> GameSchema | None:
-        key = self._get_key(chat_id)
-        data = await self.redis.get(key)
+    ) -> Game | None:
+        data = await client.get(self._get_key(chat_id))
         if not data:
             return None
 
-        game_schema = GameSchema.model_validate_json(data)
-        return game_schema
+        return self.codec.decode(data)
+
+    async def cache_game(
+        self,
+        game: Game,
+        changes: GameChanges | None = None,
+        exp: int | None = None,
+    ) -> Game:
+        # Запись собирается до первого await: игра может меняться дальше
+        pipe = self.redis.pipeline(transaction=True)
+        self._queue_write(pipe, game, changes, exp)
+        pipe.sadd(self.index_key, game.chat_id)
+        async with pipe:
+            await pipe.execute()
+
+        return game
+
+    async def create_game(self, game: Game) -> bool:
+        chat_id = game.chat_id
+
+        async def attempt(pipe: Pipeline) -> bool:
+            if await pipe.exists(self._get_key(chat_id)):
+                return False
+            pipe.multi()
+            self._queue_write(pipe, game)
+            pipe.sadd(self.index_key, chat_id)
+            return True
+
+        # WATCH нужен и без optimistic: проверка и запись - одна транзакция
+        return await optimistic_transaction(
+            redis=self.redis,
+            chat_id=chat_id,
+            watch=[self._get_key(chat_id), self._get_version_key(chat_id)],
+            attempt=attempt,
+            max_attempts=self.max_attempts,
+            metrics=self.metrics,
+        )
+
+    async def get_game(
+        self,
+        chat_id: int,
+    ) -> Game | None:
+        return await self._load(self.redis, chat_id)
+
+    async def update_game(
+        self,
+        chat_id: int,
+        action: Callable[[Game], T],
+    ) -> T | None:
+        if not self.optimistic:
+            async with self.with_lock(chat_id):
+                game = await self.get_game(chat_id)
+                if game is None:
+                    return None
+
+                res = action(game)
+                await self.cache_game(game, changes=game.changes)
+                return res
+
+        async def attempt(pipe: Pipeline) -> T | None:
+            game = await self._load(pipe, chat_id)
+            if game is None:
+                return None
+
+            res = action(game)
+            pipe.multi()
+            self._queue_write(pipe, game, game.changes)
+            return res
+
+        return await optimistic_transaction(
+            redis=self.redis,
+            chat_id=chat_id,
+            watch=[self._get_key(chat_id), self._get_version_key(chat_id)],
+            attempt=attempt,
+            max_attempts=self.max_attempts,
+            metrics=self.metrics,
+        )
+
+    async def pop_game(self, chat_id: int) -> Game | None:
+        if not self.optimistic:
+            async with self.with_lock(chat_id):
+                game = await self.get_game(chat_id)
+                await self.delete_cache_game(chat_id)
+                return game
+
+        async def attempt(pipe: Pipeline) -> Game | None:
+            game = await self._load(pipe, chat_id)
+            pipe.multi()
+            self._queue_delete(pipe, chat_id)
+            return game
+
+        return await optimistic_transaction(
+            redis=self.redis,
+            chat_id=chat_id,
+            watch=[self._get_key(chat_id), self._get_version_key(chat_id)],
+            attempt=attempt,
+            max_attempts=self.max_attempts,
+            metrics=self.metrics,
+        )
 
     async def delete_cache_game(self, chat_id: int) -> None:
-        fsm_key = f"fsm:{chat_id}:{chat_id}:state"
-        await self.redis.delete(fsm_key)
-        key = self._get_key(chat_id)
-        await self.redis.delete(key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._queue_delete(pipe, chat_id)
+            await pipe.execute()
+
+    async def claim_settlement(self, chat_id: int) -> str | None:
+        # Занятый расчет истекает через settle_timeout: если процесс упал
+        # до выплат, игру рассчитает следующий вызов
+        key = self._get_settle_key(chat_id)
+        if await self.redis.set(key, "claimed", nx=True, ex=self.settle_timeout):
+            return "claimed"
+        if await self.redis.get(key) == b"paid":
+            return "paid"
+        return None
+
+    async def release_settlement(self, chat_id: int):
+        await self.redis.delete(self._get_settle_key(chat_id))
+
+    async def mark_settled(self, chat_id: int):
+        await self.redis.set(self._get_settle_key(chat_id), "paid")
 
     async def set_game_state(self, chat_id: int):
         fsm_key = f"fsm:{chat_id}:{chat_id}:state"
         await self.redis.set(name=fsm_key, value="ChatState:game")
 
     def with_lock(self, chat_id: int):
-        return self.redis.lock(
+        lock = self.redis.lock(
             name=f"game-lock:{chat_id}",
             timeout=3,
             blocking_timeout=5,
         )
+        return held_lock(lock, chat_id, self.metrics)
 
     async def set_bid_state(self, chat_id: int):
         fsm_key = f"fsm:{chat_id}:{chat_id}:state"
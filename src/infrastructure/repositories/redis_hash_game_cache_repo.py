@@ -0,0 +1,79 @@
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
+
+from domain.entities.game import Game, GameChanges
+from infrastructure.redis_py.game_codec import BinaryGameCodec
+from infrastructure.redis_py.optimistic import ContentionMetrics
+from infrastructure.repositories.redis_game_cache_repo import RedisGameCacheRepo
+
+
+class RedisHashGameCacheRepo(RedisGameCacheRepo):
+    """Игра хранится хешем: поля meta, deck, dealer и player:{tg_id}.
+
+    Если известны измененные части игры, пишутся только их поля одним HSET.
+    Ключи, оставшиеся строками от прежнего формата, читаются как раньше и
+    при первой записи переписываются хешем целиком.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_prefix: str = "Game",
+        codec: BinaryGameCodec | None = None,
+        optimistic: bool = False,
+        max_attempts: int = 5,
+        metrics: ContentionMetrics | None = None,
+    ):
+        codec = codec if codec is not None else BinaryGameCodec()
+        super().__init__(
+            redis=redis,
+            key_prefix=key_prefix,
+            codec=codec,
+            optimistic=optimistic,
+            max_attempts=max_attempts,
+            metrics=metrics,
+        )
+        self._string_keys: set[str] = set()
+
+    def _queue_write(
+        self,
+        pipe: Pipeline,
+        game: Game,
+        changes: GameChanges | None = None,
+        exp: int | None = None,
+    ):
+        key = self._get_key(game.chat_id)
+        version_key = self._get_version_key(game.chat_id)
+
+        if changes is not None and key not in self._string_keys:
+            if changes:
+                pipe.hset(name=key, mapping=self.codec.encode_fields(game, changes))
+                pipe.incr(version_key)
+            game.changes = GameChanges()
+            return
+
+        pipe.delete(key)
+        pipe.hset(name=key, mapping=self.codec.encode_fields(game))
+        if exp is not None:
+            pipe.expire(key, exp)
+        pipe.incr(version_key)
+        self._string_keys.discard(key)
+        game.changes = GameChanges()
+
+    async def _load(
+        self,
+        client: Redis | Pipeline,
+        chat_id: int,
+    ) -> Game | None:
+        key = self._get_key(chat_id)
+        try:
+            fields = await client.hgetall(key)
+        except ResponseError:
+            # WRONGTYPE: игра сохранена строкой до перехода на хеши
+            self._string_keys.add(key)
+            return await super()._load(client, chat_id)
+        if not fields:
+            return None
+
+        return self.codec.decode_fields(fields)
@@ -1,22 +1,42 @@
+from typing import Callable
+
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 
 from application.interfaces.cache_lobby_repo_interface import (
     BaseCacheLobbyRepoTG,
 )
 from domain.entities.lobby import Lobby
 from application.schemas.lobby import LobbySchema
+from infrastructure.redis_py.optimistic import (
+    ContentionMetrics,
+    held_lock,
+    optimistic_transaction,
+)
 
 
 class RedisLobbyCacheRepoTG(BaseCacheLobbyRepoTG):
+    """Лобби ключом Lobby:{chat_id}, chat_id живых лобби - в index_key"""
+
     def __init__(
         self,
         redis: Redis,
         key_prefix: str = "Lobby",
+        index_key: str = "lobbies:live",
         stream_key: str = "game:starting",
+        stream_maxlen: int = 10_000,
+        optimistic: bool = False,
+        max_attempts: int = 5,
+        metrics: ContentionMetrics | None = None,
     ):
         self.redis = redis
         self.key_prefix = key_prefix
+        self.index_key = index_key
         self.stream_key = stream_key
+        self.stream_maxlen = stream_maxlen
+        self.optimistic = optimistic
+        self.max_attempts = max_attempts
+        self.metrics = metrics
 
     def _get_key(
         self,
@@ -24,27 +44,42 @@ class RedisLobbyCacheRepoTG(BaseCacheLobbyRepoTG):
     ):
         return f"{self.key_prefix}:{chat_id}"
 
+    @staticmethod
+    def _get_version_key(chat_id: int) -> str:
+        return f"lobby-version:{chat_id}"
+
     def with_lock(self, chat_id: int):
         """Возвращает объект блокировки для использования в контекстном менеджере"""
-        return self.redis.lock(
+        lock = self.redis.lock(
             f"lobby-lock:{chat_id}",
             timeout=3,
             blocking_timeout=5,
         )
+        return held_lock(lock, chat_id, self.metrics)
 
-    async def cache_lobby(
+    def _queue_write(
         self,
+        pipe: Pipeline,
         lobby: Lobby,
-        exp: int = 180,
     ) -> LobbySchema:
-        key = self._get_key(lobby.chat_id)
         lobby_schema = LobbySchema.model_validate(lobby, from_attributes=True)
-
-        await self.redis.set(
-            name=key,
+        pipe.set(
+            name=self._get_key(lobby.chat_id),
             value=lobby_schema.model_dump_json(),
             ex=None,
         )
+        pipe.incr(self._get_version_key(lobby.chat_id))
+        pipe.sadd(self.index_key, lobby.chat_id)
+        return lobby_schema
+
+    async def cache_lobby(
+        self,
+        lobby: Lobby,
+        exp: int = 180,
+    ) -> LobbySchema:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            lobby_schema = self._queue_write(pipe, lobby)
+            await pipe.execute()
 
         return lobby_schema
 
@@ -59,12 +94,58 @@ class RedisLobbyCacheRepoTG(BaseCacheLobbyRepoTG):
         lobby_schema = LobbySchema.model_validate_json(data)
         return lobby_schema
 
+    async def get_lobbies(
+        self,
+        chat_ids: list[int],
+    ) -> dict[int, LobbySchema]:
+        if not chat_ids:
+            return {}
+        values = await self.redis.mget([self._get_key(chat_id) for chat_id in chat_ids])
+        return {
+            chat_id: LobbySchema.model_validate_json(data)
+            for chat_id, data in zip(chat_ids, values)
+            if data
+        }
+
+    async def update_lobby(
+        self,
+        chat_id: int,
+        action: Callable[[LobbySchema | None], Lobby | None],
+    ) -> LobbySchema | None:
+        if not self.optimistic:
+            async with self.with_lock(chat_id):
+                lobby = action(await self.get_lobby(chat_id))
+                if lobby is None:
+                    return None
+                return await self.cache_lobby(lobby)
+
+        async def attempt(pipe: Pipeline) -> LobbySchema | None:
+            data = await pipe.get(self._get_key(chat_id))
+            lobby_schema = LobbySchema.model_validate_json(data) if data else None
+            lobby = action(lobby_schema)
+            if lobby is None:
+                return None
+            pipe.multi()
+            return self._queue_write(pipe, lobby)
+
+        return await optimistic_transaction(
+            redis=self.redis,
+            chat_id=chat_id,
+            watch=[self._get_key(chat_id), self._get_version_key(chat_id)],
+            attempt=attempt,
+            max_attempts=self.max_attempts,
+            metrics=self.metrics,
+        )
+
     async def delete_lobby(
         self,
         chat_id: int,
     ):
         key = self._get_key(chat_id)
-        await self.redis.delete(key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, self._get_version_key(chat_id))
+            pipe.srem(self.index_key, chat_id)
+            await pipe.execute()
 
     async def exists_lobby(
         self,
@@ -79,4 +160,41 @@ class RedisLobbyCacheRepoTG(BaseCacheLobbyRepoTG):
         if not data:
             return None
 
-        await self.redis.xadd(name=self.stream_key, fields={"lobby_data": data})
+        await self.redis.xadd(
+            name=self.stream_key,
+            fields={"lobby_data": data},
+            maxlen=self.stream_maxlen,
+            approximate=True,
+        )
+
+    async def pop_starting(self, chat_id: int):
+        if not self.optimistic:
+            async with self.with_lock(chat_id):
+                await self.push_starting(chat_id=chat_id)
+                await self.delete_lobby(chat_id)
+            return
+
+        key = self._get_key(chat_id)
+        version_key = self._get_version_key(chat_id)
+
+        async def attempt(pipe: Pipeline):
+            data = await pipe.get(key)
+            pipe.multi()
+            if data:
+                pipe.xadd(
+                    name=self.stream_key,
+                    fields={"lobby_data": data},
+                    maxlen=self.stream_maxlen,
+                    approximate=True,
+                )
+            pipe.delete(key, version_key)
+            pipe.srem(self.index_key, chat_id)
+
+        await optimistic_transaction(
+            redis=self.redis,
+            chat_id=chat_id,
+            watch=[key, version_key],
+            attempt=attempt,
+            max_attempts=self.max_attempts,
+            metrics=self.metrics,
+        )
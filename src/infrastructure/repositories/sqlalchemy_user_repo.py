@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.interfaces.users_repo_interface import (
@@ -68,6 +68,28 @@ class SQLAlchemyUserRepositoryTG(BaseTelegramUserRepo):
         users_models = await self.session.scalars(stmt)
         return users_models.all()
 
+    async def debit_balance(self, tg_id: int, amount: int) -> bool:
+        # Проверка и списание одним UPDATE: параллельные ставки не уведут
+        # баланс в минус и не затрут друг друга
+        stmt = (
+            update(UserModel)
+            .where(UserModel.tg_id == tg_id, UserModel.balance >= amount)
+            .values(balance=UserModel.balance - amount)
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def credit_balances(self, amounts: dict[int, int]):
+        for tg_id, amount in amounts.items():
+            stmt = (
+                update(UserModel)
+                .where(UserModel.tg_id == tg_id)
+                .values(balance=UserModel.balance + amount)
+            )
+            await self.session.execute(stmt)
+        await self.session.commit()
+
     async def update_users(
         self,
         datas_update: dict[UserModel, UserUpdate | UserPartial],
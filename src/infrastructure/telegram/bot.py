@@ -1,7 +1,12 @@
+import asyncio
+
 from aiogram import Bot, Dispatcher
 
 from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.fsm.strategy import FSMStrategy
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
 
 class AiogramBot:
@@ -16,3 +21,31 @@ class AiogramBot:
 
     async def start_polling(self):
         await self.dp.start_polling(self.bot)
+
+    async def feed_forwarded(self, payload: dict):
+        """Обработать обновление, пересланное другим узлом"""
+        update = Update.model_validate(payload, context={"bot": self.bot})
+        await self.dp.feed_update(self.bot, update, shard_forwarded=True)
+
+    async def start_webhook(
+        self,
+        host: str,
+        port: int,
+        path: str,
+        secret_token: str | None = None,
+    ):
+        """Принимать обновления сервером aiohttp вместо long polling"""
+        app = web.Application()
+        SimpleRequestHandler(
+            dispatcher=self.dp,
+            bot=self.bot,
+            secret_token=secret_token,
+        ).register(app, path=path)
+        setup_application(app, self.dp, bot=self.bot)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
@@ -2,12 +2,17 @@ __all__ = (
     "SaveUserDB",
     "LobbyServiceGetter",
     "AntiFlood",
+    "anti_flood",
     "GameServiceGetter",
     "CommandServiceGetter",
+    "ShardForwarder",
+    "ChatUpdateScheduler",
 )
 
 from .save_user_db import SaveUserDB
 from .lobby_serv_maker import LobbyServiceGetter
-from .anti_flood import AntiFlood
+from .anti_flood import AntiFlood, anti_flood
 from .game_service_getter import GameServiceGetter
 from .command_service_getter import CommandServiceGetter
+from .shard_forwarder import ShardForwarder
+from .chat_scheduler import ChatUpdateScheduler
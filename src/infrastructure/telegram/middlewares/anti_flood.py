@@ -1,15 +1,26 @@
-import time
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
 from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 
+from infrastructure.config import settings
+from infrastructure.redis_py.rate_limiter import GcraRateLimiter
+from infrastructure.redis_py.redis_helper import redis_helper
+
 
 class AntiFlood(BaseMiddleware):
-    def __init__(self):
-        self.users_data: dict[int, dict[str, Any]] = {}
-        self.rate: float = 1.0
+    """Ограничение частоты по пользователю в чате.
+
+    Не чаще раза в rate_limit секунд (флаг обработчика, по умолчанию
+    rate), лишние обновления молча отбрасываются. Счет ведет
+    GcraRateLimiter по ключу chat_id:user_id, один экземпляр anti_flood
+    подключен ко всем роутерам, поэтому лимит у них общий.
+    """
+
+    def __init__(self, limiter: GcraRateLimiter, rate: float = 1.0):
+        self.limiter = limiter
+        self.rate = rate
 
     async def __call__(
         self,
@@ -21,34 +32,22 @@ class AntiFlood(BaseMiddleware):
         if not rate:
             rate = self.rate
 
-        user_id = event.from_user.id
-        now = time.time()
-        template = {
-            "last_time": now,
-            "flood_count": 0,
-            "block": False,
-        }
-
-        if user_id not in self.users_data:
-            self.users_data[user_id] = template
-            return await handler(event, data)
-
-        user_data = self.users_data.get(user_id)
-        delta = now - user_data.get("last_time")
-
-        if user_data.get("block"):
-            if delta > 10:
-                self.users_data[user_id] = template
-                return await handler(event, data)
+        message = event if isinstance(event, Message) else event.message
+        chat_id = message.chat.id if message is not None else event.from_user.id
+        key = f"{chat_id}:{event.from_user.id}"
+        if await self.limiter.acquire(key, rate) > 0:
             return
-
-        if delta > rate:
-            self.users_data[user_id] = template
-            return await handler(event, data)
-
-        user_data["last_time"] = now
-        user_data["flood_count"] += 1
-        if user_data.get("flood_count") >= 3:
-            user_data["block"] = True
-        self.users_data[user_id] = user_data
-        return
+        return await handler(event, data)
+
+
+anti_flood = AntiFlood(
+    GcraRateLimiter(
+        redis=(
+            redis_helper.get_redis_client()
+            if settings.bot.flood_backend == "redis"
+            else None
+        ),
+        burst=settings.bot.flood_burst,
+        max_keys=settings.bot.flood_max_keys,
+    )
+)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from infrastructure.redis_py.events.task_queue import (
+    QueuedTask,
+    RetryPolicy,
+    TaskQueue,
+)
+from infrastructure.telegram.webhook import update_chat_id
+
+logger = logging.getLogger(__name__)
+
+
+class ChatUpdateScheduler(BaseMiddleware):
+    """Внешний middleware обновлений: обновления одного чата
+    обрабатываются строго по одному в порядке прихода, разных чатов -
+    параллельно, но не больше max_workers сразу.
+
+    Очередь - TaskQueue с ключом chat_id: чат, у которого остались
+    обновления, после каждого встает в конец общей очереди, поэтому
+    шумная группа не отнимает обработку у остальных. Обновление, которое
+    прождало в очереди дольше lag_warning секунд, пишется в лог; текущее
+    ожидание по чатам - в lagging и snapshot.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 50,
+        max_depth: int = 1000,
+        lag_warning: float = 5,
+    ):
+        self.lag_warning = lag_warning
+        # Ошибку обработчика получает вызывающий, повторять ее здесь нельзя
+        self.queue = TaskQueue(
+            max_workers=max_workers,
+            max_depth=max_depth,
+            retry_policy=RetryPolicy(max_attempts=1),
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self.queue.workers:
+            await self.queue.start()
+        chat_id = update_chat_id(event)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.submit(
+            QueuedTask(
+                key=chat_id,
+                func=partial(
+                    self._process,
+                    chat_id,
+                    time.monotonic(),
+                    future,
+                    handler,
+                    event,
+                    data,
+                ),
+                name="update",
+            )
+        )
+        return await future
+
+    async def _process(
+        self,
+        chat_id: int,
+        enqueued_at: float,
+        future: asyncio.Future,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ):
+        lag = time.monotonic() - enqueued_at
+        if lag > self.lag_warning:
+            logger.warning(
+                "Update %d of chat %r waited %.1fs in the chat queue",
+                event.update_id,
+                chat_id,
+                lag,
+            )
+        try:
+            result = await handler(event, data)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    def lagging(self, n: int = 10) -> list[tuple[int, float]]:
+        """Чаты, дольше всех ждущие обработки: (chat_id, секунды)"""
+        lags = self.queue.key_lags()
+        return sorted(lags.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**self.queue.snapshot(), "lagging": self.lagging()}
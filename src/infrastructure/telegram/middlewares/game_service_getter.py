@@ -3,9 +3,7 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from infrastructure.repositories import RedisGameCacheRepo
-from infrastructure.redis_py.redis_helper import redis_helper
-from application.services import GameServiceTG
+from infrastructure.redis_py.game_service_factory import make_game_service
 
 
 class GameServiceGetter(BaseMiddleware):
@@ -16,10 +14,5 @@ class GameServiceGetter(BaseMiddleware):
         data: Dict[str, Any],
     ) -> Any:
         user_repo = data.get("user_repo")
-        cache_repo = RedisGameCacheRepo(redis=redis_helper.get_redis_client())
-        game_service = GameServiceTG(
-            user_repo=user_repo,
-            game_repo=cache_repo,
-        )
-        data["game_service"] = game_service
+        data["game_service"] = make_game_service(user_repo=user_repo)
         return await handler(event, data)
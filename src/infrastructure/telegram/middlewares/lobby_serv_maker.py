@@ -3,11 +3,7 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from infrastructure.repositories import (
-    RedisLobbyCacheRepoTG,
-)
-from infrastructure.redis_py.redis_helper import redis_helper
-from application.services import LobbyServiceTG
+from infrastructure.redis_py.game_service_factory import make_lobby_service
 
 
 class LobbyServiceGetter(BaseMiddleware):
@@ -17,11 +13,5 @@ class LobbyServiceGetter(BaseMiddleware):
         event: Message,
         data: Dict[str, Any],
     ) -> Any:
-        user_repo = data.get("user_repo")
-        cache_repo = RedisLobbyCacheRepoTG(redis=redis_helper.get_redis_client())
-        lobby_service = LobbyServiceTG(
-            lobby_repo=cache_repo,
-            user_repo=user_repo,
-        )
-        data["lobby_service"] = lobby_service
+        data["lobby_service"] = make_lobby_service(user_repo=data.get("user_repo"))
         return await handler(event, data)
@@ -0,0 +1,33 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from infrastructure.redis_py.sharding import ShardRouter
+from infrastructure.telegram.webhook import update_chat_id
+
+
+class ShardForwarder(BaseMiddleware):
+    """Внешний middleware обновлений: обновления чужих чатов уходят
+    владельцу чата через ShardRouter. Пересланное обновление (флаг
+    shard_forwarded) обрабатывается на месте, чтобы при смене состава
+    оно не ходило по кругу.
+    """
+
+    def __init__(self, router: ShardRouter):
+        self.router = router
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        chat_id = update_chat_id(event)
+        if data.get("shard_forwarded") or self.router.owns(chat_id):
+            return await handler(event, data)
+        await self.router.forward(
+            chat_id,
+            "update",
+            event.model_dump(mode="json", exclude_unset=True),
+        )
@@ -11,7 +11,7 @@ from domain.entities import PlayerResult
 from infrastructure.telegram.middlewares import (
     SaveUserDB,
     GameServiceGetter,
-    AntiFlood,
+    anti_flood,
 )
 from infrastructure.telegram.routers.states import ChatState
 from utils.tg.filters import PlayerFilter, StandData, HitData
@@ -27,7 +27,7 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 callback_middlewares = [
-    AntiFlood(),
+    anti_flood,
     SaveUserDB(),
     GameServiceGetter(),
 ]
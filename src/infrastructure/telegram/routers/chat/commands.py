@@ -4,7 +4,7 @@ from aiogram.types import Message
 
 from infrastructure.telegram.middlewares import (
     SaveUserDB,
-    AntiFlood,
+    anti_flood,
     CommandServiceGetter,
 )
 from application.services import CommandService
@@ -12,7 +12,7 @@ from application.services.command import ResponseType, Response
 from utils.tg.functions import format_user_profile
 
 router = Router()
-router.message.middleware(AntiFlood())
+router.message.middleware(anti_flood)
 router.message.middleware(SaveUserDB())
 router.message.middleware(CommandServiceGetter())
 
@@ -7,11 +7,15 @@ from application.services.game_types import ResponseType
 from infrastructure.telegram.routers.states import ChatState
 from utils.tg.filters import ChatTypeFilter
 from utils.tg.functions import pass_turn_next_player
-from infrastructure.telegram.middlewares import GameServiceGetter, AntiFlood, SaveUserDB
+from infrastructure.telegram.middlewares import (
+    GameServiceGetter,
+    anti_flood,
+    SaveUserDB,
+)
 from application.services import GameServiceTG
 
 router = Router()
-router.message.middleware(AntiFlood())
+router.message.middleware(anti_flood)
 router.message.middleware(SaveUserDB())
 router.message.middleware(GameServiceGetter())
 
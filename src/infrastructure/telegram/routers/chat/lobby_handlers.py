@@ -4,18 +4,18 @@ from aiogram.filters import Command, StateFilter, CommandObject
 from aiogram.types import Message
 
 from application.services import LobbyServiceTG
-from application.services.timer_mng import timer_manager
+from application.services.lobby_ticker import format_lobby_text, lobby_ticker
 from infrastructure.telegram.routers.states import ChatState
 from infrastructure.telegram.middlewares import (
     SaveUserDB,
     LobbyServiceGetter,
-    AntiFlood,
+    anti_flood,
 )
 from utils.tg.filters import ChatTypeFilter
 from utils.tg.functions import get_user_mention
 
 router = Router()
-router.message.middleware(AntiFlood())
+router.message.middleware(anti_flood)
 router.message.middleware(SaveUserDB())
 router.message.middleware(LobbyServiceGetter())
 
@@ -24,19 +24,9 @@ async def start_update_lobby_text_timer(
     message: Message,
     timeout: int,
     players: str,
-    lobby_service: LobbyServiceTG,
 ):
-    text = f"Запущено лобби на игру.\n" f"Игроки: {players}\n" f"Таймер: {timeout}"
-    msg = await message.answer(text=text)
-    timer_manager.create_interval_timer(
-        "lobby:interval",
-        message.chat.id,
-        lobby_service.lobby_interval_timer,
-        None,
-        timeout,
-        5,
-        msg,
-    )
+    msg = await message.answer(text=format_lobby_text(players, timeout))
+    lobby_ticker.add(msg, timeout)
 
 
 @router.message(
@@ -69,7 +59,7 @@ async def handle_cancel(
 ):
     await lobby_service.cancel_lobby(message.chat.id)
 
-    timer_manager.cancel_timer(timer_type="lobby:interval", chat_id=message.chat.id)
+    lobby_ticker.remove(message.chat.id)
     await state.clear()
     await message.answer("Набор на игру отменен.")
 
@@ -150,5 +140,4 @@ async def handle_lobby(
         message,
         timeout,
         lobby.names,
-        lobby_service,
     )
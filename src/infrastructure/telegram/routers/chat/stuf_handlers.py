@@ -2,10 +2,10 @@ from aiogram import Router
 from aiogram.filters import Command, ChatMemberUpdatedFilter, IS_MEMBER, IS_NOT_MEMBER
 from aiogram.types import Message, ChatMemberUpdated
 
-from infrastructure.telegram.middlewares import AntiFlood
+from infrastructure.telegram.middlewares import anti_flood
 
 router = Router()
-router.message.middleware(AntiFlood())
+router.message.middleware(anti_flood)
 
 
 @router.message(Command("start"))
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import sys
+
+from aiogram import Bot
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from aiohttp import ClientError, ClientSession, web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+WORKER_ENV = "APP_CONFIG__BOT__WEBHOOK_WORKER"
+
+
+def worker_for(chat_id: int, workers: int) -> int:
+    """Процесс, который обрабатывает чат"""
+    return chat_id % workers
+
+
+def update_chat_id(update: Update) -> int:
+    """chat_id обновления, для обновлений без чата - id пользователя"""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat is not None:
+        return context.chat.id
+    if context.user is not None:
+        return context.user.id
+    return 0
+
+
+def worker_port(port: int, worker: int) -> int:
+    return port + 1 + worker
+
+
+class WebhookGateway:
+    """Прием вебхуков Telegram на одном порту для нескольких процессов.
+
+    Запускает workers процессов бота (тот же скрипт с номером процесса в
+    APP_CONFIG__BOT__WEBHOOK_WORKER), каждый слушает 127.0.0.1 на порту
+    port + 1 + номер. Обновление пересылается процессу
+    chat_id % workers, поэтому все обновления чата, его таймеры и
+    состояние в памяти остаются в одном процессе. Сам шлюз игры не
+    ведет.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        url: str,
+        workers: int,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/webhook",
+        secret: str | None = None,
+    ):
+        self.bot = bot
+        self.url = url
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self._session: ClientSession | None = None
+
+    async def _spawn(self, worker: int) -> asyncio.subprocess.Process:
+        env = {**os.environ, WORKER_ENV: str(worker)}
+        return await asyncio.create_subprocess_exec(sys.executable, *sys.argv, env=env)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and request.headers.get(SECRET_HEADER) != self.secret:
+            return web.Response(status=401)
+        body = await request.read()
+        update = Update.model_validate_json(body)
+        worker = worker_for(update_chat_id(update), self.workers)
+        headers = {SECRET_HEADER: self.secret} if self.secret else {}
+        try:
+            async with self._session.post(
+                f"http://127.0.0.1:{worker_port(self.port, worker)}{self.path}",
+                data=body,
+                headers={"Content-Type": "application/json", **headers},
+            ) as response:
+                return web.Response(
+                    status=response.status,
+                    body=await response.read(),
+                    content_type=response.content_type,
+                )
+        except ClientError:
+            # Telegram повторит обновление, пока процесс перезапускается
+            logger.warning("Webhook worker %d is unavailable", worker)
+            return web.Response(status=503)
+
+    async def _supervise(self, worker: int):
+        while True:
+            process = await self._spawn(worker)
+            try:
+                code = await process.wait()
+            except asyncio.CancelledError:
+                process.terminate()
+                await process.wait()
+                raise
+            logger.error("Webhook worker %d exited with %s, restarting", worker, code)
+            await asyncio.sleep(1)
+
+    async def run(self):
+        supervisors = [
+            asyncio.create_task(self._supervise(worker))
+            for worker in range(self.workers)
+        ]
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        runner = web.AppRunner(app)
+        self._session = ClientSession()
+        try:
+            await runner.setup()
+            await web.TCPSite(runner, self.host, self.port).start()
+            await self.bot.set_webhook(
+                url=self.url + self.path,
+                secret_token=self.secret,
+            )
+            await asyncio.gather(*supervisors)
+        finally:
+            for supervisor in supervisors:
+                supervisor.cancel()
+            await asyncio.gather(*supervisors, return_exceptions=True)
+            await self._session.close()
+            await runner.cleanup()
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from functools import partial
 
 from aiogram import Bot
 from aiogram.fsm.storage.redis import RedisStorage
@@ -7,11 +8,31 @@ from aiogram.client.default import DefaultBotProperties
 
 from infrastructure.config import settings
 from infrastructure.telegram.bot import AiogramBot
+from infrastructure.telegram.middlewares import ChatUpdateScheduler, ShardForwarder
 from infrastructure.telegram.routers import routers
-from infrastructure.redis_py.events.event_system import EventSystemTG
+from infrastructure.telegram.webhook import WebhookGateway, worker_for, worker_port
+from infrastructure.redis_py.events.event_system import (
+    EventSystemTG,
+    TRANSIENT_ERRORS,
+    default_consumer_name,
+)
+from infrastructure.redis_py.events.task_queue import RetryPolicy
+from infrastructure.redis_py.events.timer_events import register_timer_events
+from infrastructure.redis_py.game_service_factory import (
+    close_game_actors,
+    make_lobby_service,
+    worker_key,
+)
+from infrastructure.redis_py.rate_limiter import GcraRateLimiter
 from infrastructure.redis_py.redis_helper import redis_helper
+from infrastructure.redis_py.recovery import StartupRecovery
+from infrastructure.redis_py.sharding import ShardRouter
+from infrastructure.redis_py.timer_scheduler import RedisTimerScheduler
+from application.services.lobby_ticker import lobby_ticker
+from application.services.timer_mng import timer_manager
 
 from utils.logger import configure_logger
+from utils.tg.outbound import OutboundDispatcher
 
 fsm_redis_storage = RedisStorage.from_url(str(settings.redis.url))
 
@@ -25,11 +46,123 @@ aiogram_bot = AiogramBot(
     storage=fsm_redis_storage,
 )
 
+if settings.bot.outbound_limits:
+    # Лимит Telegram на бота общий для воркеров вебхука и узлов шардов
+    outbound_global = GcraRateLimiter(
+        redis=redis_helper.get_redis_client(),
+        burst=max(1, int(settings.bot.outbound_global_rate)),
+        key_prefix="outbound",
+    )
+    aiogram_bot.bot.session.middleware(
+        OutboundDispatcher(
+            global_rate=settings.bot.outbound_global_rate,
+            group_per_minute=settings.bot.outbound_group_per_minute,
+            private_rate=settings.bot.outbound_private_rate,
+            max_retries=settings.bot.outbound_max_retries,
+            shared_global=partial(
+                outbound_global.acquire,
+                "global",
+                1 / settings.bot.outbound_global_rate,
+            ),
+        )
+    )
+
+shard_router = None
+if settings.redis.sharding:
+    shard_router = ShardRouter(
+        redis=redis_helper.get_redis_client(),
+        node_id=settings.redis.shard_node or default_consumer_name(),
+        lease=settings.redis.shard_lease,
+        renew_interval=settings.redis.shard_renew_interval,
+        vnodes=settings.redis.shard_vnodes,
+    )
+    shard_router.register("update", aiogram_bot.feed_forwarded)
+    aiogram_bot.dp.update.outer_middleware(ShardForwarder(shard_router))
+
+
+update_scheduler = None
+if settings.bot.update_scheduler:
+    # После ShardForwarder: в очередь встают только свои обновления
+    update_scheduler = ChatUpdateScheduler(
+        max_workers=settings.bot.update_workers,
+        max_depth=settings.bot.update_queue_depth,
+        lag_warning=settings.bot.update_lag_warning,
+    )
+    aiogram_bot.dp.update.outer_middleware(update_scheduler)
+
+
 tg_event_sys = EventSystemTG(
     bot=aiogram_bot.bot,
     redis=redis_helper.get_redis_client(),
+    max_workers=settings.redis.task_workers,
+    max_queue_depth=settings.redis.task_queue_depth,
+    retry_policy=RetryPolicy(
+        max_attempts=settings.redis.task_max_attempts,
+        base_delay=settings.redis.task_retry_base_delay,
+        max_delay=settings.redis.task_retry_max_delay,
+        retry_on=TRANSIENT_ERRORS,
+    ),
+    game_starting_stream=worker_key("game:starting"),
+    router=shard_router,
+    consumer=settings.redis.stream_consumer,
+    batch_size=settings.redis.stream_batch_size,
+    min_idle_ms=settings.redis.stream_min_idle_ms,
+    max_deliveries=settings.redis.stream_max_deliveries,
 )
 
+timer_manager.use_bot(aiogram_bot.bot)
+timer_scheduler = None
+if settings.redis.timers == "redis":
+    timer_scheduler = RedisTimerScheduler(
+        redis=redis_helper.get_redis_client(),
+        key_prefix=worker_key("timers"),
+        batch_size=settings.redis.timer_batch_size,
+        poll_interval=settings.redis.timer_poll_interval,
+    )
+    register_timer_events(timer_scheduler)
+    timer_manager.use_scheduler(timer_scheduler)
+    if shard_router is not None:
+        timer_scheduler.use_router(shard_router)
+
+
+def owns_chat(chat_id: int) -> bool:
+    if shard_router is not None and not shard_router.owns(chat_id):
+        return False
+    if settings.bot.webhook_worker is None:
+        return True
+    return worker_for(chat_id, settings.bot.webhook_workers) == (
+        settings.bot.webhook_worker
+    )
+
+
+async def start_updates():
+    bot_settings = settings.bot
+    if shard_router is not None and not settings.redis.shard_ingress:
+        # Обновления приходят только пересланными от других узлов
+        await asyncio.Event().wait()
+    if bot_settings.mode == "polling":
+        await aiogram_bot.start_polling()
+        return
+    if bot_settings.webhook_worker is None:
+        # Один процесс принимает вебхуки сам
+        await aiogram_bot.bot.set_webhook(
+            url=bot_settings.webhook_url + bot_settings.webhook_path,
+            secret_token=bot_settings.webhook_secret,
+        )
+        await aiogram_bot.start_webhook(
+            host=bot_settings.webhook_host,
+            port=bot_settings.webhook_port,
+            path=bot_settings.webhook_path,
+            secret_token=bot_settings.webhook_secret,
+        )
+        return
+    await aiogram_bot.start_webhook(
+        host="127.0.0.1",
+        port=worker_port(bot_settings.webhook_port, bot_settings.webhook_worker),
+        path=bot_settings.webhook_path,
+        secret_token=bot_settings.webhook_secret,
+    )
+
 
 async def main():
     configure_logger(
@@ -37,10 +170,49 @@ async def main():
         level=logging.WARNING,
     )
     logger.info("Logger was configured.")
+    bot_settings = settings.bot
+    if (
+        bot_settings.mode == "webhook"
+        and bot_settings.webhook_workers > 1
+        and bot_settings.webhook_worker is None
+    ):
+        # Шлюз: только принимает вебхуки и запускает процессы-обработчики
+        await WebhookGateway(
+            bot=aiogram_bot.bot,
+            url=bot_settings.webhook_url,
+            workers=bot_settings.webhook_workers,
+            host=bot_settings.webhook_host,
+            port=bot_settings.webhook_port,
+            path=bot_settings.webhook_path,
+            secret=bot_settings.webhook_secret,
+        ).run()
+        return
     aiogram_bot.dp.include_router(routers)
+    if shard_router is not None:
+        await shard_router.join()
+        shard_task = asyncio.create_task(shard_router.run())
     event_sys_task = asyncio.create_task(tg_event_sys.start())
+    lobby_ticker_task = asyncio.create_task(
+        lobby_ticker.run(make_lobby_service().lobby_repo)
+    )
+    if timer_scheduler is not None:
+        timer_task = asyncio.create_task(timer_scheduler.run())
+    if settings.redis.recovery:
+        await StartupRecovery(
+            redis=redis_helper.get_redis_client(),
+            bot=aiogram_bot.bot,
+            batch_size=settings.redis.recovery_batch_size,
+            timeout=settings.redis.recovery_timeout,
+            max_age=settings.redis.recovery_max_age,
+            owns=owns_chat,
+        ).run()
     await asyncio.sleep(1)
-    await aiogram_bot.start_polling()
+    try:
+        await start_updates()
+    finally:
+        await close_game_actors()
+        if shard_router is not None:
+            await shard_router.leave()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import asyncio
+import selectors
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+
+class Clock:
+    """Время для игры и таймеров: текущая дата, метка времени и ожидание"""
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def timestamp(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """Часы, которые идут по времени цикла событий от start.
+
+    Вместе с VirtualTimeLoop время идет только тогда, когда всем задачам
+    остается ждать таймеров, поэтому сценарий с минутами ожиданий
+    выполняется за доли секунды.
+    """
+
+    def __init__(self, start: datetime | None = None):
+        self.start = start if start is not None else datetime.now(timezone.utc)
+
+    def _elapsed(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self._elapsed())
+
+    def timestamp(self) -> float:
+        return self.start.timestamp() + self._elapsed()
+
+
+class _VirtualSelector:
+    def __init__(self, selector: selectors.BaseSelector, loop: "VirtualTimeLoop"):
+        self._selector = selector
+        self._loop = loop
+
+    def __getattr__(self, name: str):
+        return getattr(self._selector, name)
+
+    def select(self, timeout: float | None = None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # Таймеров нет - ждем настоящий ввод-вывод
+            return self._selector.select(None)
+        if len(self._selector.get_map()) <= 1:
+            # Кроме служебного сокета цикла ждать нечего
+            self._loop.advance(timeout)
+            return events
+        # Ответы по сети (Redis) успевают прийти за io_grace настоящего
+        # времени, иначе время переводится сразу к ближайшему таймеру
+        events = self._selector.select(min(timeout, self._loop.io_grace))
+        if not events:
+            self._loop.advance(timeout)
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Цикл событий, время которого начинается с 0 и идет скачками.
+
+    asyncio.sleep, wait_for и call_later работают как обычно, но вместо
+    ожидания цикл сразу переходит к сроку ближайшего таймера.
+    """
+
+    def __init__(self, io_grace: float = 0.005):
+        super().__init__()
+        self.io_grace = io_grace
+        self._virtual_time = 0.0
+        self._selector = _VirtualSelector(self._selector, self)
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, seconds: float):
+        self._virtual_time += seconds
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock):
+    global _clock
+    _clock = clock
+
+
+def run_simulated(
+    main: Coroutine[Any, Any, T],
+    start: datetime | None = None,
+) -> T:
+    """asyncio.run в виртуальном времени с SimulatedClock"""
+    previous = get_clock()
+    set_clock(SimulatedClock(start))
+    try:
+        with asyncio.Runner(loop_factory=VirtualTimeLoop) as runner:
+            return runner.run(main)
+    finally:
+        set_clock(previous)
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from typing import TYPE_CHECKING, Any
 
@@ -10,8 +9,10 @@ from aiogram.types import (
 from aiogram.utils import markdown
 
 from application.schemas import UserSchema
-from application.services.timer_mng import timer_manager
+from application.services.timer_mng import TimerPayload, timer_manager
+from utils.clock import get_clock
 from utils.tg.filters import StandData, HitData
+from utils.tg.outbound import Priority, send_in_background, send_priority
 
 if TYPE_CHECKING:
     from application.services import GameServiceTG
@@ -19,6 +20,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Пауза между картами дилера, секунды
+DEALER_TURN_DELAY = 1.5
+
 
 def game_btns(player_id: int):
     hit_data = HitData(cur_player_id=player_id)
@@ -62,19 +66,19 @@ async def pass_turn_next_player(
     player_name = player.get("player_name")
     user_mention = get_user_mention(player_name, player_id)
     text = f"Ход игрока {user_mention}"
-    msg = await message.answer(
-        text=text,
-        reply_markup=game_btns(player_id),
-        parse_mode="MarkdownV2",
-    )
-    timer_manager.create_timer(
+    with send_priority(Priority.HIGH):
+        msg = await message.answer(
+            text=text,
+            reply_markup=game_btns(player_id),
+            parse_mode="MarkdownV2",
+        )
+    await timer_manager.create_timer(
         "game:turn",
         msg.chat.id,
         game_service.kick_afk,
         player_id,
         15,
-        msg,
-        player_id,
+        TimerPayload.from_message(msg, "game:turn", player_id),
     )
 
 
@@ -85,19 +89,19 @@ async def new_turn_current_player(
 ):
     player_id = player.get("player_id")
     text = format_player_info(player)
-    await message.edit_text(
-        text=text,
-        reply_markup=game_btns(player_id=player_id),
-        parse_mode="MarkdownV2",
-    )
-    timer_manager.create_timer(
+    with send_priority(Priority.HIGH):
+        await message.edit_text(
+            text=text,
+            reply_markup=game_btns(player_id=player_id),
+            parse_mode="MarkdownV2",
+        )
+    await timer_manager.create_timer(
         "game:turn",
         message.chat.id,
         game_service.kick_afk,
         player_id,
         15,
-        message,
-        player_id,
+        TimerPayload.from_message(message, "game:turn", player_id),
     )
 
 
@@ -149,7 +153,7 @@ async def handle_dealer_turns(
         return
 
     msg = await message.answer(text="Дилер берет карты до 17 очков.")
-    await asyncio.sleep(1.5)
+    await get_clock().sleep(DEALER_TURN_DELAY)
 
     final_turn = dealer_turns.pop()
     final_score = final_turn.get("score")
@@ -158,8 +162,12 @@ async def handle_dealer_turns(
     for turn in dealer_turns:
         score = turn.get("score")
         cards = turn.get("cards")
-        await msg.edit_text(text=f"У дилера {score} очков\nКарты: {cards}")
-        await asyncio.sleep(1.5)
+        # Промежуточные карты не ждут очереди чата: если правки не успевают
+        # уйти, в Telegram попадет только последняя
+        send_in_background(
+            msg.edit_text(text=f"У дилера {score} очков\nКарты: {cards}")
+        )
+        await get_clock().sleep(DEALER_TURN_DELAY)
 
     dealer_res_status = "перебор" if final_score and final_score > 21 else ""
     text = (
@@ -0,0 +1,381 @@
+import asyncio
+import heapq
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText
+from aiogram.methods.base import TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    # Ход и ставки - то, чего ждут игроки
+    HIGH = 0
+    NORMAL = 1
+    # Косметика: отсчет лобби и подобные правки
+    LOW = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("send_priority", default=Priority.NORMAL)
+
+
+@contextmanager
+def send_priority(priority: Priority):
+    """Приоритет запросов к Telegram внутри блока with"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+_background: set[asyncio.Task] = set()
+
+
+def send_in_background(
+    request: Awaitable[Any],
+    on_error: Callable[[BaseException], None] | None = None,
+) -> asyncio.Task:
+    """Отправить запрос, не дожидаясь его очереди.
+
+    Так идущие подряд правки одного сообщения успевают заменить друг
+    друга в очереди чата. Ошибка передается в on_error или пишется в лог.
+    """
+    task = asyncio.ensure_future(request)
+    _background.add(task)
+
+    def done(task: asyncio.Task):
+        _background.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        if on_error is not None:
+            on_error(task.exception())
+        else:
+            logger.error("Telegram request failed", exc_info=task.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated: float | None = None
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            elapsed = now - self.updated
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет токен"""
+        self._refill(now)
+        # Допуск на округление: иначе ожидание может оказаться меньше
+        # шага часов и цикл не сдвинется
+        if self.tokens >= 1 - 1e-9:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity - 1e-9
+
+
+SharedAcquire = Callable[[], Awaitable[float]]
+
+
+class PriorityLimiter:
+    """Общий лимит запросов: при нехватке токенов первыми их получают
+    ожидающие с высшим приоритетом, а при равном - пришедшие раньше.
+
+    shared - лимит, общий для всех процессов бота: возвращает 0, если
+    токен взят, иначе через сколько секунд пробовать снова. Токен
+    процесса без общего токена не выдается.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        shared: SharedAcquire | None = None,
+    ):
+        self.bucket = TokenBucket(rate, capacity)
+        self.shared = shared
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = count()
+        self._pump: asyncio.Task | None = None
+
+    async def acquire(self, priority: Priority):
+        loop = asyncio.get_running_loop()
+        if (
+            self.shared is None
+            and not self._waiters
+            and self.bucket.delay(loop.time()) == 0
+        ):
+            self.bucket.take(loop.time())
+            return
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+        await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                # Ожидающий отменен
+                heapq.heappop(self._waiters)
+                continue
+            wait = self.bucket.delay(loop.time())
+            if wait == 0 and self.shared is not None:
+                wait = await self.shared()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            self.bucket.take(loop.time())
+            if not future.done():
+                future.set_result(None)
+
+
+@dataclass(order=True)
+class OutboundRequest:
+    priority: int
+    seq: int
+    method: TelegramMethod = field(compare=False)
+    make_request: NextRequestMiddlewareType = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    # Ожидающие замененных этим запросом правок получат его результат
+    merged: list[asyncio.Future] = field(default_factory=list, compare=False)
+    superseded: bool = field(default=False, compare=False)
+
+    @property
+    def futures(self) -> list[asyncio.Future]:
+        return [self.future, *self.merged]
+
+    @property
+    def edit_key(self) -> tuple[int, str] | None:
+        if isinstance(self.method, (EditMessageText, EditMessageReplyMarkup)):
+            if self.method.message_id is not None:
+                return self.method.message_id, type(self.method).__name__
+        return None
+
+
+@dataclass
+class ChatQueue:
+    bucket: TokenBucket
+    requests: list[OutboundRequest] = field(default_factory=list)
+    # Неотправленные правки по (message_id, метод)
+    edits: dict[tuple[int, str], OutboundRequest] = field(default_factory=dict)
+    paused_until: float = 0
+    worker: asyncio.Task | None = None
+
+
+class OutboundDispatcher(BaseRequestMiddleware):
+    """Исходящие запросы к Telegram с лимитами по чатам и общим лимитом.
+
+    Запросы с chat_id встают в очередь своего чата и уходят по одному в
+    порядке приоритета (send_priority), а внутри приоритета - в порядке
+    вызова. Для чата действует ведро токенов: group_per_minute для групп
+    и private_rate в секунду для личных чатов, для всех вместе -
+    global_rate в секунду. С shared_global (PriorityLimiter.shared)
+    global_rate делят все процессы бота, а не каждый свой. На 429 очередь чата ждет retry_after и
+    повторяет запрос до max_retries раз, так что вызывающий код видит
+    только задержку.
+
+    Неотправленная правка сообщения заменяется более новой: новый
+    editMessageText заменяет прежние правки текста и клавиатуры этого
+    сообщения (текст отправляется вместе с клавиатурой), новый
+    editMessageReplyMarkup - прежние правки клавиатуры. Замененный
+    запрос не отправляется, его вызывающий получает результат нового,
+    сэкономленные запросы считаются в metrics["coalesced"].
+    Ведро и пауза чата хранятся и после того, как его очередь
+    опустела, и удаляются раз в sweep_interval секунд, когда ведро снова
+    полное, а пауза прошла. Подключается к сессии бота:
+    bot.session.middleware(OutboundDispatcher()).
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        group_per_minute: int = 20,
+        private_rate: float = 1,
+        private_burst: int = 3,
+        max_retries: int = 3,
+        sweep_interval: float = 60,
+        shared_global: SharedAcquire | None = None,
+    ):
+        self.group_per_minute = group_per_minute
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.max_retries = max_retries
+        self.sweep_interval = sweep_interval
+        self._swept_at = 0.0
+        self.limiter = PriorityLimiter(global_rate, global_rate, shared_global)
+        self.metrics: Counter[str] = Counter()
+        self._chats: dict[int | str, ChatQueue] = {}
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return sum(len(queue.requests) for queue in self._chats.values())
+
+    def _make_bucket(self, chat_id: int | str) -> TokenBucket:
+        if isinstance(chat_id, int) and chat_id > 0:
+            return TokenBucket(self.private_rate, self.private_burst)
+        return TokenBucket(self.group_per_minute / 60, self.group_per_minute)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Any:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        future = asyncio.get_running_loop().create_future()
+        request = OutboundRequest(
+            priority=_priority.get(),
+            seq=next(self._seq),
+            method=method,
+            make_request=make_request,
+            future=future,
+        )
+        self._sweep()
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = ChatQueue(self._make_bucket(chat_id))
+        self._push(queue, request)
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._drain(bot, chat_id, queue))
+        return await future
+
+    def _sweep(self):
+        """Удалить чаты без очереди, у которых ведро полное и пауза прошла"""
+        now = asyncio.get_running_loop().time()
+        if now - self._swept_at < self.sweep_interval:
+            return
+        self._swept_at = now
+        idle = [
+            chat_id
+            for chat_id, queue in self._chats.items()
+            if queue.worker is None
+            and queue.paused_until <= now
+            and queue.bucket.is_full(now)
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    def _push(self, queue: ChatQueue, request: OutboundRequest):
+        key = request.edit_key
+        if key is not None:
+            message_id, name = key
+            names = [name]
+            if name == EditMessageText.__name__:
+                names.append(EditMessageReplyMarkup.__name__)
+            for old_name in names:
+                old = queue.edits.pop((message_id, old_name), None)
+                if old is not None:
+                    self._supersede(old, request)
+            queue.edits[key] = request
+        heapq.heappush(queue.requests, request)
+
+    def _requeue(self, queue: ChatQueue, request: OutboundRequest):
+        key = request.edit_key
+        newer = queue.edits.get(key) if key is not None else None
+        if newer is not None:
+            # Пока ждали retry_after, пришла правка новее - отправится она
+            self._supersede(request, newer)
+            heapq.heapify(queue.requests)
+            return
+        if key is not None:
+            queue.edits[key] = request
+        heapq.heappush(queue.requests, request)
+
+    def _supersede(self, old: OutboundRequest, new: OutboundRequest):
+        old.superseded = True
+        new.merged.extend(old.futures)
+        # Новая правка не должна уйти позже и с меньшим приоритетом
+        new.priority = min(new.priority, old.priority)
+        new.seq = min(new.seq, old.seq)
+        self.metrics["coalesced"] += 1
+
+    async def _drain(self, bot: Bot, chat_id: int | str, queue: ChatQueue):
+        loop = asyncio.get_running_loop()
+        while queue.requests:
+            # Пока ждем токен, вперед может встать запрос важнее
+            wait = max(
+                queue.bucket.delay(loop.time()),
+                queue.paused_until - loop.time(),
+            )
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            request = heapq.heappop(queue.requests)
+            if request.superseded:
+                continue
+            key = request.edit_key
+            if key is not None and queue.edits.get(key) is request:
+                del queue.edits[key]
+            if all(future.done() for future in request.futures):
+                continue
+            await self.limiter.acquire(request.priority)
+            queue.bucket.take(loop.time())
+            try:
+                result = await request.make_request(bot, request.method)
+            except TelegramRetryAfter as e:
+                self.metrics["retry_after"] += 1
+                queue.paused_until = loop.time() + e.retry_after
+                request.attempts += 1
+                if request.attempts <= self.max_retries:
+                    self._requeue(queue, request)
+                    continue
+                logger.warning("Chat %r still flood limited, giving up", chat_id)
+                self._finish(request, exception=e)
+            except Exception as e:
+                self._finish(request, exception=e)
+            else:
+                self.metrics["sent"] += 1
+                self._finish(request, result=result)
+        # Ведро и пауза остаются до _sweep
+        queue.worker = None
+
+    def _finish(
+        self,
+        request: OutboundRequest,
+        result: Any = None,
+        exception: BaseException | None = None,
+    ):
+        if exception is not None:
+            self.metrics["failed"] += 1
+        for future in request.futures:
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)